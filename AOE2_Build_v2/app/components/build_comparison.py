@@ -0,0 +1,85 @@
+import streamlit as st
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from app.utils.build_comparison import (
+    MAX_COMPARED_BUILDS,
+    align_build_timelines,
+    compare_timelines,
+    format_difference,
+    get_comparison_series
+)
+from app.utils.build_timeline import RESOURCES
+
+# Chart metrics and their axis titles
+COMPARISON_METRICS = {
+    "Villagers": ("villagers", "Villagers"),
+    "Resources Gathered": ("gathered", "Gathered")
+}
+
+def display_build_comparison(build_orders):
+    """
+    Display the timelines of several build orders in one chart, with their differences.
+    
+    Args:
+        build_orders (list): Up to MAX_COMPARED_BUILDS build order dictionaries
+    """
+    if len(build_orders) < 2:
+        st.info("Select at least two build orders to compare.")
+        return
+    
+    timelines = align_build_timelines(build_orders[:MAX_COMPARED_BUILDS])
+    names = [build_order.get("name", f"Build {i + 1}") for i, build_order in enumerate(build_orders)]
+    
+    metric = st.radio("Compare", list(COMPARISON_METRICS), horizontal=True)
+    key, axis_title = COMPARISON_METRICS[metric]
+    
+    # One row per resource, one color per build
+    colors = px.colors.qualitative.Plotly
+    fig = make_subplots(
+        rows=len(RESOURCES), cols=1, shared_xaxes=True, vertical_spacing=0.04,
+        subplot_titles=[resource.capitalize() for resource in RESOURCES]
+    )
+    for series in get_comparison_series(timelines, key):
+        b = series["build"]
+        row = RESOURCES.index(series["resource"]) + 1
+        fig.add_trace(go.Scatter(
+            x=series["time"] / 60,
+            y=series["values"],
+            mode="lines",
+            name=names[b],
+            legendgroup=str(b),
+            showlegend=row == 1,
+            line=dict(color=colors[b % len(colors)])
+        ), row=row, col=1)
+        fig.update_yaxes(title_text=axis_title, row=row, col=1)
+    
+    fig.update_xaxes(title_text="Game Time (min)", row=len(RESOURCES), col=1)
+    fig.update_layout(height=200 * len(RESOURCES), title=f"{metric} Over Time")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Differences against the first build
+    differences = compare_timelines(timelines)
+    st.markdown(f"**Compared to {names[0]}**")
+    if differences:
+        for difference in differences:
+            st.markdown(f"- {format_difference(difference, names)}")
+    else:
+        st.caption("No notable differences in villagers or age-up times.")
+
+def display_build_comparison_selector(build_orders):
+    """
+    Let the user pick build orders from a list and compare them.
+    
+    Args:
+        build_orders (list): Build order dictionaries to pick from
+    """
+    selected = st.multiselect(
+        "Build orders to compare",
+        range(len(build_orders)),
+        format_func=lambda i: build_orders[i].get("name", f"Build {i + 1}"),
+        max_selections=MAX_COMPARED_BUILDS,
+        help=f"Pick up to {MAX_COMPARED_BUILDS}; the first one is the reference"
+    )
+    if selected:
+        display_build_comparison([build_orders[i] for i in selected])
@@ -1,7 +1,19 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from app.utils.age_up_estimator import get_build_age_up_times
+from app.utils.build_diff import get_variation_changes
+from app.utils.build_order_validator import format_issue, has_errors, validate_build_order
+from app.utils.build_similarity import find_similar_build_orders
+from app.utils.build_steps import CompiledSteps, as_number, get_compiled_steps
+from app.utils.build_timeline import AGES, RESOURCES, format_game_time, get_age_up_times
+from app.utils.data_loader import load_civilizations
+from app.utils.economy_simulator import simulate_economy
+
+# Number of builds shown in the "Similar Builds" panel
+SIMILAR_BUILDS_COUNT = 5
 
 def display_build_order_list(build_orders, compact=False):
     """
@@ -82,19 +94,30 @@ def display_build_order_detail(build_order):
         st.warning("No build order selected.")
         return
     
+    # Broken builds are still shown, with what is wrong with them
+    issues = validate_build_order(build_order)
+    if has_errors(issues):
+        with st.expander("This build order has problems"):
+            for issue in issues:
+                st.markdown(f"- {format_issue(issue)}")
+    
     # Create expander for build order details
     with st.expander("Build Order Overview", expanded=True):
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            st.subheader(build_order["name"])
-            st.write(build_order["description"])
+            st.subheader(build_order.get("name", "Unnamed Build Order"))
+            st.write(build_order.get("description", ""))
             
             # Meta information
-            st.markdown(f"**Type:** {build_order['type']}")
-            st.markdown(f"**Difficulty:** {build_order['difficulty']}")
-            st.markdown(f"**Primary Goal:** {build_order['primary_goal']}")
-            st.markdown(f"**Execution Time:** ~{build_order['execution_time']} minutes")
+            st.markdown(f"**Type:** {build_order.get('type', 'Unknown')}")
+            st.markdown(f"**Difficulty:** {build_order.get('difficulty', 'Unknown')}")
+            st.markdown(f"**Primary Goal:** {build_order.get('primary_goal', 'Unknown')}")
+            # Seconds in the sample data and generated builds, free text in submissions
+            execution_time = build_order.get("execution_time")
+            if isinstance(execution_time, (int, float)) and not isinstance(execution_time, bool):
+                execution_time = f"~{format_game_time(execution_time)}"
+            st.markdown(f"**Execution Time:** {execution_time or '?'}")
             
             # Creator information if available
             if "creator" in build_order and build_order["creator"]:
@@ -102,9 +125,10 @@ def display_build_order_detail(build_order):
         
         with col2:
             # Meta relevance
+            meta_relevance = _as_rating(build_order.get("meta_relevance"))
             st.subheader("Meta Relevance")
-            st.progress(build_order["meta_relevance"] / 10)
-            st.caption(f"{build_order['meta_relevance']}/10")
+            st.progress(meta_relevance / 10)
+            st.caption(f"{meta_relevance:g}/10")
             
             # Suitable maps
             st.subheader("Suitable Maps")
@@ -130,6 +154,21 @@ def display_build_order_detail(build_order):
             for archetype in build_order.get("weak_against", []):
                 st.markdown(f"- {archetype}")
     
+    # Display builds with a similar timeline and style
+    with st.expander("Similar Builds"):
+        similar_builds = find_similar_build_orders(build_order, k=SIMILAR_BUILDS_COUNT)
+        
+        if similar_builds:
+            for similar in similar_builds:
+                similar_build = similar["build_order"]
+                st.markdown(
+                    f"- **{similar_build['name']}** "
+                    f"({similar_build.get('type', 'Unknown')}, {similar_build.get('difficulty', 'Unknown')}) "
+                    f"- {similar['similarity']:.0%} similar"
+                )
+        else:
+            st.info("No similar build orders found.")
+    
     # Display build order steps
     st.subheader("Build Order Steps")
     
@@ -140,19 +179,9 @@ def display_build_order_detail(build_order):
         st.info("No detailed steps available for this build order.")
         return
     
-    # Display steps as a table
-    steps_df = pd.DataFrame([
-        {
-            "Step": step["step_number"],
-            "Pop": step["population"],
-            "Age": step["age"],
-            "Time": step.get("time_marker", ""),
-            "Action": step["action"],
-            "Details": step["description"],
-            "Key Point": "⭐" if step.get("key_point", False) else ""
-        }
-        for step in steps
-    ])
+    # Display steps as a table (free-text steps only have an action)
+    compiled_steps = get_compiled_steps(build_order)
+    steps_df = pd.DataFrame(_step_rows(compiled_steps))
     
     # Add highlighting to key steps
     def highlight_key_points(row):
@@ -168,18 +197,22 @@ def display_build_order_detail(build_order):
     
     # Extract villager assignment data from steps
     villager_data = []
-    for step in steps:
-        if "villager_assignment" in step and step["villager_assignment"]:
-            # Time marker or step number as x-axis
-            x_value = step.get("time_marker", f"Step {step['step_number']}")
-            
-            # Add data point for each resource
-            for resource, count in step["villager_assignment"].items():
+    for i in np.flatnonzero(~np.isnan(compiled_steps.villager_totals)):
+        step_number = compiled_steps.numbers[i]
+        
+        # Time or step number as x-axis
+        x_value = compiled_steps.time_labels[i] or f"Step {step_number}"
+        
+        # Add data point for each resource, and for villagers on anything else
+        counts = dict(zip(RESOURCES, compiled_steps.villagers[i]))
+        counts["idle"] = compiled_steps.villager_totals[i] - compiled_steps.villagers[i].sum()
+        for resource, count in counts.items():
+            if resource in RESOURCES or count > 0:
                 villager_data.append({
                     "Time": x_value,
                     "Resource": resource.capitalize(),
                     "Villagers": count,
-                    "Step": step["step_number"]
+                    "Step": step_number
                 })
     
     if villager_data:
@@ -210,6 +243,8 @@ def display_build_order_detail(build_order):
     else:
         st.info("No resource distribution data available for this build order.")
     
+    display_economy_simulation(build_order)
+    
     # Variations section
     if "variations" in build_order and build_order["variations"]:
         st.subheader("Build Order Variations")
@@ -218,10 +253,14 @@ def display_build_order_detail(build_order):
             with st.expander(f"Variation {i+1}: {variation.get('name', 'Unnamed Variation')}"):
                 st.write(variation.get("description", "No description available."))
                 
-                if "steps" in variation:
+                if "patch" in variation:
+                    st.markdown("### Key Changes")
+                    display_step_changes(get_variation_changes(build_order, variation))
+                elif "steps" in variation:
                     st.markdown("### Key Changes")
-                    for step in variation["steps"]:
-                        st.markdown(f"- **Step {step['step_number']}:** {step['description']}")
+                    for j, step in enumerate(variation["steps"]):
+                        row = _step_row(j, step)
+                        st.markdown(f"- **Step {row['Step']}:** {row['Details'] or row['Action']}")
     
     # Video tutorials section
     if "video_tutorials" in build_order and build_order["video_tutorials"]:
@@ -237,6 +276,162 @@ def display_build_order_detail(build_order):
         for tip in build_order["tips"]:
             st.markdown(f"- {tip}")
 
+def _as_rating(value):
+    """Convert a 0-10 rating to a number in that range (0 if it is not a number)."""
+    return min(max(as_number(value, 0.0), 0.0), 10.0)
+
+def _step_rows(steps):
+    """
+    Get the table rows of compiled build order steps.
+    
+    Args:
+        steps (CompiledSteps): Compiled steps (see build_steps)
+        
+    Returns:
+        list: Rows with Step, Pop, Age, Time, Action, Details and Key Point
+    """
+    return [
+        {
+            "Step": steps.numbers[i],
+            "Pop": "" if np.isnan(steps.population[i]) else f"{steps.population[i]:g}",
+            "Age": steps.age_names[i].capitalize(),
+            "Time": steps.time_labels[i],
+            "Action": steps.actions[i],
+            "Details": steps.descriptions[i],
+            "Key Point": "⭐" if steps.key_points[i] else ""
+        }
+        for i in range(len(steps))
+    ]
+
+def _step_row(index, step):
+    """
+    Get the table row of a single build order step.
+    
+    Args:
+        index (int): Position of the step (0-based)
+        step (dict or str): Structured step, or free text from a submission
+        
+    Returns:
+        dict: Row with Step, Pop, Age, Time, Action, Details and Key Point
+    """
+    return _step_rows(CompiledSteps([step], first_number=index + 1))[0]
+
+def _format_villagers(assignment):
+    """Format a villager assignment, e.g. "6 food, 3 wood"."""
+    return ", ".join(f"{count} {resource}" for resource, count in (assignment or {}).items()) or "-"
+
+def display_step_changes(rows):
+    """
+    Display changed steps as highlights: added in green, removed struck out in red,
+    and changed steps with what they were.
+    
+    Args:
+        rows (list): Aligned step rows other than the unchanged ones (see build_diff.align_steps)
+    """
+    if not rows:
+        st.info("No step changes.")
+        return
+    
+    def describe(index, step):
+        row = _step_row(index, step)
+        label = " · ".join(part for part in (str(row["Time"]), f"Pop {row['Pop']}" if row["Pop"] != "" else "") if part)
+        text = row["Action"] or row["Details"]
+        return f"{label}: {text}" if label else str(text)
+    
+    for row in rows:
+        if row["status"] == "added":
+            st.markdown(f"- :green[**+ Step {row['new_index'] + 1}:** {describe(row['new_index'], row['new'])}]")
+        elif row["status"] == "removed":
+            st.markdown(f"- :red[~~Step {row['old_index'] + 1}: {describe(row['old_index'], row['old'])}~~]")
+        else:
+            st.markdown(f"- :orange[**~ Step {row['new_index'] + 1}:** {describe(row['new_index'], row['new'])}]")
+            old, new = _step_row(row["old_index"], row["old"]), _step_row(row["new_index"], row["new"])
+            changed = [field for field in ("Age", "Details", "Key Point") if old[field] != new[field]]
+            for field in changed:
+                st.caption(f"{field}: {old[field] or '-'} → {new[field] or '-'}")
+            
+            old_villagers = row["old"].get("villager_assignment") if isinstance(row["old"], dict) else None
+            new_villagers = row["new"].get("villager_assignment") if isinstance(row["new"], dict) else None
+            if old_villagers != new_villagers:
+                st.caption(f"Villagers: {_format_villagers(old_villagers)} → {_format_villagers(new_villagers)}")
+
+def display_economy_simulation(build_order):
+    """
+    Display when a build order can afford each age-up, from its simulated economy.
+    
+    Args:
+        build_order (dict): Build order dictionary
+    """
+    economy = simulate_economy(build_order)
+    if not economy["has_villager_data"]:
+        return
+    
+    st.subheader("Economy Simulation")
+    
+    def format_time(seconds):
+        return format_game_time(seconds) if seconds is not None else "-"
+    
+    planned = get_age_up_times(build_order)
+    st.table(pd.DataFrame([
+        {
+            "Age": f"{age.capitalize()} Age",
+            "Planned": format_time(planned.get(age)),
+            "Affordable": format_time(economy["age_up_affordable"][age])
+        }
+        for age in AGES
+    ]))
+    
+    if economy["first_deficit"] is not None:
+        st.warning(
+            f"The villagers trained exceed the food gathered at {format_time(economy['first_deficit'])}, "
+            "check the villager assignments of this build."
+        )
+    
+    display_age_up_estimates(build_order)
+
+def _age_up_columns(reached):
+    """Get sortable age-up columns (minutes, None if never reached) from reached times in seconds."""
+    return {
+        f"{age.capitalize()} Age (min)": None if np.isnan(seconds) else round(seconds / 60, 1)
+        for age, seconds in zip(AGES, reached)
+    }
+
+def display_age_up_estimates(build_order):
+    """
+    Display when a build order reaches each age with every civilization.
+    
+    Args:
+        build_order (dict): Build order dictionary
+    """
+    civ_ids, reached = get_build_age_up_times([build_order])
+    civ_names = {civ["id"]: civ["name"] for civ in load_civilizations()}
+    
+    with st.expander("Age-Up Times by Civilization"):
+        st.caption("Estimated from the villager assignments and each civilization's economic bonuses.")
+        st.dataframe(pd.DataFrame([
+            {"Civilization": civ_names.get(civ_id, civ_id), **_age_up_columns(reached[i, 0])}
+            for i, civ_id in enumerate(civ_ids)
+        ]))
+
+def display_age_up_comparison(build_orders, civ_id):
+    """
+    Display the estimated age-up times of several build orders for one civilization.
+    
+    Args:
+        build_orders (list): List of build order dictionaries
+        civ_id: ID of the civilization
+    """
+    civ_ids, reached = get_build_age_up_times(build_orders)
+    if civ_id not in civ_ids:
+        st.info("No age-up estimates available for this civilization.")
+        return
+    
+    civ_index = civ_ids.index(civ_id)
+    st.dataframe(pd.DataFrame([
+        {"Build Order": build_order.get("name", ""), **_age_up_columns(reached[civ_index, i])}
+        for i, build_order in enumerate(build_orders)
+    ]))
+
 def display_resource_visualization(villager_assignments):
     """
     Display resource allocation visualization.
@@ -2,6 +2,7 @@ import streamlit as st
 from datetime import datetime
 from app.utils.database import save_build_order, get_user_build_orders
 from app.utils.data_loader import load_maps
+from app.utils.build_order_validator import format_issue, has_errors, validate_build_order
 
 def display_build_order_submission_form():
     """Display the build order submission form."""
@@ -125,6 +126,16 @@ def display_build_order_submission_form():
                 "status": "pending"  # For moderation
             }
             
+            # Reject broken builds before saving, but only warn about likely mistakes
+            issues = validate_build_order(build_order)
+            for issue in issues:
+                if issue.severity == "error":
+                    st.error(format_issue(issue))
+                else:
+                    st.warning(format_issue(issue))
+            if has_errors(issues):
+                return
+            
             if save_build_order(build_order, st.session_state.user_id):
                 st.success("Build order submitted successfully! It will be reviewed by our team.")
                 # Clear the steps from session state
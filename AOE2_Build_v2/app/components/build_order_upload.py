@@ -3,6 +3,27 @@ import json
 import os
 from datetime import datetime
 from app.utils.database import save_build_order, get_user_build_orders, update_build_order, share_build_order
+from app.utils.build_order_validator import format_issue, has_errors, validate_build_order
+
+def _check_build_order(build_order):
+    """
+    Show the validation issues of a build order before it is saved.
+    
+    Broken builds are rejected, likely mistakes are only warned about.
+    
+    Args:
+        build_order (dict): Build order dictionary
+    
+    Returns:
+        bool: Whether the build order can be saved
+    """
+    issues = validate_build_order(build_order)
+    for issue in issues:
+        if issue.severity == "error":
+            st.error(format_issue(issue))
+        else:
+            st.warning(format_issue(issue))
+    return not has_errors(issues)
 
 def save_build_order_to_db(build_order, user_id):
     """Save a build order to the database."""
@@ -88,6 +109,9 @@ def display_build_order_upload():
                 "is_public": is_public
             }
             
+            if not _check_build_order(build_order):
+                return None
+            
             if save_build_order_to_db(build_order, st.session_state.user_id):
                 st.success(f"Build order '{name}' saved successfully!")
                 return build_order
@@ -231,6 +255,10 @@ def display_build_order_edit(build_order):
                 "is_public": is_public
             }
             
+            # The edited build is checked as a whole, like a new submission
+            if not _check_build_order({**build_order, **updates}):
+                return
+            
             if update_build_order(build_order["id"], updates, st.session_state.user_id):
                 st.success("Build order updated successfully!")
                 del st.session_state.editing_build_order
@@ -0,0 +1,150 @@
+import time
+
+import streamlit as st
+from app.utils.build_timeline import RESOURCES, format_game_time
+from app.utils.practice_schedule import (
+    get_practice_build,
+    get_session_schedule,
+    get_timer_game_time,
+    pause_timer,
+    reset_timer,
+    start_timer
+)
+
+# Real seconds between timer updates
+TICK_INTERVAL = 0.25
+
+# Game seconds per real second at each game speed
+GAME_SPEEDS = {
+    "Normal (1.7x)": 1.7,
+    "Slow (1.0x)": 1.0,
+    "Fast (2.0x)": 2.0
+}
+
+# Game seconds the timer keeps running after the last step
+FINISH_MARGIN = 30
+
+def _format_steps(steps, title):
+    """Format the step rows due at one time as markdown."""
+    if not steps:
+        return f"**{title}**\n\n-"
+    text = f"**{title}** - {steps[0]['time_label']}"
+    for step in steps:
+        line = f"{'⭐ ' if step['key_point'] else ''}{step['action']}"
+        if step["population"] != "":
+            line += f" (Pop {step['population']})"
+        if step["details"]:
+            line += f" - {step['details']}"
+        text += f"\n- {line}"
+    return text
+
+def _render_state(placeholders, state, shown_step):
+    """
+    Update the practice view for a state.
+    
+    The clock, progress and countdown change on every tick; the steps and
+    villagers only when the current step time changes.
+    
+    Returns:
+        int: Index of the step time now shown
+    """
+    placeholders["clock"].markdown(f"## ⏱️ {format_game_time(state.game_time)}")
+    placeholders["progress"].progress(state.progress)
+    
+    if state.seconds_to_next is not None:
+        placeholders["countdown"].caption(f"Next step in {format_game_time(state.seconds_to_next + 0.999)}")
+    else:
+        placeholders["countdown"].caption("Last step reached")
+    
+    if state.step_index == shown_step:
+        return shown_step
+    
+    age = state.current[-1]["age"] if state.current else ""
+    placeholders["current"].markdown(_format_steps(state.current, f"Now{' · ' + age if age else ''}"))
+    placeholders["next"].markdown(_format_steps(state.next, "Next"))
+    for resource in RESOURCES:
+        change = state.villager_changes.get(resource)
+        placeholders[resource].metric(
+            resource.capitalize(),
+            f"{state.villagers[resource]:g}",
+            f"{change:+g}" if change else None
+        )
+    return state.step_index
+
+def display_practice_mode(selected_build, practice_mode=True):
+    """
+    Display a timer that walks through a build order as game time advances.
+    
+    The build is compiled into a PracticeSchedule once, and each tick only
+    looks up the current state and updates a few placeholders, so the steps
+    table and charts of the detail view are not rebuilt.
+    
+    The build and the timer are kept in the session state, so the practice
+    view stays up when its buttons rerun the page.
+    
+    Args:
+        selected_build (dict): Build order picked on this run, or None
+        practice_mode (bool): Whether practice mode is on
+    
+    Returns:
+        bool: Whether a build order is being practiced (and was displayed)
+    """
+    build_order = get_practice_build(st.session_state, selected_build, practice_mode)
+    if build_order is None:
+        return False
+    
+    schedule = get_session_schedule(st.session_state, build_order)
+    
+    st.subheader(f"Practice: {build_order.get('name', 'Unnamed Build Order')}")
+    if not schedule.has_times:
+        st.info("This build order has no step times to practice with.")
+        return True
+    
+    running = st.session_state.get("practice_running", False)
+    col1, col2, col3 = st.columns([1, 1, 2])
+    
+    with col3:
+        speed = st.selectbox("Game Speed", list(GAME_SPEEDS), disabled=running)
+    
+    # Rerun after each change so the buttons match the timer
+    with col1:
+        if running:
+            if st.button("Pause"):
+                pause_timer(st.session_state, time.monotonic())
+                st.experimental_rerun()
+        elif st.button("Start" if not st.session_state.get("practice_offset") else "Resume"):
+            # A finished run starts over
+            if st.session_state.get("practice_offset", 0.0) > schedule.duration + FINISH_MARGIN:
+                reset_timer(st.session_state)
+            start_timer(st.session_state, GAME_SPEEDS[speed], time.monotonic())
+            st.experimental_rerun()
+    
+    with col2:
+        if st.button("Reset"):
+            reset_timer(st.session_state)
+            st.experimental_rerun()
+    
+    placeholders = {"clock": st.empty(), "progress": st.empty(), "countdown": st.empty()}
+    col1, col2 = st.columns(2)
+    placeholders["current"] = col1.empty()
+    placeholders["next"] = col2.empty()
+    for column, resource in zip(st.columns(len(RESOURCES)), RESOURCES):
+        placeholders[resource] = column.empty()
+    
+    shown_step = _render_state(placeholders, schedule.at(get_timer_game_time(st.session_state, time.monotonic())), None)
+    
+    next_tick = time.monotonic()
+    while running:
+        next_tick += TICK_INTERVAL
+        time.sleep(max(next_tick - time.monotonic(), 0))
+        
+        now = time.monotonic()
+        game_time = get_timer_game_time(st.session_state, now)
+        shown_step = _render_state(placeholders, schedule.at(game_time), shown_step)
+        
+        if game_time > schedule.duration + FINISH_MARGIN:
+            pause_timer(st.session_state, now)
+            running = False
+            st.success("Build order complete!")
+    
+    return True
@@ -6,10 +6,34 @@ import pandas as pd
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from components.build_order_display import display_build_order_list, display_build_order_detail
+from components.build_order_display import (
+    display_age_up_comparison,
+    display_build_order_list,
+    display_build_order_detail
+)
+from components.build_comparison import display_build_comparison_selector
+from components.practice_mode import display_practice_mode
+from utils.age_up_estimator import sort_by_age_up
+from utils.build_order_query import QUERY_HELP, QueryError, search_build_orders
 from utils.data_loader import load_build_orders, load_civilizations
-from utils.recommendation_engine import get_recommended_build_orders
-from utils.session_state_manager import check_navigation, get_selected_civilization
+from utils.recommendation_engine import get_recommendation_cache_stats, get_recommended_build_order_page
+from utils.session_state_manager import (
+    check_navigation,
+    get_selected_civilization,
+    get_user_preferences,
+    record_build_view
+)
+
+# Maximum number of build orders shown for a search
+SEARCH_RESULT_LIMIT = 50
+
+# Sort options of the build order lists, with the age they sort by
+SORT_OPTIONS = {
+    "Recommended": None,
+    "Fastest Feudal Age": "feudal",
+    "Fastest Castle Age": "castle",
+    "Fastest Imperial Age": "imperial"
+}
 
 def main():
     st.set_page_config(
@@ -35,6 +59,9 @@ def main():
     
     st.subheader(f"Recommended Build Orders for {selected_civ['name']}")
     
+    # Query search across all build orders, e.g. civ:Franks map:Arabia feudal<9:30
+    query = st.text_input("Search build orders", help=QUERY_HELP)
+    
     # Sidebar filters
     with st.sidebar:
         st.header("Filters")
@@ -65,29 +92,107 @@ def main():
         enemy_civs = st.multiselect("Enemy Civilizations", 
                                    [civ["name"] for civ in civilizations])
         
+        # Sort order of the displayed build orders
+        sort_by = st.selectbox("Sort By", list(SORT_OPTIONS), index=0)
+        
+        # Practice the selected build with a timer instead of reading its details
+        practice_mode = st.checkbox("Practice Mode")
+        
         # Apply filters button
         apply_filters = st.button("Apply Filters")
     
-    # Get recommended build orders based on filters
+    # Get the first page of recommended build orders based on filters
     if apply_filters or "recommended_builds" not in st.session_state:
+        st.session_state.recommended_filters = {
+            "civilization_id": selected_civ["id"],
+            "build_types": [] if "All" in selected_type else selected_type,
+            "map_type": None if selected_map == "All" else selected_map,
+            "difficulty": None if selected_difficulty == "All" else selected_difficulty,
+            "ally_civs": ally_civs,
+            "enemy_civs": enemy_civs
+        }
         with st.spinner("Finding optimal build orders..."):
-            recommended_builds = get_recommended_build_orders(
-                civilization_id=selected_civ["id"],
-                build_types=[] if "All" in selected_type else selected_type,
-                map_type=None if selected_map == "All" else selected_map,
-                difficulty=None if selected_difficulty == "All" else selected_difficulty,
-                ally_civs=ally_civs,
-                enemy_civs=enemy_civs
+            page = get_recommended_build_order_page(
+                **st.session_state.recommended_filters,
+                preferences=get_user_preferences()
             )
-            st.session_state.recommended_builds = recommended_builds
+            st.session_state.recommended_builds = page["build_orders"]
+            st.session_state.recommended_cursor = page["next_cursor"]
+    
+    # How often recommendations are served from the shared cache
+    with st.sidebar.expander("Recommendation Cache"):
+        cache_stats = get_recommendation_cache_stats()
+        st.metric("Hit Rate", f"{cache_stats['hit_rate'] * 100:.0f}%")
+        st.caption(
+            f"{cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['size']}/{cache_stats['maxsize']} entries"
+        )
+    
+    # Show search results instead of the recommendations while a query is entered
+    if query.strip():
+        try:
+            results = search_build_orders(query, limit=SEARCH_RESULT_LIMIT)
+        except QueryError as e:
+            st.error(f"Invalid search: {e}")
+            return
+        
+        if not results:
+            st.info("No build orders match your search.")
+            return
+        
+        st.caption(f"Showing {len(results)} matching build orders")
+        if SORT_OPTIONS[sort_by]:
+            results = sort_by_age_up(results, selected_civ["id"], SORT_OPTIONS[sort_by])
+        with st.expander(f"Age-Up Times for {selected_civ['name']}"):
+            display_age_up_comparison(results, selected_civ["id"])
+        with st.expander("Compare Build Orders"):
+            display_build_comparison_selector(results)
+        selected_build = display_build_order_list(results)
+        if selected_build:
+            st.session_state.selected_build_order = selected_build
+            record_build_view(selected_build)
+        # The practice view is kept up across the reruns of its timer buttons
+        if not display_practice_mode(selected_build, practice_mode) and selected_build:
+            display_build_order_detail(selected_build)
+        return
     
     # Display build orders
     if hasattr(st.session_state, 'recommended_builds') and st.session_state.recommended_builds:
+        recommended_builds = st.session_state.recommended_builds
+        if SORT_OPTIONS[sort_by]:
+            recommended_builds = sort_by_age_up(recommended_builds, selected_civ["id"], SORT_OPTIONS[sort_by])
+        with st.expander(f"Age-Up Times for {selected_civ['name']}"):
+            display_age_up_comparison(recommended_builds, selected_civ["id"])
+        with st.expander("Compare Build Orders"):
+            display_build_comparison_selector(recommended_builds)
+        
         # Display as cards with expandable details
-        selected_build = display_build_order_list(st.session_state.recommended_builds)
+        selected_build = display_build_order_list(recommended_builds)
+        
+        # Fetch the next page only when asked for
+        if st.session_state.get("recommended_cursor") and st.button("Load more"):
+            try:
+                page = get_recommended_build_order_page(
+                    **st.session_state.recommended_filters,
+                    cursor=st.session_state.recommended_cursor,
+                    preferences=get_user_preferences()
+                )
+                st.session_state.recommended_builds = st.session_state.recommended_builds + page["build_orders"]
+            except ValueError:
+                # The build orders changed since the first page, start over
+                page = get_recommended_build_order_page(
+                    **st.session_state.recommended_filters,
+                    preferences=get_user_preferences()
+                )
+                st.session_state.recommended_builds = page["build_orders"]
+            st.session_state.recommended_cursor = page["next_cursor"]
+            st.experimental_rerun()
         
         if selected_build:
             st.session_state.selected_build_order = selected_build
+            record_build_view(selected_build)
+        # The practice view is kept up across the reruns of its timer buttons
+        if not display_practice_mode(selected_build, practice_mode) and selected_build:
             display_build_order_detail(selected_build)
     else:
         st.info("No build orders match your criteria. Try adjusting your filters.")
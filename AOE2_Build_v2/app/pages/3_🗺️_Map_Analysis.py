@@ -9,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from components.map_selector import display_map_grid
 from utils.data_loader import load_maps, load_map_specific_strategies
 from utils.recommendation_engine import get_map_civilization_tier_list, get_recommended_build_orders
+from utils.recommendation_tables import get_precomputed_recommendations, start_background_refresh
 from components.build_order_display import display_build_order_list
 
 def display_tier_list(tier_list):
@@ -63,6 +64,9 @@ def main():
     
     st.title("Map Analysis & Strategies")
     
+    # Keep the precomputed civ x map recommendations in sync with the data
+    start_background_refresh()
+    
     # Map selection
     maps = load_maps()
     selected_map = display_map_grid(maps)
@@ -123,11 +127,14 @@ def main():
             civ = st.session_state.selected_civilization
             st.header(f"{civ['name']} on {selected_map['name']}")
             
-            # Get map-specific build orders for the civilization
-            civ_map_builds = get_recommended_build_orders(
-                civilization_id=civ["id"],
-                map_type=selected_map["name"]
-            )
+            # Get map-specific build orders for the civilization, from the
+            # precomputed tables when they are up to date
+            civ_map_builds = get_precomputed_recommendations(civ["id"], selected_map["name"])
+            if civ_map_builds is None:
+                civ_map_builds = get_recommended_build_orders(
+                    civilization_id=civ["id"],
+                    map_type=selected_map["name"]
+                )
             
             if civ_map_builds:
                 st.subheader("Recommended Build Orders")
@@ -2,43 +2,22 @@ import streamlit as st
 import sys
 import os
 import pandas as pd
-import numpy as np
-import plotly.graph_objects as go
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from components.civilization_selector import display_civilization_multiselect
-from utils.data_loader import load_civilizations, load_matchup_data
+from utils.data_loader import load_civilizations, load_maps, load_matchup_data
 from utils.matchup_calculator import calculate_team_matchup, get_counter_strategies
+from utils.matchup_confidence import wilson_interval
+from utils.matchup_heatmap import load_matchup_heatmap
 from utils.recommendation_engine import get_recommended_build_orders
 from components.build_order_display import display_build_order_list
 
-def display_matchup_heatmap(matchup_matrix, civilization_names):
-    """Display a heatmap of matchup win rates."""
-    fig = go.Figure(data=go.Heatmap(
-        z=matchup_matrix,
-        x=civilization_names,
-        y=civilization_names,
-        colorscale='RdBu_r',  # Red-Blue scale (red = bad, blue = good)
-        zmin=35,  # Min win rate
-        zmax=65,  # Max win rate
-        zmid=50,  # 50% is neutral
-        colorbar=dict(
-            title="Win Rate %",
-            titleside="right"
-        )
-    ))
-    
-    fig.update_layout(
-        title="Civilization Matchup Win Rates",
-        xaxis_title="Enemy Civilization",
-        yaxis_title="Your Civilization",
-        height=600,
-        width=800
-    )
-    
-    st.plotly_chart(fig)
+def display_matchup_heatmap(heatmap):
+    """Display the precomputed heatmap of matchup win rates."""
+    st.plotly_chart(heatmap["figure"], use_container_width=True)
+    st.caption("Civilizations are ordered so that civs with similar matchup profiles are grouped together.")
 
 def main():
     st.set_page_config(
@@ -91,6 +70,13 @@ def main():
                         value=matchup_data["advantage_level"]
                     )
                 
+                # Confidence of the win rate given the number of games
+                lower, upper = wilson_interval(matchup_data["win_rate"], matchup_data["sample_size"])
+                st.caption(
+                    f"95% confidence interval: {float(lower):.1f}% - {float(upper):.1f}% "
+                    f"({matchup_data['sample_size']} games)"
+                )
+                
                 # Key factors in the matchup
                 st.subheader("Key Matchup Factors")
                 for factor in matchup_data["key_factors"]:
@@ -123,9 +109,18 @@ def main():
             st.subheader("Enemy Team")
             enemy_team = display_civilization_multiselect(civilizations, max_selections=4, key="enemy_team")
         
+        # Optional map for map-specific win rates
+        maps = load_maps()
+        map_names = ["Any Map"] + [m["name"] for m in maps]
+        selected_map = st.selectbox("Map", map_names, index=0)
+        
         if your_team and enemy_team:
             # Calculate team matchup
-            team_analysis = calculate_team_matchup(your_team, enemy_team)
+            team_analysis = calculate_team_matchup(
+                your_team,
+                enemy_team,
+                map_id=None if selected_map == "Any Map" else selected_map
+            )
             
             # Display team synergy
             st.header("Team Analysis")
@@ -151,6 +146,25 @@ def main():
             
             # Overall matchup assessment
             st.subheader("Matchup Assessment")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric(
+                    label="Expected Win Rate",
+                    value=f"{team_analysis['average_win_rate']:.1f}%",
+                    delta=f"{(team_analysis['average_win_rate'] - 50):.1f}%"
+                )
+            with col2:
+                st.metric(
+                    label="Chance of Being Favoured",
+                    value=f"{team_analysis['win_probability'] * 100:.0f}%"
+                )
+            with col3:
+                st.metric(
+                    label="Advantage",
+                    value=team_analysis["advantage_level"]
+                )
+            lower, upper = team_analysis["win_rate_interval"]
+            st.caption(f"95% confidence interval: {lower:.1f}% - {upper:.1f}%")
             st.write(team_analysis["overall_assessment"])
             
             # Recommended team strategies
@@ -186,17 +200,7 @@ def main():
                 st.subheader("Matchup Win Rate Heatmap")
                 st.info("This heatmap shows win rates between civilizations. Blue indicates favorable matchups (>50% win rate), red indicates unfavorable matchups (<50% win rate).")
                 
-                # In a real implementation, this would be loaded from a database
-                # Here we'll simulate a random matchup matrix
-                selected_civ_names = [civ["name"] for civ in enemy_civs]
-                n_civs = len(selected_civ_names)
-                
-                # Create a dummy matchup matrix for demonstration
-                np.random.seed(42)  # For reproducible results
-                matchup_matrix = np.random.normal(50, 5, (n_civs, n_civs))
-                np.fill_diagonal(matchup_matrix, 50)  # Diagonal is always 50%
-                
-                display_matchup_heatmap(matchup_matrix, selected_civ_names)
+                display_matchup_heatmap(load_matchup_heatmap())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
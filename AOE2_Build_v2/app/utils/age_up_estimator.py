@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .build_timeline import AGES
+from .civ_modifiers import get_all_civ_modifiers
+from .data_loader import cached_per_data_version
+from .economy_simulator import AGE_RESEARCH_TIMES, simulate_civilizations
+
+def _age_up_timings(age_up_affordable):
+    """
+    Turn age-up affordability into click and arrival times.
+
+    An age can only be clicked once it is affordable and the previous age
+    has been reached; it is reached AGE_RESEARCH_TIMES later.
+
+    Args:
+        age_up_affordable (numpy.ndarray): Affordable times with the ages on the last axis
+
+    Returns:
+        tuple: (click, reached) arrays of the same shape, NaN if never
+    """
+    click = np.empty_like(age_up_affordable)
+    reached = np.empty_like(age_up_affordable)
+    previous = np.zeros(age_up_affordable.shape[:-1])
+    for a, age in enumerate(AGES):
+        # fmax would ignore a NaN (never reached) previous age, maximum keeps it
+        click[..., a] = np.maximum(age_up_affordable[..., a], previous)
+        reached[..., a] = click[..., a] + AGE_RESEARCH_TIMES[age]
+        previous = reached[..., a]
+    return click, reached
+
+def estimate_age_up_times(build_orders, civ_ids=None):
+    """
+    Estimate when build orders click and reach each age, for many civilizations at once.
+
+    Each build's economy is simulated once per civilization with that
+    civilization's compiled bonuses (see civ_modifiers), in one batch.
+
+    Args:
+        build_orders (list): Build order dictionaries
+        civ_ids (list): Civilizations to estimate for (defaults to all)
+
+    Returns:
+        dict: "civ_ids", plus "click" and "reached" times in seconds of shape
+            (civs, builds, ages), NaN if the age is never reached, and
+            "has_villager_data" of shape (builds,)
+    """
+    all_modifiers = get_all_civ_modifiers()
+    civ_ids = list(all_modifiers) if civ_ids is None else [c for c in civ_ids if c in all_modifiers]
+
+    simulation = simulate_civilizations(build_orders, [all_modifiers[c] for c in civ_ids])
+    click, reached = _age_up_timings(simulation["age_up_affordable"])
+
+    # Without villager data there is nothing to estimate from
+    click[:, ~simulation["has_villager_data"]] = np.nan
+    reached[:, ~simulation["has_villager_data"]] = np.nan
+    return {
+        "civ_ids": civ_ids,
+        "click": click,
+        "reached": reached,
+        "has_villager_data": simulation["has_villager_data"]
+    }
+
+class AgeUpEstimates:
+    """
+    Age-up estimates of the catalog build orders for every civilization.
+
+    Estimates are computed the first time a build is asked for, in one batch
+    for all the builds of a request that are not known yet, and kept for
+    the lifetime of the catalog.
+    """
+
+    def __init__(self, catalog):
+        """
+        Create an empty estimate cache.
+
+        Args:
+            catalog (BuildOrderCatalog): Catalog the positions refer to
+        """
+        self.catalog = catalog
+        self.civ_ids = list(get_all_civ_modifiers())
+        self._reached = {}
+        self._lock = threading.Lock()
+
+    def get(self, positions):
+        """
+        Get the estimated age arrival times of catalog builds.
+
+        Args:
+            positions (list): Catalog positions
+
+        Returns:
+            numpy.ndarray: Reached times of shape (civs, len(positions), ages), NaN if never
+        """
+        with self._lock:
+            missing = sorted({p for p in positions if p not in self._reached})
+            if missing:
+                estimates = estimate_age_up_times([self.catalog.build_orders[p] for p in missing], self.civ_ids)
+                for i, position in enumerate(missing):
+                    reached = estimates["reached"][:, i].copy()
+                    reached.setflags(write=False)
+                    self._reached[position] = reached
+            rows = [self._reached[p] for p in positions]
+
+        if not rows:
+            return np.full((len(self.civ_ids), 0, len(AGES)), np.nan)
+        return np.stack(rows, axis=1)
+
+@cached_per_data_version
+def get_age_up_estimates():
+    """
+    Get the age-up estimate cache of the catalog for the current data version.
+
+    Returns:
+        AgeUpEstimates: Shared estimate cache
+    """
+    return AgeUpEstimates(get_build_order_catalog())
+
+def _catalog_position(catalog, build_order):
+    """Get the catalog position of a build order, or None if it is not a catalog build."""
+    position = catalog.positions.get(build_order.get("id"))
+    if position is not None and catalog.build_orders[position].get("name") != build_order.get("name"):
+        return None
+    return position
+
+def get_build_age_up_times(build_orders):
+    """
+    Get the estimated age arrival times of build orders for every civilization.
+
+    Catalog builds are served from the per-data-version cache, other builds
+    (e.g. user submissions) are simulated on the spot.
+
+    Args:
+        build_orders (list): Build order dictionaries
+
+    Returns:
+        tuple: (civ_ids, reached) where reached has shape (civs, builds, ages)
+            in seconds, NaN if never reached
+    """
+    estimates = get_age_up_estimates()
+    positions = [_catalog_position(estimates.catalog, bo) for bo in build_orders]
+    reached = np.full((len(estimates.civ_ids), len(build_orders), len(AGES)), np.nan)
+
+    known = [i for i, p in enumerate(positions) if p is not None]
+    if known:
+        reached[:, known] = estimates.get([positions[i] for i in known])
+
+    others = [i for i, p in enumerate(positions) if p is None]
+    if others:
+        reached[:, others] = estimate_age_up_times(
+            [build_orders[i] for i in others], estimates.civ_ids
+        )["reached"]
+
+    return estimates.civ_ids, reached
+
+def sort_by_age_up(build_orders, civ_id, age):
+    """
+    Sort build orders by how soon they reach an age with a civilization.
+
+    Builds that never reach the age (or have no villager data) come last,
+    and ties keep their order.
+
+    Args:
+        build_orders (list): Build order dictionaries
+        civ_id: ID of the civilization
+        age (str): Age name (see AGES)
+
+    Returns:
+        list: The same build orders, fastest first
+    """
+    civ_ids, reached = get_build_age_up_times(build_orders)
+    if civ_id not in civ_ids or not build_orders:
+        return list(build_orders)
+
+    times = reached[civ_ids.index(civ_id), :, AGES.index(age)]
+    order = np.argsort(np.where(np.isnan(times), np.inf, times), kind="stable")
+    return [build_orders[i] for i in order]
@@ -0,0 +1,182 @@
+import argparse
+import json
+import sys
+
+from .data_loader import get_process_pool, load_civilizations
+from .matchup_calculator import calculate_team_matchup
+from .matchup_store import get_map_slice_index, load_map_matchup_tensor, load_matchup_table
+
+# Dataset shared by all tasks of a process. It is loaded once in the parent
+# and inherited by forked workers, or loaded once per worker otherwise.
+_dataset = {}
+
+def _load_dataset():
+    """Load the civilization and matchup data used by every analysis."""
+    if _dataset:
+        return _dataset
+
+    civilizations = load_civilizations()
+    _dataset["civs_by_id"] = {civ["id"]: civ for civ in civilizations}
+    _dataset["civs_by_name"] = {civ["name"].lower(): civ for civ in civilizations}
+
+    # Warm the matchup caches so workers find them already built
+    load_matchup_table()
+    load_map_matchup_tensor()
+    return _dataset
+
+def _resolve_team(team):
+    """Convert a list of civilization names or IDs into civilization dictionaries."""
+    dataset = _load_dataset()
+    civs = []
+    for civ in team:
+        if isinstance(civ, str) and civ.lower() in dataset["civs_by_name"]:
+            civs.append(dataset["civs_by_name"][civ.lower()])
+        elif civ in dataset["civs_by_id"]:
+            civs.append(dataset["civs_by_id"][civ])
+        else:
+            raise ValueError(f"Unknown civilization: {civ}")
+    return civs
+
+def _is_civ_or_map(value):
+    """Check whether a value can name a civilization or map (a name or an ID)."""
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+def _check_matchup(matchup):
+    """
+    Check the shape of a matchup before looking anything up.
+
+    Returns:
+        str or None: Error message, or None if the matchup is well-formed
+    """
+    if not isinstance(matchup, dict):
+        return "The matchup is not a JSON object"
+    for team in ("your_team", "enemy_team"):
+        civs = matchup.get(team, [])
+        if not isinstance(civs, list) or not all(_is_civ_or_map(civ) for civ in civs):
+            return f"{team} is not a list of civilization names or IDs"
+    map_id = matchup.get("map")
+    if map_id is not None and not _is_civ_or_map(map_id):
+        return "map is not a map name or ID"
+    return None
+
+def analyze_matchup(matchup):
+    """
+    Analyze a single team-vs-team series.
+
+    Args:
+        matchup (dict): Matchup with "your_team" and "enemy_team" lists of
+            civilization names or IDs, and optional "id" and "map" (name or ID)
+            fields, or an "error" entry for a line that could not be read
+
+    Returns:
+        dict: Team analysis, or an "error" entry if the matchup is invalid
+    """
+    if not isinstance(matchup, dict):
+        return {"id": None, "map": None, "error": _check_matchup(matchup)}
+    result = {"id": matchup.get("id"), "map": matchup.get("map")}
+
+    # Lines that could not be read are reported in their place
+    if "error" in matchup:
+        result["error"] = matchup["error"]
+        return result
+
+    error = _check_matchup(matchup)
+    if error is not None:
+        result["error"] = error
+        return result
+
+    try:
+        your_team = _resolve_team(matchup.get("your_team", []))
+        enemy_team = _resolve_team(matchup.get("enemy_team", []))
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+
+    map_id = matchup.get("map")
+    if map_id is not None and get_map_slice_index(map_id) is None:
+        result["error"] = f"Unknown map: {map_id}"
+        return result
+
+    result["your_team"] = [civ["name"] for civ in your_team]
+    result["enemy_team"] = [civ["name"] for civ in enemy_team]
+    result.update(calculate_team_matchup(your_team, enemy_team, map_id=map_id))
+    return result
+
+def analyze_bracket(matchups, processes=None, chunksize=4):
+    """
+    Analyze many matchups in parallel, yielding results in input order.
+
+    Args:
+        matchups (iterable): Matchup dictionaries (see analyze_matchup)
+        processes (int): Number of worker processes (defaults to the CPU count,
+            1 runs everything in the current process)
+        chunksize (int): Number of matchups sent to a worker at a time
+
+    Yields:
+        dict: Analysis result for each matchup
+    """
+    _load_dataset()
+
+    if processes == 1:
+        for matchup in matchups:
+            yield analyze_matchup(matchup)
+        return
+
+    with get_process_pool(processes, initializer=_load_dataset) as pool:
+        for result in pool.imap(analyze_matchup, matchups, chunksize):
+            yield result
+
+def read_matchups(lines):
+    """
+    Parse matchups from JSON Lines, skipping blank lines.
+
+    A line that is not a JSON object is yielded as an "error" entry instead,
+    so one bad line does not stop the rest of the bracket.
+
+    Args:
+        lines (iterable): Lines of text, one JSON object per line
+
+    Yields:
+        dict: Parsed matchup, or an "error" entry with the line number as "id"
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            matchup = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"id": line_number, "error": f"Invalid JSON on line {line_number}: {e.msg}"}
+            continue
+        if not isinstance(matchup, dict):
+            yield {"id": line_number, "error": f"Line {line_number} is not a JSON object"}
+            continue
+        matchup.setdefault("id", line_number)
+        yield matchup
+
+def main(argv=None):
+    """Analyze a bracket file from the command line and stream JSON Lines results."""
+    parser = argparse.ArgumentParser(
+        description="Analyze tournament matchups from a JSON Lines file."
+    )
+    parser.add_argument("input", help="JSON Lines file of matchups, or - for stdin")
+    parser.add_argument("-o", "--output", help="Output file (defaults to stdout)")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="Number of worker processes (defaults to the CPU count)")
+    args = parser.parse_args(argv)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    output_file = sys.stdout if not args.output else open(args.output, "w", encoding="utf-8")
+
+    try:
+        for result in analyze_bracket(read_matchups(input_file), processes=args.processes):
+            output_file.write(json.dumps(result) + "\n")
+            output_file.flush()
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+if __name__ == "__main__":
+    main()
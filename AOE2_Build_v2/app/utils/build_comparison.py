@@ -0,0 +1,275 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .build_timeline import AGES, RESOURCES, format_game_time, get_age_up_times, get_villager_assignments
+from .economy_simulator import SIMULATION_DURATION, TIME_STEP, simulate_economies
+
+# Most build orders compared at once
+MAX_COMPARED_BUILDS = 10
+
+# Resolution (s) of the shared time grid, and how long it runs past the last assignment
+COMPARISON_TIME_STEP = 5
+COMPARISON_MARGIN = 60
+
+# Villager counts compared between builds are multiples of this
+VILLAGER_MILESTONE_STEP = 5
+
+# Smallest difference (s) worth reporting
+MIN_REPORTED_DIFFERENCE = 10
+
+# Most points per chart line after downsampling
+CHART_MAX_POINTS = 150
+
+# How a build differs from the reference build: it reaches value (villagers,
+# or an age) of subject (a resource, "total" or "age") seconds later than the
+# reference (negative for earlier)
+TimelineDifference = namedtuple("TimelineDifference", ["build", "reference", "subject", "value", "seconds"])
+
+def interpolate_villagers(build_orders, time_grid):
+    """
+    Interpolate the villager assignments of several builds onto a time grid.
+
+    Villagers change linearly between assignments, are zero before the first
+    one and hold the last counts after the last one. All builds are interpolated with one
+    call per resource: each build's times are shifted into a range of their
+    own, so one sorted array holds every build's assignments.
+
+    Args:
+        build_orders (list): Build order dictionaries
+        time_grid (numpy.ndarray): Sorted sample times in seconds
+
+    Returns:
+        numpy.ndarray: Villagers per resource, shape (builds, len(time_grid), len(RESOURCES))
+    """
+    villagers = np.zeros((len(build_orders), len(time_grid), len(RESOURCES)))
+    assignments = [get_villager_assignments(build_order) for build_order in build_orders]
+    known = [b for b, build_assignments in enumerate(assignments) if build_assignments]
+    if not known or not len(time_grid):
+        return villagers
+
+    times = [np.array([time for time, _ in assignments[b]]) for b in known]
+    counts = np.concatenate([
+        [[counts[resource] for resource in RESOURCES] for _, counts in assignments[b]] for b in known
+    ]).astype(float)
+
+    # Builds are spaced further apart than any time, so they never mix
+    span = max(time_grid[-1], max(t[-1] for t in times)) - min(time_grid[0], min(t[0] for t in times)) + 1
+    offsets = np.arange(len(known))[:, None] * span
+    sample_times = np.stack([np.clip(time_grid, t[0], t[-1]) for t in times]) + offsets
+    assignment_times = np.concatenate([t + offset for t, offset in zip(times, offsets[:, 0])])
+
+    for r in range(len(RESOURCES)):
+        villagers[known, :, r] = np.interp(sample_times.ravel(), assignment_times, counts[:, r]).reshape(
+            len(known), len(time_grid)
+        )
+
+    # Nothing is known before a build's first assignment
+    first_times = np.array([t[0] for t in times])
+    villagers[known] *= (time_grid >= first_times[:, None])[:, :, None]
+    return villagers
+
+def align_build_timelines(build_orders, time_step=COMPARISON_TIME_STEP):
+    """
+    Put the villager and resource timelines of several builds on a shared time grid.
+
+    The grid runs until COMPARISON_MARGIN after the last villager assignment
+    of any build (at most SIMULATION_DURATION). Gathered resources come from
+    the simulated economy (see economy_simulator).
+
+    Args:
+        build_orders (list): Up to MAX_COMPARED_BUILDS build order dictionaries
+        time_step (int): Resolution of the grid in seconds (a multiple of TIME_STEP)
+
+    Returns:
+        dict: "time" (times,), "villagers" and "gathered" per resource
+            (builds, times, resources), "age_up_times" planned in the steps
+            (builds, ages) with NaN for ages not reached, and "has_villager_data" (builds,)
+
+    Raises:
+        ValueError: If more than MAX_COMPARED_BUILDS builds are given
+    """
+    if len(build_orders) > MAX_COMPARED_BUILDS:
+        raise ValueError(f"At most {MAX_COMPARED_BUILDS} build orders can be compared")
+
+    last_times = [get_villager_assignments(bo)[-1][0] for bo in build_orders if get_villager_assignments(bo)]
+    duration = min(max(last_times, default=0) + COMPARISON_MARGIN, SIMULATION_DURATION)
+    duration = int(np.ceil(duration / time_step)) * time_step
+    time_grid = np.arange(0, duration + time_step, time_step, dtype=float)
+
+    economy = simulate_economies(build_orders, duration)
+    gathered = np.cumsum(economy["income"], axis=1) * TIME_STEP
+    sample = (time_grid / TIME_STEP).astype(int)
+
+    age_up_times = np.full((len(build_orders), len(AGES)), np.nan)
+    for b, build_order in enumerate(build_orders):
+        for age, time in get_age_up_times(build_order).items():
+            age_up_times[b, AGES.index(age)] = time
+
+    return {
+        "time": time_grid,
+        "villagers": interpolate_villagers(build_orders, time_grid),
+        "gathered": gathered[:, sample],
+        "age_up_times": age_up_times,
+        "has_villager_data": economy["has_villager_data"]
+    }
+
+def first_reached(curves, time_grid, threshold):
+    """
+    Find when curves first reach a threshold, interpolating between grid times.
+
+    Args:
+        curves (numpy.ndarray): Values on the time grid, time on the last axis
+        time_grid (numpy.ndarray): Times of the last axis
+        threshold (float): Value to reach
+
+    Returns:
+        numpy.ndarray: Times of shape curves.shape[:-1], NaN if never reached
+    """
+    reached = curves >= threshold
+    first = reached.argmax(axis=-1)
+    before = np.maximum(first - 1, 0)
+
+    value = np.take_along_axis(curves, first[..., None], axis=-1)[..., 0]
+    previous = np.take_along_axis(curves, before[..., None], axis=-1)[..., 0]
+    rise = value - previous
+    fraction = np.divide(threshold - previous, rise, out=np.ones_like(rise), where=rise > 0)
+
+    times = time_grid[before] + fraction * (time_grid[first] - time_grid[before])
+    times = np.where(first == 0, time_grid[0], times)
+    return np.where(reached.any(axis=-1), times, np.nan)
+
+def compare_timelines(timelines, reference=0):
+    """
+    Find where builds pull ahead of or fall behind a reference build.
+
+    For each resource, and for all villagers together, builds are compared
+    at the highest multiple of VILLAGER_MILESTONE_STEP villagers both reach;
+    planned age-ups are compared for the ages both reach. Differences under
+    MIN_REPORTED_DIFFERENCE are left out.
+
+    Args:
+        timelines (dict): Aligned timelines (see align_build_timelines)
+        reference (int): Index of the build the others are compared to
+
+    Returns:
+        list: List of TimelineDifference, by build
+    """
+    time_grid, villagers = timelines["time"], timelines["villagers"]
+    curves = np.concatenate((villagers, villagers.sum(axis=2, keepdims=True)), axis=2)
+    subjects = list(RESOURCES) + ["total"]
+
+    # Highest milestone each build reaches, per subject
+    peaks = (curves.max(axis=1) // VILLAGER_MILESTONE_STEP) * VILLAGER_MILESTONE_STEP
+
+    differences = []
+    for b in range(len(curves)):
+        if b == reference or not timelines["has_villager_data"][b]:
+            continue
+        for s, subject in enumerate(subjects):
+            milestone = min(peaks[b, s], peaks[reference, s])
+            if milestone <= 0 or not timelines["has_villager_data"][reference]:
+                continue
+            times = first_reached(curves[[b, reference], :, s], time_grid, milestone)
+            seconds = times[0] - times[1]
+            if abs(seconds) >= MIN_REPORTED_DIFFERENCE:
+                differences.append(TimelineDifference(b, reference, subject, int(milestone), float(seconds)))
+
+        seconds = timelines["age_up_times"][b] - timelines["age_up_times"][reference]
+        for a, age in enumerate(AGES):
+            if not np.isnan(seconds[a]) and abs(seconds[a]) >= MIN_REPORTED_DIFFERENCE:
+                differences.append(TimelineDifference(b, reference, "age", age, float(seconds[a])))
+    return differences
+
+def format_difference(difference, names):
+    """
+    Describe a timeline difference, e.g. "B reaches 20 wood villagers 40 s earlier than A".
+
+    Args:
+        difference (TimelineDifference): Difference to describe
+        names (list): Names of the compared builds
+
+    Returns:
+        str: Description
+    """
+    seconds = abs(difference.seconds)
+    amount = f"{int(seconds)} s" if seconds < 60 else format_game_time(seconds)
+    direction = "earlier" if difference.seconds < 0 else "later"
+
+    if difference.subject == "age":
+        what = f"the {difference.value.capitalize()} Age"
+    elif difference.subject == "total":
+        what = f"{difference.value} villagers"
+    else:
+        what = f"{difference.value} {difference.subject} villagers"
+    return f"{names[difference.build]} reaches {what} {amount} {direction} than {names[difference.reference]}"
+
+def lttb_indices(x, ys, n_out):
+    """
+    Pick the points of several series to keep with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The points in between are
+    split into n_out - 2 buckets, and each bucket keeps the point forming the
+    largest triangle with the point kept before it and the mean of the next
+    bucket, which preserves the shape of a line with few points. Series
+    sharing x are processed together, one bucket at a time.
+
+    Args:
+        x (numpy.ndarray): Sorted x values, shape (n,)
+        ys (numpy.ndarray): y values, shape (series, n)
+        n_out (int): Number of points to keep per series
+
+    Returns:
+        numpy.ndarray: Sorted indices of the kept points, shape (series, min(n_out, n))
+    """
+    ys = np.atleast_2d(ys)
+    n_series, n = ys.shape
+    if n_out >= n or n_out < 3:
+        return np.tile(np.arange(n), (n_series, 1))
+
+    rows = np.arange(n_series)
+    kept = np.empty((n_series, n_out), dtype=np.intp)
+    kept[:, 0], kept[:, -1] = 0, n - 1
+    # Bucket i holds the points edges[i] to edges[i + 1]; the last "bucket" is the last point
+    edges = (np.floor(np.arange(n_out) * (n - 2) / (n_out - 2)) + 1).astype(int)
+    edges[-1] = n
+
+    for i in range(n_out - 2):
+        start, end, next_end = edges[i], edges[i + 1], edges[i + 2]
+        mean_x, mean_y = x[end:next_end].mean(), ys[:, end:next_end].mean(axis=1)
+
+        previous = kept[:, i]
+        x_a, y_a = x[previous], ys[rows, previous]
+        areas = np.abs((x_a[:, None] - mean_x) * (ys[:, start:end] - y_a[:, None])
+                       - (x_a[:, None] - x[start:end]) * (mean_y - y_a)[:, None])
+        kept[:, i + 1] = start + areas.argmax(axis=1)
+    return kept
+
+def get_comparison_series(timelines, metric="villagers", max_points=CHART_MAX_POINTS):
+    """
+    Get the chart lines of aligned timelines, downsampled for the browser.
+
+    Args:
+        timelines (dict): Aligned timelines (see align_build_timelines)
+        metric (str): "villagers" or "gathered"
+        max_points (int): Most points per line (see lttb_indices)
+
+    Returns:
+        list: List of dictionaries with "build" (index), "resource", and "time"
+            and "values" arrays, by resource then build
+    """
+    time_grid = timelines["time"]
+    values = np.moveaxis(timelines[metric], 2, 0)  # (resources, builds, times)
+    n_resources, n_builds, n_times = values.shape
+
+    kept = lttb_indices(time_grid, values.reshape(-1, n_times), max_points).reshape(n_resources, n_builds, -1)
+    return [
+        {
+            "build": b,
+            "resource": resource,
+            "time": time_grid[kept[r, b]],
+            "values": values[r, b, kept[r, b]]
+        }
+        for r, resource in enumerate(RESOURCES)
+        for b in range(n_builds)
+    ]
@@ -0,0 +1,254 @@
+import copy
+
+import numpy as np
+
+from .build_steps import CompiledSteps
+
+# Fields a variation never changes: it is shown as part of its base build
+VARIATION_IGNORED_FIELDS = ("id", "variations")
+
+def _step_keys(steps):
+    """
+    Get what identifies each step when aligning builds: population, time and action.
+
+    Free-text steps (from the submission forms) are identified by their text.
+    Other fields (description, villagers, ...) can differ between aligned
+    steps, which makes them "changed" rather than removed and added.
+    """
+    compiled = CompiledSteps(steps)
+    return [
+        (None if np.isnan(population) else population, None if np.isnan(time) else time,
+         " ".join(action.lower().split()))
+        for population, time, action in zip(compiled.population.tolist(), compiled.time.tolist(), compiled.actions)
+    ]
+
+def _longest_common_subsequence(a_keys, b_keys):
+    """
+    Find the longest common subsequence of two sequences of integer keys.
+
+    Each row of the length table is computed at once: a cell is the running
+    maximum of the cells above it, and of the diagonal cells plus one where
+    the keys match.
+
+    Args:
+        a_keys (numpy.ndarray): Keys of the first sequence
+        b_keys (numpy.ndarray): Keys of the second sequence
+
+    Returns:
+        list: List of matched (index in a, index in b) pairs, in order
+    """
+    n, m = len(a_keys), len(b_keys)
+    lengths = np.zeros((n + 1, m + 1), dtype=np.int32)
+    for i in range(n):
+        matches = a_keys[i] == b_keys
+        candidates = np.maximum(lengths[i, 1:], np.where(matches, lengths[i, :-1] + 1, 0))
+        lengths[i + 1, 1:] = np.maximum.accumulate(candidates)
+
+    pairs = []
+    i, j = n, m
+    while i > 0 and j > 0:
+        if a_keys[i - 1] == b_keys[j - 1] and lengths[i, j] == lengths[i - 1, j - 1] + 1:
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif lengths[i - 1, j] >= lengths[i, j - 1]:
+            i -= 1
+        else:
+            j -= 1
+    return pairs[::-1]
+
+def _match_steps(a, b):
+    """Match the steps of two step lists by population, time and action (see _step_keys)."""
+    key_ids = {}
+    a_keys = np.array([key_ids.setdefault(key, len(key_ids)) for key in _step_keys(a)], dtype=np.int64)
+    b_keys = np.array([key_ids.setdefault(key, len(key_ids)) for key in _step_keys(b)], dtype=np.int64)
+
+    # Edits are usually local, so the shared start and end are matched without the table
+    start = 0
+    while start < min(len(a), len(b)) and a_keys[start] == b_keys[start]:
+        start += 1
+    end = 0
+    while end < min(len(a), len(b)) - start and a_keys[len(a) - 1 - end] == b_keys[len(b) - 1 - end]:
+        end += 1
+
+    middle = _longest_common_subsequence(a_keys[start:len(a) - end], b_keys[start:len(b) - end])
+    return (
+        [(i, i) for i in range(start)]
+        + [(i + start, j + start) for i, j in middle]
+        + [(len(a) - end + k, len(b) - end + k) for k in range(end)]
+    )
+
+def align_steps(a, b):
+    """
+    Align the steps of two builds (or two versions of a build) for display.
+
+    Args:
+        a (list): Steps of the base build
+        b (list): Steps of the other build
+
+    Returns:
+        list: List of dictionaries with "status" ("same", "changed", "removed"
+            or "added"), "old" and "new" steps (None where there is none), and
+            their "old_index" and "new_index", in step order
+    """
+    rows = []
+    i = j = 0
+    for match_i, match_j in _match_steps(a, b) + [(len(a), len(b))]:
+        rows.extend({"status": "removed", "old": a[k], "new": None, "old_index": k, "new_index": None}
+                    for k in range(i, match_i))
+        rows.extend({"status": "added", "old": None, "new": b[k], "old_index": None, "new_index": k}
+                    for k in range(j, match_j))
+        if match_i < len(a):
+            rows.append({
+                "status": "same" if a[match_i] == b[match_j] else "changed",
+                "old": a[match_i],
+                "new": b[match_j],
+                "old_index": match_i,
+                "new_index": match_j
+            })
+        i, j = match_i + 1, match_j + 1
+    return rows
+
+def diff_steps(a, b):
+    """
+    Get the step hunks that turn one step list into another.
+
+    Args:
+        a (list): Steps of the base build
+        b (list): Steps of the other build
+
+    Returns:
+        list: List of hunks {"at": index in a, "delete": number of steps of a
+            to remove there, "insert": steps of b to put in their place}, in order
+    """
+    hunks = []
+    position = 0
+    for row in align_steps(a, b):
+        if row["status"] == "same":
+            position += 1
+            continue
+        # Rows between the same two unchanged steps make one hunk
+        if not hunks or hunks[-1]["at"] + hunks[-1]["delete"] != position:
+            hunks.append({"at": position, "delete": 0, "insert": []})
+        if row["status"] != "added":
+            hunks[-1]["delete"] += 1
+            position += 1
+        if row["status"] != "removed":
+            hunks[-1]["insert"].append(copy.deepcopy(row["new"]))
+    return hunks
+
+def diff_build_orders(base, other, ignore=()):
+    """
+    Get the patch that turns one build order into another.
+
+    Args:
+        base (dict): Build order to start from
+        other (dict): Build order to end with
+        ignore (tuple): Fields to leave out of the patch
+
+    Returns:
+        dict: Patch with "steps" hunks (see diff_steps), the fields to "set"
+            to other's values and the fields to "unset"
+    """
+    fields_set = {
+        key: copy.deepcopy(value) for key, value in other.items()
+        if key != "steps" and key not in ignore and (key not in base or base[key] != value)
+    }
+    fields_unset = [key for key in base if key != "steps" and key not in ignore and key not in other]
+    return {
+        "steps": diff_steps(base.get("steps") or [], other.get("steps") or []),
+        "set": fields_set,
+        "unset": fields_unset
+    }
+
+def is_empty_patch(patch):
+    """
+    Check whether a patch changes nothing.
+
+    Args:
+        patch (dict): Patch (see diff_build_orders)
+
+    Returns:
+        bool: Whether applying the patch leaves a build order as it is
+    """
+    return not (patch.get("steps") or patch.get("set") or patch.get("unset"))
+
+def apply_patch(base, patch):
+    """
+    Apply a patch to a build order.
+
+    Args:
+        base (dict): Build order the patch was made against (left unchanged)
+        patch (dict): Patch (see diff_build_orders)
+
+    Returns:
+        dict: Patched copy of the build order
+
+    Raises:
+        ValueError: If the hunks do not fit the steps of the build order
+    """
+    patched = copy.deepcopy(base)
+    steps = list(patched.get("steps") or [])
+
+    # From the last hunk back, so the positions of the earlier ones stay valid
+    end = len(steps)
+    for hunk in sorted(patch.get("steps", []), key=lambda h: h["at"], reverse=True):
+        if hunk["at"] < 0 or hunk["at"] + hunk["delete"] > end:
+            raise ValueError(f"Step hunk at {hunk['at']} does not fit a build order with {len(steps)} steps")
+        steps[hunk["at"]:hunk["at"] + hunk["delete"]] = copy.deepcopy(hunk["insert"])
+        end = hunk["at"]
+
+    if patch.get("steps") or "steps" in patched:
+        patched["steps"] = steps
+    patched.update(copy.deepcopy(patch.get("set", {})))
+    for key in patch.get("unset", []):
+        patched.pop(key, None)
+    return patched
+
+def make_variation(base, variant, name, description=""):
+    """
+    Store a variant of a build order as a variation of it: a patch against the base build.
+
+    Args:
+        base (dict): Base build order
+        variant (dict): Build order the variation plays out as
+        name (str): Name of the variation
+        description (str): What the variation is for
+
+    Returns:
+        dict: Variation with "name", "description" and "patch"
+    """
+    return {
+        "name": name,
+        "description": description,
+        "patch": diff_build_orders(base, variant, ignore=VARIATION_IGNORED_FIELDS)
+    }
+
+def get_variation_build(build_order, variation):
+    """
+    Get the build order a variation plays out as.
+
+    Args:
+        build_order (dict): Base build order
+        variation (dict): Variation with a "patch" (see make_variation)
+
+    Returns:
+        dict: Patched build order without variations of its own
+    """
+    variant = apply_patch(build_order, variation.get("patch") or {})
+    variant.pop("variations", None)
+    return variant
+
+def get_variation_changes(build_order, variation):
+    """
+    Get the steps a variation changes, for highlighting.
+
+    Args:
+        build_order (dict): Base build order
+        variation (dict): Variation with a "patch" (see make_variation)
+
+    Returns:
+        list: Aligned step rows (see align_steps) other than the unchanged ones
+    """
+    variant = get_variation_build(build_order, variation)
+    rows = align_steps(build_order.get("steps") or [], variant.get("steps") or [])
+    return [row for row in rows if row["status"] != "same"]
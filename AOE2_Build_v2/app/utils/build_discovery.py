@@ -0,0 +1,402 @@
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import operator
+import sys
+
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .build_timeline import RESOURCES, format_game_time, get_villager_assignments
+from .data_loader import cached_per_data_version, get_process_pool
+
+# Times (s) at which timelines are compared: every 30 seconds up to 25 minutes
+TIMELINE_TIME_GRID = np.arange(0, 25 * 60 + 1, 30, dtype=float)
+
+# Default number of clusters, and of timelines vectorized and fitted at a time
+DISCOVERY_CLUSTERS = 32
+DISCOVERY_BATCH_SIZE = 4096
+
+# A cluster is a new pattern if it is at least this share of the timelines and
+# its nearest catalog build is further away than NEW_PATTERN_DISTANCE
+NEW_PATTERN_MIN_SHARE = 0.01
+NEW_PATTERN_DISTANCE = 2.0
+
+# Times (s) at which the villagers of a pattern are reported
+PATTERN_SUMMARY_TIMES = (300, 600, 900)
+
+def vectorize_timelines(records, time_grid=TIMELINE_TIME_GRID):
+    """
+    Sample the villager timelines of build orders or match records on a time grid.
+
+    Records are read like build orders (see get_villager_assignments): a
+    "villager_assignments" list, or the villager assignments of the steps.
+    Each grid time takes the last assignment at or before it (zero before
+    the first one). The assignment times of all records are searched at
+    once: each record's times are shifted into a range of their own, so
+    one sorted array holds every record's assignments.
+
+    Args:
+        records (list): Build order or match record dictionaries (anything
+            else is treated as a record without villager data)
+        time_grid (numpy.ndarray): Sorted sample times in seconds
+
+    Returns:
+        tuple: (vectors, kept) where vectors has shape (records with villager
+            data, len(time_grid) * len(RESOURCES)) in float32, time-major, and
+            kept holds the indices of those records
+    """
+    assignments = [get_villager_assignments(record) if isinstance(record, dict) else [] for record in records]
+    kept = np.array([i for i, record_assignments in enumerate(assignments) if record_assignments], dtype=np.intp)
+    vectors = np.zeros((len(kept), len(time_grid), len(RESOURCES)), dtype=np.float32)
+    if not len(kept) or not len(time_grid):
+        return vectors.reshape(len(kept), len(time_grid) * len(RESOURCES)), kept
+
+    lengths = np.array([len(assignments[i]) for i in kept])
+    entries = [entry for i in kept for entry in assignments[i]]
+    times = np.fromiter((time for time, _ in entries), dtype=float, count=len(entries))
+    get_counts = operator.itemgetter(*RESOURCES)
+    counts = np.array([get_counts(entry_counts) for _, entry_counts in entries], dtype=np.float32)
+    starts = np.cumsum(lengths) - lengths
+
+    # Records are spaced further apart than any time, so they never mix
+    span = max(time_grid[-1], times.max()) - min(time_grid[0], times.min()) + 1
+    offsets = np.arange(len(kept)) * span
+    assignment_times = times + np.repeat(offsets, lengths)
+    latest = np.searchsorted(assignment_times, (time_grid + offsets[:, None]).ravel(), side="right") - 1
+    latest = latest.reshape(len(kept), len(time_grid))
+
+    # Before its first assignment a record finds the previous record's last one
+    known = latest >= starts[:, None]
+    vectors[known] = counts[latest[known]]
+    return vectors.reshape(len(kept), -1), kept
+
+def _squared_distances(vectors, centroids):
+    """Get the squared distances of vectors (n, d) to centroids (k, d), shape (n, k)."""
+    distances = (vectors * vectors).sum(axis=1)[:, None] - 2 * vectors @ centroids.T
+    distances += (centroids * centroids).sum(axis=1)[None, :]
+    return np.maximum(distances, 0)
+
+class TimelineClusters:
+    """
+    Mini-batch k-means over villager timeline vectors.
+
+    Timelines are fitted one batch at a time: each batch is assigned to the
+    nearest centroids, and each centroid moves to the running mean of every
+    timeline assigned to it so far (its learning rate is one over its
+    count). Only the centroids and their counts are kept between batches,
+    so memory does not grow with the number of timelines.
+    """
+
+    def __init__(self, n_clusters=DISCOVERY_CLUSTERS, seed=0):
+        """
+        Create an unfitted model.
+
+        Args:
+            n_clusters (int): Number of clusters (fewer if the first batch has
+                fewer distinct timelines)
+            seed (int): Seed of the random initialization
+        """
+        self.n_clusters = n_clusters
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.counts = None
+
+    def _initialize(self, vectors):
+        """Pick the initial centroids from a batch with k-means++."""
+        distinct = np.unique(vectors, axis=0)
+        n_clusters = min(self.n_clusters, len(distinct))
+
+        centroids = [distinct[self.rng.integers(len(distinct))]]
+        closest = _squared_distances(distinct, centroids[0][None, :])[:, 0]
+        for _ in range(1, n_clusters):
+            # Far timelines are more likely to start a cluster
+            choice = self.rng.choice(len(distinct), p=closest / closest.sum())
+            centroids.append(distinct[choice])
+            closest = np.minimum(closest, _squared_distances(distinct, distinct[choice][None, :])[:, 0])
+
+        self.centroids = np.array(centroids, dtype=np.float32)
+        self.counts = np.zeros(n_clusters, dtype=np.int64)
+
+    def predict(self, vectors):
+        """
+        Assign timelines to their nearest clusters.
+
+        Args:
+            vectors (numpy.ndarray): Timeline vectors, shape (n, d)
+
+        Returns:
+            tuple: (labels, squared distances to the assigned centroids)
+        """
+        distances = _squared_distances(vectors, self.centroids)
+        labels = distances.argmin(axis=1)
+        return labels, distances[np.arange(len(vectors)), labels]
+
+    def partial_fit(self, vectors):
+        """
+        Update the clusters with a batch of timelines.
+
+        Args:
+            vectors (numpy.ndarray): Timeline vectors, shape (n, d)
+
+        Returns:
+            TimelineClusters: This model
+        """
+        if not len(vectors):
+            return self
+        if self.centroids is None:
+            self._initialize(vectors)
+
+        labels, distances = self.predict(vectors)
+        batch_counts = np.bincount(labels, minlength=len(self.centroids))
+        assigned = np.zeros((len(self.centroids), len(vectors)), dtype=np.float32)
+        assigned[labels, np.arange(len(vectors))] = 1
+        sums = assigned @ vectors
+
+        # Running mean: each centroid moves towards its new timelines by their share of its count
+        self.counts += batch_counts
+        moved = batch_counts > 0
+        step = (sums[moved] - batch_counts[moved, None] * self.centroids[moved]) / self.counts[moved, None]
+        self.centroids[moved] += step
+
+        # Clusters nothing has joined yet restart at the worst-fitted timelines
+        empty = np.flatnonzero(self.counts == 0)
+        if len(empty):
+            worst = np.argsort(-distances)[:len(empty)]
+            self.centroids[empty[:len(worst)]] = vectors[worst]
+        return self
+
+def _vectorize_batch(records):
+    """Vectorize a batch of records, returning the vectors, the number of records read and how many were not records."""
+    invalid = sum(not isinstance(record, dict) for record in records)
+    return vectorize_timelines(records)[0], len(records), invalid
+
+def _vectorized_batches(records, batch_size, processes):
+    """
+    Vectorize records in batches, in parallel if asked.
+
+    At most two batches per worker are in flight, so a long stream of
+    records is never read far ahead of the fitting.
+
+    Yields:
+        tuple: (vectors, number of records, number of invalid records) of
+            each batch, in input order
+    """
+    batches = iter(lambda: list(itertools.islice(records, batch_size)), [])
+    if processes == 1:
+        for batch in batches:
+            yield _vectorize_batch(batch)
+        return
+
+    with get_process_pool(processes) as pool:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append(pool.apply_async(_vectorize_batch, (batch,)))
+            if len(pending) >= 2 * (processes or multiprocessing.cpu_count()):
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+@cached_per_data_version
+def get_catalog_timelines():
+    """
+    Get the villager timeline vectors of the catalog builds for the current data version.
+
+    Returns:
+        tuple: (vectors, positions) of the catalog builds with villager data (read-only)
+    """
+    catalog = get_build_order_catalog()
+    vectors, positions = vectorize_timelines(catalog.build_orders)
+    vectors.setflags(write=False)
+    positions.setflags(write=False)
+    return vectors, positions
+
+def timeline_distance(squared_distance, time_grid=TIMELINE_TIME_GRID):
+    """
+    Convert a squared vector distance to villagers: the root mean square over
+    the grid times of the distance between the villager counts.
+
+    Args:
+        squared_distance: Squared distance(s) between timeline vectors
+        time_grid (numpy.ndarray): Time grid of the vectors
+
+    Returns:
+        Distance(s) in villagers
+    """
+    return np.sqrt(np.asarray(squared_distance) / len(time_grid))
+
+def _pattern_summary(centroid, time_grid=TIMELINE_TIME_GRID):
+    """Get the villagers per resource of a cluster centroid at PATTERN_SUMMARY_TIMES."""
+    timeline = centroid.reshape(len(time_grid), len(RESOURCES))
+    summary = {}
+    for time in PATTERN_SUMMARY_TIMES:
+        index = np.searchsorted(time_grid, time, side="right") - 1
+        if index >= 0:
+            summary[format_game_time(time)] = {
+                resource: round(float(count), 1) for resource, count in zip(RESOURCES, timeline[index])
+            }
+    return summary
+
+def describe_clusters(model, total):
+    """
+    Label clusters by their nearest catalog build and flag new patterns.
+
+    Args:
+        model (TimelineClusters): Fitted clusters
+        total (int): Number of timelines the clusters were fitted on
+
+    Returns:
+        list: List of pattern dictionaries with "cluster", "size", "share",
+            "nearest_build_id", "nearest_build_name", "distance" (villagers,
+            see timeline_distance), "new_pattern" and "villagers" (see
+            PATTERN_SUMMARY_TIMES), largest first
+    """
+    catalog = get_build_order_catalog()
+    catalog_vectors, positions = get_catalog_timelines()
+    if len(positions):
+        distances = _squared_distances(model.centroids, catalog_vectors)
+        nearest = distances.argmin(axis=1)
+        nearest_distances = timeline_distance(distances[np.arange(len(nearest)), nearest])
+
+    patterns = []
+    for c in np.argsort(-model.counts, kind="stable"):
+        share = model.counts[c] / total if total else 0.0
+        pattern = {
+            "cluster": int(c),
+            "size": int(model.counts[c]),
+            "share": float(share),
+            "nearest_build_id": None,
+            "nearest_build_name": None,
+            "distance": None,
+            "new_pattern": False,
+            "villagers": _pattern_summary(model.centroids[c])
+        }
+        if len(positions):
+            build_order = catalog.build_orders[positions[nearest[c]]]
+            pattern["nearest_build_id"] = build_order.get("id")
+            pattern["nearest_build_name"] = build_order.get("name")
+            pattern["distance"] = round(float(nearest_distances[c]), 2)
+            pattern["new_pattern"] = bool(
+                share >= NEW_PATTERN_MIN_SHARE and nearest_distances[c] > NEW_PATTERN_DISTANCE
+            )
+        else:
+            pattern["new_pattern"] = bool(share >= NEW_PATTERN_MIN_SHARE)
+        patterns.append(pattern)
+    return patterns
+
+def discover_build_patterns(records=(), n_clusters=DISCOVERY_CLUSTERS, batch_size=DISCOVERY_BATCH_SIZE,
+                            include_catalog=True, processes=1, seed=0):
+    """
+    Cluster villager timelines to find the common builds they follow.
+
+    Timelines are streamed in batches of batch_size: each batch is
+    vectorized (see vectorize_timelines) and fitted with mini-batch k-means
+    (see TimelineClusters), so memory stays bounded however many records
+    there are. Cluster sizes are counted while fitting.
+
+    Args:
+        records (iterable): Build order or match record dictionaries (None
+            or anything else for a record that could not be read)
+        n_clusters (int): Number of clusters
+        batch_size (int): Number of records vectorized and fitted at a time
+        include_catalog (bool): Whether to cluster the catalog builds too (first)
+        processes (int): Number of worker processes vectorizing batches
+            (None for the CPU count, 1 runs everything in the current process)
+        seed (int): Seed of the cluster initialization
+
+    Returns:
+        dict: "timelines" clustered, "skipped" records without villager
+            data, "invalid" records among them that could not be read at all,
+            and "patterns" (see describe_clusters)
+    """
+    # Loaded up front so the workers share it (see get_process_pool)
+    catalog = get_build_order_catalog()
+    get_catalog_timelines()
+
+    records = iter(records)
+    if include_catalog:
+        records = itertools.chain(catalog.build_orders, records)
+
+    model = TimelineClusters(n_clusters, seed=seed)
+    timelines = skipped = invalid = 0
+    for vectors, n_records, n_invalid in _vectorized_batches(records, batch_size, processes):
+        model.partial_fit(vectors)
+        timelines += len(vectors)
+        skipped += n_records - len(vectors)
+        invalid += n_invalid
+
+    patterns = describe_clusters(model, timelines) if model.centroids is not None else []
+    return {"timelines": timelines, "skipped": skipped, "invalid": invalid, "patterns": patterns}
+
+def read_timelines(lines):
+    """
+    Parse match records from JSON Lines, skipping blank lines.
+
+    A line that is not valid JSON yields None, so a bad line in a long
+    stream is counted as skipped instead of stopping the run.
+
+    Args:
+        lines (iterable): Lines of text, one JSON object per line with a
+            "villager_assignments" list (or build order steps)
+
+    Yields:
+        dict or None: Parsed record (not checked to be an object), or None
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield None
+
+def main(argv=None):
+    """Cluster the villager timelines of the catalog and of match records from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Find common builds by clustering villager timelines, and report new patterns as JSON Lines."
+    )
+    parser.add_argument("input", nargs="?", help="JSON Lines file of match records, or - for stdin "
+                                                 "(defaults to the catalog only)")
+    parser.add_argument("-o", "--output", help="Output file (defaults to stdout)")
+    parser.add_argument("-k", "--clusters", type=int, default=DISCOVERY_CLUSTERS, help="Number of clusters")
+    parser.add_argument("-b", "--batch-size", type=int, default=DISCOVERY_BATCH_SIZE,
+                        help="Number of timelines fitted at a time")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="Number of worker processes (defaults to the CPU count)")
+    parser.add_argument("--no-catalog", action="store_true", help="Leave the catalog builds out")
+    parser.add_argument("--new-only", action="store_true", help="Only report new patterns")
+    args = parser.parse_args(argv)
+
+    if args.input is None:
+        input_file = None
+    else:
+        input_file = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    output_file = sys.stdout if not args.output else open(args.output, "w", encoding="utf-8")
+
+    try:
+        result = discover_build_patterns(
+            read_timelines(input_file) if input_file is not None else (),
+            n_clusters=args.clusters,
+            batch_size=args.batch_size,
+            include_catalog=not args.no_catalog,
+            processes=args.processes
+        )
+        for pattern in result["patterns"]:
+            if pattern["new_pattern"] or not args.new_only:
+                output_file.write(json.dumps(pattern) + "\n")
+    finally:
+        if input_file not in (None, sys.stdin):
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    new_patterns = sum(pattern["new_pattern"] for pattern in result["patterns"])
+    print(f"Clustered {result['timelines']} timelines into {len(result['patterns'])} patterns, "
+          f"{new_patterns} new; skipped {result['skipped']} records "
+          f"({result['invalid']} unreadable, the rest without villager data)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
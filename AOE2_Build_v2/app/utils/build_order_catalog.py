@@ -0,0 +1,205 @@
+import re
+
+import numpy as np
+
+from .build_steps import as_number, get_compiled_steps
+from .build_timeline import AGES
+from .data_loader import (
+    cached_per_data_version,
+    freeze_data,
+    get_data_version,
+    load_build_orders,
+    load_civilizations
+)
+
+# Difficulty levels from easiest to hardest, for range comparisons
+DIFFICULTY_LEVELS = ("beginner", "intermediate", "advanced", "expert")
+
+class BuildOrderCatalog:
+    """
+    Immutable view of all build orders for one data version.
+
+    The catalog is shared between sessions, so its build orders are frozen:
+    anything derived from them (scores, rankings) has to live outside of it.
+
+    Alongside the build orders it keeps the arrays used to filter and score
+    them without a Python loop over every build:
+
+    - type and difficulty codes, and per-map and per-civ position arrays
+    - the build x archetype incidence of "strong_against", stored sparsely
+      as the positions of the builds listing each archetype
+    - the dense rank of each build's meta relevance
+    - a specialty vector per build (see _build_specialty_vectors), used to
+      score how well a build complements a team
+    - numeric columns for range filters (age-up times, difficulty level,
+      execution time; NaN when unknown) and lowercase search text
+    - the compiled steps of each build (see build_steps), compiled once when
+      the catalog is loaded
+    """
+
+    def __init__(self, build_orders, version=None, civilizations=()):
+        """
+        Create a catalog from loaded build orders.
+
+        Args:
+            build_orders (list): List of build order dictionaries
+            version (tuple): Data version the build orders were loaded from
+            civilizations (list): Civilization dictionaries, for the build specialty vectors
+        """
+        self.version = version
+        self.build_orders = tuple(freeze_data(bo) for bo in build_orders)
+        self.positions = {bo["id"]: i for i, bo in enumerate(self.build_orders)}
+        self.compiled_steps = tuple(get_compiled_steps(bo) for bo in self.build_orders)
+        self._build_index_arrays()
+        self._build_specialty_vectors(civilizations)
+
+    def __len__(self):
+        return len(self.build_orders)
+
+    def __iter__(self):
+        return iter(self.build_orders)
+
+    def get(self, build_order_id):
+        """
+        Get a build order by ID.
+
+        Args:
+            build_order_id: ID of the build order
+
+        Returns:
+            dict or None: Read-only build order, or None if not in the catalog
+        """
+        position = self.positions.get(build_order_id)
+        return self.build_orders[position] if position is not None else None
+
+    def _build_index_arrays(self):
+        """Precompute the filter and scoring arrays of the catalog."""
+        n_builds = len(self.build_orders)
+        self.types, self.type_codes = _encode([bo.get("type", "") for bo in self.build_orders])
+        self.difficulties, self.difficulty_codes = _encode(
+            [bo.get("difficulty", "") for bo in self.build_orders]
+        )
+
+        map_positions = {}
+        ideal_positions = {}
+        compatible_positions = {}
+        archetype_positions = {}
+
+        for position, bo in enumerate(self.build_orders):
+            for map_name in {m.casefold() for m in bo.get("suitable_maps", [])}:
+                map_positions.setdefault(map_name, []).append(position)
+            for civ_id in set(bo.get("ideal_civilizations", [])):
+                ideal_positions.setdefault(civ_id, []).append(position)
+            for civ_id in set(bo.get("compatible_civilizations", [])):
+                compatible_positions.setdefault(civ_id, []).append(position)
+
+            # Repeated archetypes count once per listing, like the original scoring
+            for archetype in bo.get("strong_against", []):
+                archetype_positions.setdefault(archetype.lower(), []).append(position)
+
+        self.map_positions = _as_position_arrays(map_positions)
+        self.ideal_positions = _as_position_arrays(ideal_positions)
+        self.compatible_positions = _as_position_arrays(compatible_positions)
+        self.archetype_positions = _as_position_arrays(archetype_positions)
+
+        self.meta_relevance = np.array(
+            [as_number(bo.get("meta_relevance", 0), 0.0) for bo in self.build_orders], dtype=float
+        ).reshape(n_builds)
+        _, meta_ranks = np.unique(self.meta_relevance, return_inverse=True)
+        self.meta_ranks = meta_ranks.astype(np.int64).reshape(n_builds)
+
+        self.age_up_times = np.array(
+            [[steps.age_up_times().get(age, np.nan) for age in AGES] for steps in self.compiled_steps],
+            dtype=float
+        ).reshape(n_builds, len(AGES))
+        self.difficulty_levels = np.array(
+            [_difficulty_level(bo.get("difficulty")) for bo in self.build_orders], dtype=float
+        ).reshape(n_builds)
+        self.execution_times = np.array(
+            [as_number(bo.get("execution_time")) for bo in self.build_orders], dtype=float
+        ).reshape(n_builds)
+        self.search_text = np.array(
+            [f"{bo.get('name', '')} {bo.get('description', '')}".casefold() for bo in self.build_orders],
+            dtype=str
+        ).reshape(n_builds)
+
+        for array in (self.type_codes, self.difficulty_codes, self.meta_relevance, self.meta_ranks,
+                      self.age_up_times, self.difficulty_levels, self.execution_times, self.search_text):
+            array.setflags(write=False)
+
+    def _build_specialty_vectors(self, civilizations):
+        """
+        Precompute the specialty vector of every build.
+
+        A build plays to the specialties of its ideal civilizations and to
+        any specialty named in its type or name (e.g. "archers" for an
+        "Archer Rush"). Each row of specialty_vectors spreads a total weight
+        of 1 over those specialties, or is all zeros if the build has none.
+        """
+        civ_specialties = {
+            civ["id"]: [spec.casefold() for spec in civ.get("specialty", []) if spec]
+            for civ in civilizations
+        }
+        self.specialties = {}
+        for specs in civ_specialties.values():
+            for spec in specs:
+                self.specialties.setdefault(spec, len(self.specialties))
+
+        patterns = {spec: _specialty_pattern(spec) for spec in self.specialties}
+
+        self.specialty_vectors = np.zeros((len(self.build_orders), len(self.specialties)), dtype=float)
+        for position, bo in enumerate(self.build_orders):
+            row = self.specialty_vectors[position]
+            for civ_id in bo.get("ideal_civilizations", []):
+                for spec in civ_specialties.get(civ_id, []):
+                    row[self.specialties[spec]] += 1
+            text = f"{bo.get('type', '')} {bo.get('name', '')}".casefold()
+            for spec, column in self.specialties.items():
+                if patterns[spec].search(text):
+                    row[column] += 1
+            if row.sum() > 0:
+                row /= row.sum()
+        self.specialty_vectors.setflags(write=False)
+
+def _specialty_pattern(spec):
+    """
+    Compile the pattern that finds a specialty in a build's type or name.
+
+    Every word of the specialty has to appear as a whole word, singular or
+    plural ("archer" matches the "archers" specialty, "ram" does not match
+    "Ramp" and "monk" does not match "Monkey").
+    """
+    words = [re.escape(word.rstrip("s")) + "s?" for word in spec.split()]
+    return re.compile(r"\b" + r"\s+".join(words) + r"\b")
+
+def _difficulty_level(difficulty):
+    """Get the position of a difficulty in DIFFICULTY_LEVELS, or NaN if unknown."""
+    difficulty = str(difficulty or "").casefold()
+    return DIFFICULTY_LEVELS.index(difficulty) if difficulty in DIFFICULTY_LEVELS else np.nan
+
+def _encode(values):
+    """Encode case-folded strings as integer codes, returning (lookup, codes)."""
+    lookup = {}
+    codes = np.array(
+        [lookup.setdefault(value.casefold(), len(lookup)) for value in values], dtype=np.intp
+    )
+    return lookup, codes
+
+def _as_position_arrays(positions):
+    """Convert lists of catalog positions into read-only integer arrays."""
+    arrays = {}
+    for key, values in positions.items():
+        array = np.array(values, dtype=np.intp)
+        array.setflags(write=False)
+        arrays[key] = array
+    return arrays
+
+@cached_per_data_version
+def get_build_order_catalog():
+    """
+    Get the build order catalog for the current data version.
+
+    Returns:
+        BuildOrderCatalog: Shared, read-only catalog
+    """
+    return BuildOrderCatalog(load_build_orders(), get_data_version(), load_civilizations())
@@ -0,0 +1,254 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from .build_order_catalog import DIFFICULTY_LEVELS, get_build_order_catalog
+from .build_timeline import AGES, parse_game_time
+from .data_loader import cached_per_data_version, load_civilizations
+
+# Help text for the query syntax, shown next to search boxes
+QUERY_HELP = (
+    'Combine terms like civ:Franks map:Arabia type:"Fast Castle" against:archers '
+    "feudal<9:30 castle<=17:00 difficulty<=Intermediate meta>=8 time<15. "
+    "Prefix a term with - to exclude it; other words search names and descriptions."
+)
+
+# Fields answered from the catalog's position indexes
+INDEX_FIELDS = {"civ": "civ", "civilization": "civ", "map": "map", "type": "type", "against": "against"}
+
+# Fields compared against a numeric catalog column
+RANGE_FIELDS = {
+    "difficulty": "difficulty",
+    "meta": "meta",
+    "time": "time",
+    "feudal": "feudal",
+    "castle": "castle",
+    "imperial": "imperial"
+}
+
+OPERATORS = {
+    "=": np.equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal
+}
+
+# Optional "-", then either field + operator + value, or a bare value
+_TERM_PATTERN = re.compile(r'\s*(-?)(?:([A-Za-z_]+)(<=|>=|:|=|<|>))?("[^"]*"|[^\s"]+)')
+
+QueryTerm = namedtuple("QueryTerm", ["field", "operator", "value", "negated"])
+
+class QueryError(ValueError):
+    """Raised when a build order query cannot be parsed."""
+
+def parse_query(query):
+    """
+    Parse a build order query into terms.
+
+    Args:
+        query (str): Query such as 'civ:Franks type:"Fast Castle" feudal<9:30'
+
+    Returns:
+        list: List of QueryTerm, with field None for free-text terms
+
+    Raises:
+        QueryError: If the query has an unknown field, operator or value
+    """
+    terms = []
+    position = 0
+    query = query.strip()
+
+    while position < len(query):
+        match = _TERM_PATTERN.match(query, position)
+        if not match or match.end() == position:
+            raise QueryError(f"Cannot parse query near: {query[position:]}")
+        position = match.end()
+
+        negated, field, operator, value = match.groups()
+        value = value[1:-1] if value.startswith('"') else value
+        if not value:
+            raise QueryError("Empty value in query")
+
+        if field is None:
+            terms.append(QueryTerm(None, None, value.casefold(), bool(negated)))
+            continue
+
+        field = field.lower()
+        operator = "=" if operator == ":" else operator
+        if field in INDEX_FIELDS:
+            if operator != "=":
+                raise QueryError(f"{field} only supports ':' or '='")
+            terms.append(QueryTerm(INDEX_FIELDS[field], operator, value.casefold(), bool(negated)))
+        elif field in RANGE_FIELDS:
+            field = RANGE_FIELDS[field]
+            terms.append(QueryTerm(field, operator, _parse_range_value(field, value), bool(negated)))
+        else:
+            raise QueryError(f"Unknown field: {field}")
+
+    return terms
+
+def _parse_range_value(field, value):
+    """Convert the value of a range term to a number comparable with its column."""
+    if field == "difficulty":
+        if value.casefold() not in DIFFICULTY_LEVELS:
+            raise QueryError(f"Unknown difficulty: {value}")
+        return float(DIFFICULTY_LEVELS.index(value.casefold()))
+
+    if field in AGES:
+        seconds = parse_game_time(value)
+        if seconds is None:
+            raise QueryError(f"Invalid time for {field}: {value} (use m:ss)")
+        return seconds
+
+    try:
+        return float(value)
+    except ValueError:
+        raise QueryError(f"Invalid number for {field}: {value}") from None
+
+class QueryPlan:
+    """
+    Compiled build order query.
+
+    Terms are split by how they are evaluated:
+
+    - index terms (civ, map, type, against) look up position arrays in the
+      catalog; the smallest gives the candidates, the others filter them
+    - range terms compare a numeric catalog column for the remaining
+      candidates only, as one vectorized comparison each
+    - free-text terms search the lowercase name and description last
+    """
+
+    def __init__(self, terms):
+        """
+        Create a plan from parsed terms.
+
+        Args:
+            terms (list): List of QueryTerm
+        """
+        self.terms = tuple(terms)
+        self.index_terms = tuple(t for t in terms if t.field in INDEX_FIELDS.values())
+        self.range_terms = tuple(t for t in terms if t.field in RANGE_FIELDS.values())
+        self.text_terms = tuple(t for t in terms if t.field is None)
+
+    def execute(self, catalog):
+        """
+        Find the build orders of a catalog that match the query.
+
+        Args:
+            catalog (BuildOrderCatalog): Catalog to search
+
+        Returns:
+            numpy.ndarray: Sorted catalog positions of the matching build orders
+        """
+        n_builds = len(catalog)
+        lookups = [(_lookup_positions(catalog, term), term) for term in self.index_terms]
+        positive = sorted((l for l in lookups if not l[1].negated), key=lambda l: len(l[0]))
+        negative = [l for l in lookups if l[1].negated]
+
+        # Start from the most selective lookup, so later steps touch fewer builds
+        if positive:
+            candidates = np.unique(positive[0][0])
+        else:
+            candidates = np.arange(n_builds)
+
+        for positions, term in positive[1:] + negative:
+            member = np.zeros(n_builds, dtype=bool)
+            member[positions] = True
+            keep = member[candidates]
+            candidates = candidates[~keep if term.negated else keep]
+
+        for term in self.range_terms:
+            keep = OPERATORS[term.operator](_range_column(catalog, term.field)[candidates], term.value)
+            candidates = candidates[~keep if term.negated else keep]
+
+        for term in self.text_terms:
+            keep = np.char.find(catalog.search_text[candidates], term.value) >= 0
+            candidates = candidates[~keep if term.negated else keep]
+
+        return candidates
+
+@cached_per_data_version
+def _get_civ_ids_by_name():
+    """Map lowercase civilization names to IDs."""
+    return {civ["name"].casefold(): civ["id"] for civ in load_civilizations()}
+
+def _lookup_positions(catalog, term):
+    """Get the catalog positions matching an index term (may contain duplicates)."""
+    empty = np.array([], dtype=np.intp)
+
+    if term.field == "civ":
+        civ_id = _get_civ_ids_by_name().get(term.value)
+        if civ_id is None:
+            civ_id = int(term.value) if term.value.isdigit() else term.value
+        return np.concatenate((
+            catalog.ideal_positions.get(civ_id, empty),
+            catalog.compatible_positions.get(civ_id, empty)
+        ))
+
+    if term.field == "map":
+        return catalog.map_positions.get(term.value, empty)
+
+    if term.field == "type":
+        code = catalog.types.get(term.value)
+        return np.flatnonzero(catalog.type_codes == code) if code is not None else empty
+
+    # against: any archetype containing the value, e.g. "archer" in "archer civilizations"
+    matching = [
+        positions for archetype, positions in catalog.archetype_positions.items()
+        if term.value in archetype
+    ]
+    return np.concatenate(matching) if matching else empty
+
+def _range_column(catalog, field):
+    """Get the numeric catalog column of a range field."""
+    if field in AGES:
+        return catalog.age_up_times[:, AGES.index(field)]
+    return {
+        "difficulty": catalog.difficulty_levels,
+        "meta": catalog.meta_relevance,
+        "time": catalog.execution_times
+    }[field]
+
+@lru_cache(maxsize=256)
+def compile_query(query):
+    """
+    Parse and compile a build order query, caching the plan per query string.
+
+    Args:
+        query (str): Build order query
+
+    Returns:
+        QueryPlan: Compiled plan
+
+    Raises:
+        QueryError: If the query cannot be parsed
+    """
+    return QueryPlan(parse_query(query))
+
+def search_build_orders(query, limit=None, catalog=None):
+    """
+    Search the build order catalog with a query.
+
+    Args:
+        query (str): Build order query (see QUERY_HELP)
+        limit (int): Maximum number of results (None for all)
+        catalog (BuildOrderCatalog): Catalog to search (defaults to the shared one)
+
+    Returns:
+        list: Matching build orders (read-only), most meta-relevant first
+
+    Raises:
+        QueryError: If the query cannot be parsed
+    """
+    if catalog is None:
+        catalog = get_build_order_catalog()
+    positions = compile_query(query.strip()).execute(catalog)
+
+    # Most meta-relevant first, catalog order for ties
+    positions = positions[np.lexsort((positions, -catalog.meta_relevance[positions]))]
+    if limit is not None:
+        positions = positions[:limit]
+    return [catalog.build_orders[p] for p in positions]
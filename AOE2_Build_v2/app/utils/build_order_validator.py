@@ -0,0 +1,360 @@
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .build_steps import AGE_ORDER, STEP_INVALID, STEP_RECORD, STEP_TEXT, as_number, get_compiled_steps
+from .build_timeline import AGES, RESOURCES, format_game_time, parse_game_time
+from .data_loader import get_process_pool
+from .economy_simulator import AGE_RESEARCH_TIMES, simulate_economies
+
+POPULATION_CAP = 200
+
+# Number of builds simulated together when validating many builds
+VALIDATION_CHUNK_SIZE = 256
+
+# Problem found in a build order. severity is "error" (the build is broken)
+# or "warning" (probably a mistake); step is the 1-based step number or None.
+ValidationIssue = namedtuple("ValidationIssue", ["severity", "code", "step", "message"])
+
+def _check_fields(build_order):
+    """Check the fields every build order needs."""
+    issues = []
+    if not str(build_order.get("name") or "").strip():
+        issues.append(ValidationIssue("error", "missing_name", None, "The build order has no name."))
+
+    steps = build_order.get("steps")
+    if not isinstance(steps, (list, tuple)) or not steps:
+        issues.append(ValidationIssue("warning", "no_steps", None, "The build order has no steps."))
+
+    allocation = build_order.get("resource_allocation") or {}
+    if not isinstance(allocation, dict):
+        issues.append(ValidationIssue("error", "invalid_resource_allocation", None,
+                                      "The resource allocation is not a mapping of resources to villagers."))
+        allocation = {}
+    villagers = sum(as_number(allocation.get(resource, 0)) for resource in RESOURCES)
+    if villagers > POPULATION_CAP:
+        issues.append(ValidationIssue(
+            "error", "allocation_over_cap", None,
+            f"The resource allocation has {villagers:g} villagers, more than the population cap of {POPULATION_CAP}."
+        ))
+    return issues
+
+def _step_columns(steps):
+    """
+    Check the compiled steps and get their structured fields (see build_steps.CompiledSteps).
+
+    Returns:
+        tuple: (issues, columns) where columns holds "population", "time",
+            "age" (index in AGE_ORDER) and "villagers" (total of the step's
+            villager_assignment), NaN where a step has no such value
+    """
+    issues = []
+    # Only steps that are not records, have no known age or have broken values can have issues
+    suspect = (steps.kinds != STEP_RECORD) | np.isnan(steps.age) | steps.negative_villagers
+    for i in np.flatnonzero(suspect | steps.invalid_times | steps.invalid_villagers):
+        step = int(i) + 1
+        if steps.kinds[i] == STEP_TEXT:
+            # Free-text steps (from the submission forms) only need content
+            if not steps.actions[i].strip():
+                issues.append(ValidationIssue("error", "empty_step", step, "The step is empty."))
+            continue
+        if steps.kinds[i] == STEP_INVALID:
+            issues.append(ValidationIssue("error", "invalid_step", step, "The step is not a text or a record."))
+            continue
+
+        if steps.age_names[i] and np.isnan(steps.age[i]):
+            issues.append(ValidationIssue("warning", "unknown_age", step, f"Unknown age: {steps.age_names[i]}."))
+        if steps.invalid_times[i]:
+            issues.append(ValidationIssue("error", "invalid_time", step, "The step time is not a game time."))
+        if steps.invalid_villagers[i]:
+            issues.append(ValidationIssue("error", "invalid_villager_count", step,
+                                          "The villager assignment has a count that is not a number."))
+        if steps.negative_villagers[i]:
+            issues.append(ValidationIssue("error", "negative_villagers", step,
+                                          "The villager assignment has a negative count."))
+
+    columns = {
+        "population": steps.population,
+        "time": steps.time,
+        "age": steps.age,
+        "villagers": steps.villager_totals
+    }
+    return issues, columns
+
+def _decreasing_steps(values):
+    """Get the indices of the known values that are lower than the last known value before them."""
+    known = np.flatnonzero(~np.isnan(values))
+    drops = np.flatnonzero(np.diff(values[known]) < 0)
+    return known[drops + 1]
+
+def _check_steps(build_order, steps):
+    """Check that population, time and age only go forward and villagers fit the population."""
+    if not isinstance(build_order.get("steps"), (list, tuple)):
+        return [], None
+    issues, columns = _step_columns(steps)
+    population, times, ages = columns["population"], columns["time"], columns["age"]
+
+    for i in _decreasing_steps(population):
+        issues.append(ValidationIssue("error", "population_decreases", int(i) + 1,
+                                      f"Population drops to {population[i]:g}."))
+    for i in _decreasing_steps(times):
+        issues.append(ValidationIssue("error", "time_goes_backwards", int(i) + 1,
+                                      f"Time goes back to {format_game_time(times[i])}."))
+    for i in _decreasing_steps(ages):
+        issues.append(ValidationIssue("error", "age_goes_backwards", int(i) + 1,
+                                      f"Goes back to the {AGE_ORDER[int(ages[i])].capitalize()} Age."))
+
+    for i in np.flatnonzero(population > POPULATION_CAP):
+        issues.append(ValidationIssue("error", "population_over_cap", int(i) + 1,
+                                      f"Population {population[i]:g} is above the cap of {POPULATION_CAP}."))
+    for i in np.flatnonzero(columns["villagers"] > population):
+        issues.append(ValidationIssue(
+            "error", "villagers_exceed_population", int(i) + 1,
+            f"{columns['villagers'][i]:g} villagers are assigned at population {population[i]:g}."
+        ))
+
+    return issues, columns
+
+def _read_villager_assignment(assignment, number):
+    """
+    Read the time and villager total of a "villager_assignments" entry.
+
+    Counts that are not numbers are left out of the total, as in the
+    economy simulation (see build_timeline.get_villager_assignments).
+
+    Returns:
+        tuple: (time, total, issues) where time and total are NaN if the
+            entry cannot be used, and issues is a list of ValidationIssue
+    """
+    if not isinstance(assignment, dict):
+        return np.nan, np.nan, [ValidationIssue("error", "invalid_villager_assignment", None,
+                                                f"Villager assignment {number} is not a record.")]
+    counts = assignment.get("distribution", assignment)
+    if not isinstance(counts, dict):
+        return np.nan, np.nan, [ValidationIssue("error", "invalid_villager_assignment", None,
+                                                f"Villager assignment {number} has no villager counts.")]
+    if assignment.get("time") in (None, ""):
+        return np.nan, np.nan, [ValidationIssue("error", "invalid_villager_assignment", None,
+                                                f"Villager assignment {number} has no time.")]
+    time = parse_game_time(assignment.get("time"))
+    if time is None:
+        return np.nan, np.nan, [ValidationIssue("error", "invalid_time", None,
+                                                f"Villager assignment {number} has an invalid time.")]
+
+    issues = []
+    # Without a "distribution" the counts sit next to the time
+    invalid = [
+        resource for resource, count in counts.items()
+        if (counts is not assignment or resource != "time") and count is not None and np.isnan(as_number(count))
+    ]
+    if invalid:
+        issues.append(ValidationIssue(
+            "error", "invalid_villager_count", None,
+            f"Villager assignment {number} has counts that are not numbers: {', '.join(map(str, invalid))}."
+        ))
+    return time, sum(as_number(counts.get(resource), 0.0) for resource in RESOURCES), issues
+
+def _check_villager_assignments(build_order, columns):
+    """Check a separate "villager_assignments" timeline against the step populations."""
+    issues = []
+    assignments = build_order.get("villager_assignments") or []
+    if not isinstance(assignments, (list, tuple)):
+        return [ValidationIssue("error", "invalid_villager_assignments", None,
+                                "The villager assignments are not a list.")]
+
+    times = np.full(len(assignments), np.nan)
+    totals = np.full(len(assignments), np.nan)
+    for i, assignment in enumerate(assignments):
+        times[i], totals[i], entry_issues = _read_villager_assignment(assignment, i + 1)
+        issues.extend(entry_issues)
+
+    for i in _decreasing_steps(times):
+        issues.append(ValidationIssue(
+            "error", "assignment_time_goes_backwards", None,
+            f"Villager assignment {int(i) + 1} goes back to {format_game_time(times[i])}."
+        ))
+
+    if columns is None or not len(assignments):
+        return issues
+
+    # Population of the last step at or before each assignment (steps in time order only)
+    known = ~np.isnan(columns["time"]) & ~np.isnan(columns["population"])
+    step_times, step_population = columns["time"][known], columns["population"][known]
+    if len(step_times) and not (np.diff(step_times) < 0).any():
+        indices = np.searchsorted(step_times, times, side="right") - 1
+        population = np.where(indices >= 0, step_population[np.maximum(indices, 0)], np.nan)
+        for i in np.flatnonzero(totals > population):
+            issues.append(ValidationIssue(
+                "error", "villagers_exceed_population", None,
+                f"{totals[i]:g} villagers are assigned at {format_game_time(times[i])}, "
+                f"when the population is {population[i]:g}."
+            ))
+    return issues
+
+def _check_feasibility(steps, age_up_affordable, first_deficit):
+    """Check the planned age-ups of the compiled steps against the simulated economy."""
+    issues = []
+    for age, planned in steps.age_up_times().items():
+        affordable = age_up_affordable[AGES.index(age)]
+        click_time = planned - AGE_RESEARCH_TIMES[age]
+        if np.isnan(affordable):
+            issues.append(ValidationIssue(
+                "error", "age_up_unaffordable", None,
+                f"The {age.capitalize()} Age is never affordable with the planned villagers."
+            ))
+        elif affordable > click_time:
+            issues.append(ValidationIssue(
+                "error", "age_up_too_early", None,
+                f"The {age.capitalize()} Age is reached at {format_game_time(planned)}, but the villagers "
+                f"cannot gather enough before {format_game_time(affordable + AGE_RESEARCH_TIMES[age])}."
+            ))
+
+    if not np.isnan(first_deficit):
+        issues.append(ValidationIssue(
+            "warning", "food_deficit", None,
+            f"More villagers are trained than the food gathered allows by {format_game_time(first_deficit)}."
+        ))
+    return issues
+
+def validate_build_orders(build_orders):
+    """
+    Validate several build orders.
+
+    Checks the required fields, that population, time and age never go
+    backwards, that assigned villagers fit in the population, and that the
+    planned age-ups are affordable in a simulation of the build's economy
+    (see economy_simulator). The economies of all builds are simulated
+    together in chunks of VALIDATION_CHUNK_SIZE.
+
+    Args:
+        build_orders (list): Build order dictionaries
+
+    Returns:
+        list: List of ValidationIssue lists, one per build order
+    """
+    results = []
+    for start in range(0, len(build_orders), VALIDATION_CHUNK_SIZE):
+        chunk = build_orders[start:start + VALIDATION_CHUNK_SIZE]
+        economy = simulate_economies(chunk)
+
+        for b, build_order in enumerate(chunk):
+            # The steps are compiled once for all the checks
+            steps = get_compiled_steps(build_order)
+            issues = _check_fields(build_order)
+            step_issues, columns = _check_steps(build_order, steps)
+            issues.extend(step_issues)
+            issues.extend(_check_villager_assignments(build_order, columns))
+            if economy["has_villager_data"][b]:
+                issues.extend(_check_feasibility(
+                    steps, economy["age_up_affordable"][b], economy["first_deficit"][b]
+                ))
+            results.append(issues)
+    return results
+
+def validate_build_order(build_order):
+    """
+    Validate a single build order, e.g. before saving a submission.
+
+    Args:
+        build_order (dict): Build order dictionary
+
+    Returns:
+        list: List of ValidationIssue, errors first
+    """
+    issues = validate_build_orders([build_order])[0]
+    return sorted(issues, key=lambda issue: issue.severity != "error")
+
+def has_errors(issues):
+    """
+    Check whether validation found an error (not just warnings).
+
+    Args:
+        issues (list): List of ValidationIssue
+
+    Returns:
+        bool: Whether any issue is an error
+    """
+    return any(issue.severity == "error" for issue in issues)
+
+def format_issue(issue):
+    """
+    Format a validation issue as a message for the user.
+
+    Args:
+        issue (ValidationIssue): Issue to format
+
+    Returns:
+        str: Message, prefixed with the step number if there is one
+    """
+    return f"Step {issue.step}: {issue.message}" if issue.step is not None else issue.message
+
+def _validate_catalog_chunk(bounds):
+    """Validate the catalog builds between two positions."""
+    start, end = bounds
+    catalog = get_build_order_catalog()
+    build_orders = catalog.build_orders[start:end]
+    return [(bo.get("id"), bo.get("name"), issues)
+            for bo, issues in zip(build_orders, validate_build_orders(build_orders))]
+
+def validate_catalog(processes=None):
+    """
+    Validate every build order of the catalog in parallel.
+
+    Args:
+        processes (int): Number of worker processes (defaults to the CPU count,
+            1 runs everything in the current process)
+
+    Yields:
+        tuple: (build order ID, name, list of ValidationIssue) in catalog order
+    """
+    catalog = get_build_order_catalog()
+    chunks = [(start, start + VALIDATION_CHUNK_SIZE) for start in range(0, len(catalog), VALIDATION_CHUNK_SIZE)]
+
+    if processes == 1:
+        for chunk in chunks:
+            yield from _validate_catalog_chunk(chunk)
+        return
+
+    with get_process_pool(processes) as pool:
+        for results in pool.imap(_validate_catalog_chunk, chunks):
+            yield from results
+
+def main(argv=None):
+    """Validate the build order catalog from the command line and stream JSON Lines results."""
+    parser = argparse.ArgumentParser(
+        description="Validate every build order and report the ones with issues as JSON Lines."
+    )
+    parser.add_argument("-o", "--output", help="Output file (defaults to stdout)")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="Number of worker processes (defaults to the CPU count)")
+    parser.add_argument("--errors-only", action="store_true", help="Leave out builds with only warnings")
+    args = parser.parse_args(argv)
+
+    output_file = sys.stdout if not args.output else open(args.output, "w", encoding="utf-8")
+    checked = invalid = 0
+
+    try:
+        for build_order_id, name, issues in validate_catalog(processes=args.processes):
+            checked += 1
+            invalid += has_errors(issues)
+            if not issues or (args.errors_only and not has_errors(issues)):
+                continue
+            output_file.write(json.dumps({
+                "id": build_order_id,
+                "name": name,
+                "valid": not has_errors(issues),
+                "issues": [issue._asdict() for issue in issues]
+            }) + "\n")
+            output_file.flush()
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+    print(f"Validated {checked} build orders, {invalid} with errors", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .build_timeline import AGES, RESOURCES, get_age_up_times, sample_villager_curve
+from .data_loader import cached_per_data_version
+
+# Times (s) at which the villager distribution is sampled: every minute up to 30 minutes
+SIGNATURE_TIME_GRID = np.arange(0, 30 * 60 + 1, 60, dtype=float)
+
+# Relative weight of each part of a signature in the cosine similarity
+SIGNATURE_WEIGHTS = {"age_ups": 1.0, "villagers": 1.0, "type": 0.5, "difficulty": 0.25}
+
+# Catalogs with at least this many builds get a coarse cluster index
+CLUSTER_INDEX_MIN_BUILDS = 5000
+
+# Number of nearest clusters scanned per query when the cluster index is used
+CLUSTER_PROBES = 4
+
+# Number of k-means iterations used to build the cluster index
+CLUSTER_ITERATIONS = 10
+
+def _unit(vector):
+    """Scale a vector to unit length (zero vectors are returned unchanged)."""
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def _one_hot(value, lookup):
+    """One-hot encode a case-folded value against a lookup of value -> code."""
+    vector = np.zeros(len(lookup))
+    code = lookup.get(str(value or "").casefold())
+    if code is not None:
+        vector[code] = 1.0
+    return vector
+
+def compute_build_signature(build_order, types, difficulties):
+    """
+    Compute the fixed-length numeric signature of a build order.
+
+    The signature concatenates the age-up times, the villager distribution
+    sampled on SIGNATURE_TIME_GRID and one-hot encodings of type and
+    difficulty. Each part is scaled to unit length and weighted by
+    SIGNATURE_WEIGHTS, and the whole signature has unit length, so the dot
+    product of two signatures is their cosine similarity.
+
+    Args:
+        build_order (dict): Build order dictionary
+        types (dict): Mapping of case-folded build type to one-hot index
+        difficulties (dict): Mapping of case-folded difficulty to one-hot index
+
+    Returns:
+        numpy.ndarray: float32 signature vector
+    """
+    # Ages the build does not reach count as reached at the end of the grid
+    age_up_times = get_age_up_times(build_order)
+    age_ups = np.zeros(len(AGES))
+    if age_up_times:
+        age_ups = np.array([age_up_times.get(age, SIGNATURE_TIME_GRID[-1]) for age in AGES])
+        age_ups = age_ups / SIGNATURE_TIME_GRID[-1]
+
+    parts = {
+        "age_ups": age_ups,
+        "villagers": sample_villager_curve(build_order, SIGNATURE_TIME_GRID).ravel(),
+        "type": _one_hot(build_order.get("type"), types),
+        "difficulty": _one_hot(build_order.get("difficulty"), difficulties)
+    }
+    signature = np.concatenate([_unit(parts[name]) * weight for name, weight in SIGNATURE_WEIGHTS.items()])
+    return _unit(signature).astype(np.float32)
+
+class BuildSimilarityIndex:
+    """
+    k-nearest-neighbor index over the build order signatures of a catalog.
+
+    Signatures are stored as one contiguous float32 matrix and queried by
+    brute-force cosine similarity (a single matrix-vector product). Large
+    catalogs can add a coarse cluster index, in which case a query only scans
+    the builds of the clusters nearest to it.
+    """
+
+    def __init__(self, catalog, n_clusters=None):
+        """
+        Build the index.
+
+        Args:
+            catalog (BuildOrderCatalog): Catalog to index
+            n_clusters (int): Number of clusters of the coarse index (None for brute force only)
+        """
+        self.catalog = catalog
+        signature_size = (len(AGES) + len(SIGNATURE_TIME_GRID) * len(RESOURCES)
+                          + len(catalog.types) + len(catalog.difficulties))
+        self.signatures = np.zeros((len(catalog), signature_size), dtype=np.float32)
+        for position, build_order in enumerate(catalog):
+            self.signatures[position] = self.compute_signature(build_order)
+        self.signatures.setflags(write=False)
+
+        self.centroids = None
+        self.cluster_members = None
+        if n_clusters and len(catalog) > n_clusters:
+            self._build_cluster_index(n_clusters)
+
+    def compute_signature(self, build_order):
+        """
+        Compute the signature of a build order with this index's encodings.
+
+        Args:
+            build_order (dict): Build order dictionary (need not be in the catalog)
+
+        Returns:
+            numpy.ndarray: float32 signature vector
+        """
+        return compute_build_signature(build_order, self.catalog.types, self.catalog.difficulties)
+
+    def query(self, signature, k=5, exclude=None):
+        """
+        Find the build orders most similar to a signature.
+
+        Args:
+            signature (numpy.ndarray): Query signature
+            k (int): Number of neighbors to return
+            exclude (int): Catalog position to leave out (the query build itself)
+
+        Returns:
+            tuple: (positions, similarities) arrays, most similar first
+        """
+        if self.cluster_members is not None:
+            nearest_clusters = np.argsort(-(self.centroids @ signature))[:CLUSTER_PROBES]
+            candidates = np.concatenate([self.cluster_members[c] for c in nearest_clusters])
+            similarities = self.signatures[candidates] @ signature
+        else:
+            candidates = np.arange(len(self.signatures))
+            similarities = self.signatures @ signature
+
+        if exclude is not None:
+            keep = candidates != exclude
+            candidates = candidates[keep]
+            similarities = similarities[keep]
+        if k <= 0 or len(candidates) == 0:
+            return np.array([], dtype=np.intp), np.array([], dtype=np.float32)
+
+        if k < len(candidates):
+            top = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-similarities[top], kind="stable")]
+        return candidates[top], similarities[top]
+
+    def _build_cluster_index(self, n_clusters):
+        """Group the signatures with spherical k-means for coarse search."""
+        rng = np.random.default_rng(0)
+        centroids = self.signatures[rng.choice(len(self.signatures), n_clusters, replace=False)].copy()
+
+        for _ in range(CLUSTER_ITERATIONS):
+            labels = np.argmax(self.signatures @ centroids.T, axis=1)
+            for c in range(n_clusters):
+                members = self.signatures[labels == c]
+                if len(members):
+                    centroids[c] = _unit(members.sum(axis=0))
+
+        labels = np.argmax(self.signatures @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.cluster_members = [np.flatnonzero(labels == c) for c in range(n_clusters)]
+
+@cached_per_data_version
+def get_build_similarity_index():
+    """
+    Get the similarity index of the build order catalog for the current data version.
+
+    Returns:
+        BuildSimilarityIndex: Shared index
+    """
+    catalog = get_build_order_catalog()
+    n_clusters = int(np.sqrt(len(catalog))) if len(catalog) >= CLUSTER_INDEX_MIN_BUILDS else None
+    return BuildSimilarityIndex(catalog, n_clusters=n_clusters)
+
+def find_similar_build_orders(build_order, k=5):
+    """
+    Find the build orders most similar to a given one.
+
+    Args:
+        build_order (dict): Build order dictionary (from the catalog or not)
+        k (int): Number of similar builds to return
+
+    Returns:
+        list: List of dictionaries with "build_order" (read-only) and
+            "similarity" (cosine similarity, 1 is identical), most similar first
+    """
+    index = get_build_similarity_index()
+
+    # Reuse the stored signature if this is a catalog build (user builds may reuse IDs)
+    position = index.catalog.positions.get(build_order.get("id"))
+    if position is not None and index.catalog.build_orders[position].get("name") != build_order.get("name"):
+        position = None
+    signature = index.signatures[position] if position is not None else index.compute_signature(build_order)
+
+    positions, similarities = index.query(signature, k=k, exclude=position)
+    return [
+        {"build_order": index.catalog.build_orders[p], "similarity": float(similarity)}
+        for p, similarity in zip(positions, similarities)
+    ]
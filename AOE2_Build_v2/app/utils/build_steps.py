@@ -0,0 +1,321 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Resources villagers can be assigned to, in array order
+RESOURCES = ("food", "wood", "gold", "stone")
+
+# Ages a build can click up to, in order
+AGES = ("feudal", "castle", "imperial")
+
+# Ages in the order a build goes through them
+AGE_ORDER = ("dark",) + AGES
+
+# Kinds of step: a structured record, free text (from the submission forms),
+# or something that is neither
+STEP_RECORD = 0
+STEP_TEXT = 1
+STEP_INVALID = 2
+
+# Number of frozen step lists kept compiled (see get_compiled_steps)
+COMPILED_STEPS_CACHE_SIZE = 8192
+
+def parse_game_time(value):
+    """
+    Convert a game time to seconds.
+
+    Args:
+        value: Seconds as a number, or a "m:ss" / "h:mm:ss" string
+
+    Returns:
+        float or None: Time in seconds, or None if it cannot be parsed or is
+            not finite ("nan", "inf", ...)
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        seconds = as_number(value)
+        return seconds if math.isfinite(seconds) else None
+
+    try:
+        parts = [float(part) for part in str(value).strip().split(":")]
+    except ValueError:
+        return None
+    if not parts or len(parts) > 3:
+        return None
+
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + part
+    return seconds if math.isfinite(seconds) else None
+
+def format_game_time(seconds):
+    """
+    Format a game time as m:ss.
+
+    Args:
+        seconds (float): Game time in seconds (fractions are dropped)
+
+    Returns:
+        str: Formatted time, e.g. "9:05" ("-0:30" for negative times)
+    """
+    seconds = int(seconds)
+    sign = "-" if seconds < 0 else ""
+    seconds = abs(seconds)
+    return f"{sign}{seconds // 60}:{seconds % 60:02d}"
+
+def normalize_age(age):
+    """
+    Normalize an age name ("Feudal Age", "feudal", ...) to its lowercase short form.
+
+    Args:
+        age (str): Age name
+
+    Returns:
+        str: Lowercase age name without the "age" suffix
+    """
+    age = str(age or "").strip().lower()
+    if age.endswith(" age"):
+        age = age[:-4]
+    return age
+
+def get_step_time(step):
+    """
+    Get the game time of a build order step.
+
+    Steps either have a "time" in seconds or a "time_marker" string.
+
+    Args:
+        step (dict): Build order step
+
+    Returns:
+        float or None: Time in seconds, or None if the step has no time
+    """
+    if not isinstance(step, dict):
+        return None
+    time = parse_game_time(step.get("time"))
+    if time is None:
+        time = parse_game_time(step.get("time_marker"))
+    return time
+
+def as_number(value, default=np.nan):
+    """
+    Convert a numeric field to float.
+
+    Args:
+        value: Field value
+        default (float): Value for a missing, non-numeric or non-finite field
+
+    Returns:
+        float: Number, or the default
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return default
+    return number if math.isfinite(number) else default
+
+class CompiledSteps:
+    """
+    Build order steps compiled into one typed structure.
+
+    Steps come in several shapes: records with "instruction", "time",
+    "population" and "age" (the sample data), records with "step_number",
+    "action", "description", "time_marker" and "villager_assignment" (the
+    featured builds), and plain strings (the submission forms). Compiling
+    reads every shape once into columns, so the display, the simulator and
+    the validator read arrays instead of branching on dictionary keys.
+
+    Numeric columns are read-only numpy arrays with NaN where a step has no
+    value; text columns are tuples of strings ("" where missing).
+
+    Attributes:
+        kinds (numpy.ndarray): STEP_RECORD, STEP_TEXT or STEP_INVALID per step
+        numbers (tuple): Step numbers ("step_number", or the position from first_number)
+        population (numpy.ndarray): Population per step
+        time (numpy.ndarray): Game time in seconds per step
+        age (numpy.ndarray): Index of the age in AGE_ORDER per step
+        age_names (tuple): Normalized age names, also the unknown ones
+        time_labels (tuple): Time as written ("time_marker"), or m:ss of the time
+        actions (tuple): What to do ("action" or "instruction", or the step's text)
+        descriptions (tuple): Details of the step ("description")
+        key_points (numpy.ndarray): Whether each step is a key point
+        villagers (numpy.ndarray): Villagers per resource of each step's
+            "villager_assignment", shape (steps, len(RESOURCES))
+        villager_totals (numpy.ndarray): All assigned villagers of each step,
+            including ones on something other than RESOURCES (e.g. idle)
+        negative_villagers (numpy.ndarray): Whether a step assigns a negative count
+        invalid_times (numpy.ndarray): Whether a step has a "time" that is not
+            a game time (e.g. "soon" or "nan")
+        invalid_villagers (numpy.ndarray): Whether a step's "villager_assignment"
+            is not a mapping or has a count that is not a number
+    """
+
+    __slots__ = (
+        "kinds", "numbers", "population", "time", "age", "age_names", "time_labels", "actions",
+        "descriptions", "key_points", "villagers", "villager_totals", "negative_villagers",
+        "invalid_times", "invalid_villagers"
+    )
+
+    def __init__(self, steps, first_number=1):
+        """
+        Compile build order steps.
+
+        Args:
+            steps (list): Build order steps of any shape
+            first_number (int): Number of the first step, for steps without a "step_number"
+        """
+        steps = steps if isinstance(steps, (list, tuple)) else ()
+        kinds, population, times, ages, key_points = [], [], [], [], []
+        villagers, villager_totals, negative_villagers, invalid_times, invalid_villagers = [], [], [], [], []
+        numbers, age_names, time_labels, actions, descriptions = [], [], [], [], []
+        no_villagers = (np.nan,) * len(RESOURCES)
+
+        # Columns are collected as lists and converted once, which is much
+        # faster than filling arrays one cell at a time for short builds
+        for i, step in enumerate(steps):
+            if not isinstance(step, dict):
+                kinds.append(STEP_TEXT if isinstance(step, str) else STEP_INVALID)
+                numbers.append(first_number + i)
+                population.append(np.nan)
+                times.append(np.nan)
+                ages.append(np.nan)
+                age_names.append("")
+                time_labels.append("")
+                actions.append(str(step))
+                descriptions.append("")
+                key_points.append(False)
+                villagers.append(no_villagers)
+                villager_totals.append(np.nan)
+                negative_villagers.append(False)
+                invalid_times.append(False)
+                invalid_villagers.append(False)
+                continue
+
+            kinds.append(STEP_RECORD)
+            numbers.append(step.get("step_number", first_number + i))
+            population.append(as_number(step.get("population")))
+            time = get_step_time(step)
+            times.append(np.nan if time is None else time)
+            invalid_times.append(step.get("time") not in (None, "") and parse_game_time(step.get("time")) is None)
+
+            age = normalize_age(step.get("age"))
+            age_names.append(age)
+            ages.append(AGE_ORDER.index(age) if age in AGE_ORDER else np.nan)
+
+            marker = step.get("time_marker")
+            if marker:
+                time_labels.append(str(marker))
+            else:
+                time_labels.append(format_game_time(time) if time is not None else "")
+            actions.append(str(step.get("action", step.get("instruction", "")) or ""))
+            descriptions.append(str(step.get("description", "") or ""))
+            key_points.append(bool(step.get("key_point", False)))
+
+            assignment = step.get("villager_assignment")
+            if isinstance(assignment, dict):
+                invalid_villagers.append(any(
+                    count is not None and math.isnan(as_number(count)) for count in assignment.values()
+                ))
+                counts = {str(resource).lower(): as_number(count) for resource, count in assignment.items()}
+                counts = {resource: count for resource, count in counts.items() if not math.isnan(count)}
+                villagers.append(tuple(counts.get(resource, 0.0) for resource in RESOURCES))
+                villager_totals.append(sum(counts.values()))
+                negative_villagers.append(any(count < 0 for count in counts.values()))
+            else:
+                villagers.append(no_villagers)
+                villager_totals.append(np.nan)
+                negative_villagers.append(False)
+                invalid_villagers.append(assignment is not None)
+
+        self.kinds = np.array(kinds, dtype=np.int8)
+        self.population = np.array(population, dtype=float)
+        self.time = np.array(times, dtype=float)
+        self.age = np.array(ages, dtype=float)
+        self.key_points = np.array(key_points, dtype=bool)
+        self.villagers = np.array(villagers, dtype=float).reshape(len(steps), len(RESOURCES))
+        self.villager_totals = np.array(villager_totals, dtype=float)
+        self.negative_villagers = np.array(negative_villagers, dtype=bool)
+        self.invalid_times = np.array(invalid_times, dtype=bool)
+        self.invalid_villagers = np.array(invalid_villagers, dtype=bool)
+        self.numbers = tuple(numbers)
+        self.age_names = tuple(age_names)
+        self.time_labels = tuple(time_labels)
+        self.actions = tuple(actions)
+        self.descriptions = tuple(descriptions)
+
+        # Compiled steps are shared between callers
+        for array in (self.kinds, self.population, self.time, self.age, self.key_points,
+                      self.villagers, self.villager_totals, self.negative_villagers, self.invalid_times,
+                      self.invalid_villagers):
+            array.setflags(write=False)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def age_up_times(self):
+        """
+        Get the time of the first step in each age.
+
+        Returns:
+            dict: Mapping of age name (see AGES) to the time in seconds, for
+                the ages reached by a step with a time
+        """
+        age_up_times = {}
+        timed = ~np.isnan(self.time)
+        for age in AGES:
+            first = np.flatnonzero(timed & (self.age == AGE_ORDER.index(age)))
+            if len(first):
+                age_up_times[age] = float(self.time[first[0]])
+        return age_up_times
+
+    def villager_assignments(self):
+        """
+        Get the villager assignments of the steps with a time, in step order.
+
+        Returns:
+            list: List of (time, counts) tuples, where counts is a dictionary
+                of villagers per resource
+        """
+        return [
+            (float(self.time[i]), dict(zip(RESOURCES, self.villagers[i].tolist())))
+            for i in np.flatnonzero(~np.isnan(self.time) & ~np.isnan(self.villager_totals))
+        ]
+
+_compiled_cache = OrderedDict()
+_compiled_cache_lock = threading.Lock()
+
+def get_compiled_steps(build_order):
+    """
+    Get the compiled steps of a build order.
+
+    Frozen steps (tuples, as in the shared build order catalog) cannot change,
+    so they are compiled once and kept; other steps are compiled on every call.
+
+    Args:
+        build_order (dict): Build order dictionary
+
+    Returns:
+        CompiledSteps: Compiled steps (read-only)
+    """
+    steps = build_order.get("steps") or ()
+    if not isinstance(steps, tuple):
+        return CompiledSteps(steps)
+
+    # Keyed by identity, with the steps kept alive so their id cannot be reused
+    key = id(steps)
+    with _compiled_cache_lock:
+        entry = _compiled_cache.get(key)
+        if entry is not None and entry[0] is steps:
+            _compiled_cache.move_to_end(key)
+            return entry[1]
+
+    compiled = CompiledSteps(steps)
+    with _compiled_cache_lock:
+        _compiled_cache[key] = (steps, compiled)
+        _compiled_cache.move_to_end(key)
+        while len(_compiled_cache) > COMPILED_STEPS_CACHE_SIZE:
+            _compiled_cache.popitem(last=False)
+    return compiled
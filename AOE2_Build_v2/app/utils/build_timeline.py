@@ -0,0 +1,93 @@
+import numpy as np
+
+# Step fields are read in build_steps; the names are kept here for the
+# modules built on the timelines
+from .build_steps import (
+    AGES,
+    RESOURCES,
+    as_number,
+    format_game_time,
+    get_compiled_steps,
+    get_step_time,
+    normalize_age,
+    parse_game_time
+)
+
+def get_age_up_times(build_order):
+    """
+    Get the time at which a build order reaches each age.
+
+    Args:
+        build_order (dict): Build order dictionary
+
+    Returns:
+        dict: Mapping of age name (see AGES) to the time in seconds of the
+            first step in that age, for the ages the build reaches
+    """
+    return get_compiled_steps(build_order).age_up_times()
+
+def _resource_counts(counts):
+    """Read villagers per resource from a dictionary with any key case (0 if missing or not a number)."""
+    # Most assignments already use the lowercase names
+    if not all(resource in counts for resource in RESOURCES):
+        counts = {str(resource).lower(): count for resource, count in counts.items()}
+    return {resource: as_number(counts.get(resource) or 0, 0.0) for resource in RESOURCES}
+
+def get_villager_assignments(build_order):
+    """
+    Get the villager distribution of a build order over time.
+
+    Villagers are read from the "villager_assignments" list if present,
+    otherwise from the "villager_assignment" of each step.
+
+    Args:
+        build_order (dict): Build order dictionary
+
+    Returns:
+        list: List of (time, counts) tuples sorted by time, where counts is a
+            dictionary of villagers per resource
+    """
+    assignments = []
+
+    entries = build_order.get("villager_assignments") or []
+    for assignment in entries if isinstance(entries, (list, tuple)) else []:
+        if not isinstance(assignment, dict):
+            continue
+        time = parse_game_time(assignment.get("time"))
+        counts = assignment.get("distribution", assignment)
+        if time is not None and isinstance(counts, dict):
+            assignments.append((time, _resource_counts(counts)))
+
+    if not assignments:
+        assignments = get_compiled_steps(build_order).villager_assignments()
+
+    assignments.sort(key=lambda assignment: assignment[0])
+    return assignments
+
+def sample_villager_curve(build_order, time_grid):
+    """
+    Sample the villager distribution of a build order on a time grid.
+
+    Each grid point takes the last known assignment at or before that time
+    (zero before the first one).
+
+    Args:
+        build_order (dict): Build order dictionary
+        time_grid (numpy.ndarray): Sorted sample times in seconds
+
+    Returns:
+        numpy.ndarray: Villagers per resource, shape (len(time_grid), len(RESOURCES))
+    """
+    assignments = get_villager_assignments(build_order)
+    curve = np.zeros((len(time_grid), len(RESOURCES)))
+    if not assignments:
+        return curve
+
+    times = np.array([time for time, _ in assignments])
+    counts = np.array([[counts[resource] for resource in RESOURCES] for _, counts in assignments], dtype=float)
+
+    # Index of the last assignment at or before each grid time
+    indices = np.searchsorted(times, time_grid, side="right") - 1
+    known = indices >= 0
+    curve[known] = counts[indices[known]]
+    return curve
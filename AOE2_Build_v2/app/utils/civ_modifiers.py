@@ -0,0 +1,223 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from .build_timeline import AGES, RESOURCES
+from .data_loader import cached_per_data_version, load_civilizations
+from .economy_simulator import BUILDING_COSTS, NO_MODIFIERS, simulate_civilizations
+
+# Villager activities named in bonuses: (resource, share of that resource's
+# gathering the activity accounts for in a typical early game)
+GATHER_ACTIVITIES = {
+    "villager": (None, 1.0),
+    "forager": ("food", 0.25),
+    "shepherd": ("food", 0.35),
+    "hunter": ("food", 0.15),
+    "farmer": ("food", 0.25),
+    "fisherman": ("food", 0.0),
+    "lumberjack": ("wood", 1.0),
+    "gold miner": ("gold", 1.0),
+    "stone miner": ("stone", 1.0),
+    "miner": ("gold", 1.0)
+}
+
+# Carry capacity of a villager, and the share of extra capacity that turns
+# into gather rate (the rest of a trip is spent gathering either way)
+VILLAGER_CARRY_CAPACITY = 10
+CARRY_RATE_EFFECT = 0.2
+
+# Economic effect of a single bonus, parsed from its text. Multipliers and
+# amounts are per resource (see RESOURCES); target names what they apply to.
+BonusModifier = namedtuple("BonusModifier", ["kind", "target", "values"])
+
+# Compiled bonuses of one civilization, as small arrays the economy simulator
+# applies directly (see economy_simulator.NO_MODIFIERS)
+CivModifiers = namedtuple("CivModifiers", [
+    "civ_id",
+    "gather_multipliers",
+    "villager_cost_multiplier",
+    "starting_resources",
+    "age_up_cost_multipliers",
+    "building_cost_multipliers",
+    "free_techs",
+    "unparsed_bonuses"
+])
+
+_RESOURCE_PATTERN = "|".join(RESOURCES)
+
+_GATHER_PATTERN = re.compile(r"^(?P<who>[a-z ]+?)s? (?:work|gather) \+?(?P<percent>\d+)% faster")
+_CARRY_PATTERN = re.compile(r"^villagers carry \+(?P<amount>\d+)")
+_COST_PATTERN = re.compile(
+    rf"^(?P<what>.+?) costs? -(?P<percent>\d+)%(?: (?P<resource>{_RESOURCE_PATTERN}))?(?P<rest>.*)$"
+)
+_FREE_PATTERN = re.compile(r"^(?P<what>.+?) (?:are |is )?free$")
+_START_PATTERN = re.compile(rf"^starts? with \+(?P<amount>\d+) (?P<resource>{_RESOURCE_PATTERN})$")
+
+def _resource_vector(resource=None, value=1.0, default=0.0):
+    """Get a per-resource vector with value for one resource (or all if None)."""
+    vector = np.full(len(RESOURCES), default)
+    if resource is None:
+        vector[:] = value
+    else:
+        vector[RESOURCES.index(resource)] = value
+    # Parsed modifiers are cached and shared
+    vector.setflags(write=False)
+    return vector
+
+def _singular(name):
+    """Crude singular form of a lowercase name ("town centers" -> "town center")."""
+    return name[:-1] if name.endswith("s") else name
+
+@lru_cache(maxsize=1024)
+def compile_bonus(text):
+    """
+    Parse the economic effect of a civilization bonus.
+
+    Recognized forms (case-insensitive) are "<villagers> work N% faster",
+    "Villagers carry +N", "<building/age/villagers> cost -N% [resource]",
+    "<techs> free" and "Start with +N <resource>". Bonuses that only apply
+    from a later age ("... starting in Castle Age") are not compiled, as the
+    simulated economy has no notion of the current age.
+
+    Args:
+        text (str): Bonus text, e.g. "Foragers work 25% faster"
+
+    Returns:
+        BonusModifier or None: Parsed modifier, or None if the bonus has no
+            economic effect that can be parsed
+    """
+    text = " ".join(str(text).casefold().split())
+
+    match = _GATHER_PATTERN.match(text)
+    if match and _singular(match["who"]) in GATHER_ACTIVITIES:
+        resource, share = GATHER_ACTIVITIES[_singular(match["who"])]
+        multiplier = 1 + int(match["percent"]) / 100 * share
+        return BonusModifier("gather", None, _resource_vector(resource, multiplier, default=1.0))
+
+    match = _CARRY_PATTERN.match(text)
+    if match:
+        multiplier = 1 + int(match["amount"]) / VILLAGER_CARRY_CAPACITY * CARRY_RATE_EFFECT
+        return BonusModifier("gather", None, _resource_vector(None, multiplier, default=1.0))
+
+    match = _COST_PATTERN.match(text)
+    if match and not match["rest"].strip():
+        multiplier = 1 - int(match["percent"]) / 100
+        what = _singular(match["what"].strip())
+        values = _resource_vector(match["resource"], multiplier, default=1.0)
+        if what == "villager":
+            return BonusModifier("villager_cost", None, values)
+        ages = [age for age in AGES if age in what]
+        if ages and ("advanc" in what or "age" in what):
+            return BonusModifier("age_up_cost", ages[0], values)
+        buildings = {name.casefold(): name for name in BUILDING_COSTS}
+        if what in buildings:
+            return BonusModifier("building_cost", buildings[what], values)
+        return None
+
+    match = _START_PATTERN.match(text)
+    if match:
+        return BonusModifier("start", None, _resource_vector(match["resource"], int(match["amount"])))
+
+    match = _FREE_PATTERN.match(text)
+    if match:
+        return BonusModifier("free_tech", match["what"].strip(), None)
+
+    return None
+
+def compile_civilization_modifiers(civilization):
+    """
+    Compile the bonuses of a civilization into simulator modifiers.
+
+    Bonuses are read from "civilization_bonuses" or "bonuses". Several
+    bonuses of the same kind multiply (or add up, for starting resources).
+
+    Args:
+        civilization (dict): Civilization dictionary
+
+    Returns:
+        CivModifiers: Compiled modifiers (read-only arrays)
+    """
+    gather = NO_MODIFIERS["gather_multipliers"].copy()
+    villager_cost = 1.0
+    start = NO_MODIFIERS["starting_resources"].copy()
+    age_up_costs = NO_MODIFIERS["age_up_cost_multipliers"].copy()
+    building_costs = NO_MODIFIERS["building_cost_multipliers"].copy()
+    buildings = list(BUILDING_COSTS)
+    free_techs = []
+    unparsed = []
+
+    bonuses = civilization.get("civilization_bonuses") or civilization.get("bonuses") or []
+    for text in bonuses:
+        modifier = compile_bonus(text)
+        if modifier is None:
+            unparsed.append(text)
+        elif modifier.kind == "gather":
+            gather *= modifier.values
+        elif modifier.kind == "villager_cost":
+            # Villagers only cost food
+            villager_cost *= modifier.values[RESOURCES.index("food")]
+        elif modifier.kind == "start":
+            start += modifier.values
+        elif modifier.kind == "age_up_cost":
+            age_up_costs[AGES.index(modifier.target)] *= modifier.values
+        elif modifier.kind == "building_cost":
+            building_costs[buildings.index(modifier.target)] *= modifier.values
+        else:
+            free_techs.append(modifier.target)
+
+    for array in (gather, start, age_up_costs, building_costs):
+        array.setflags(write=False)
+
+    return CivModifiers(
+        civ_id=civilization.get("id"),
+        gather_multipliers=gather,
+        villager_cost_multiplier=villager_cost,
+        starting_resources=start,
+        age_up_cost_multipliers=age_up_costs,
+        building_cost_multipliers=building_costs,
+        free_techs=tuple(free_techs),
+        unparsed_bonuses=tuple(unparsed)
+    )
+
+@cached_per_data_version
+def get_all_civ_modifiers():
+    """
+    Get the compiled bonuses of every civilization for the current data version.
+
+    Returns:
+        dict: Mapping of civilization ID to CivModifiers
+    """
+    return {civ["id"]: compile_civilization_modifiers(civ) for civ in load_civilizations()}
+
+def get_civ_modifiers(civ_id):
+    """
+    Get the compiled bonuses of a civilization.
+
+    Args:
+        civ_id: ID of the civilization
+
+    Returns:
+        CivModifiers or None: Compiled modifiers, or None for an unknown civilization
+    """
+    return get_all_civ_modifiers().get(civ_id)
+
+def simulate_civilization_timings(build_orders, civ_ids=None):
+    """
+    Simulate when each build can afford its age-ups for every civilization.
+
+    Args:
+        build_orders (list): Build order dictionaries
+        civ_ids (list): Civilizations to simulate (defaults to all)
+
+    Returns:
+        dict: "civ_ids" plus the arrays of economy_simulator.simulate_civilizations,
+            with the civilizations along the first axis
+    """
+    all_modifiers = get_all_civ_modifiers()
+    civ_ids = list(all_modifiers) if civ_ids is None else [c for c in civ_ids if c in all_modifiers]
+
+    timings = simulate_civilizations(build_orders, [all_modifiers[c] for c in civ_ids])
+    timings["civ_ids"] = civ_ids
+    return timings
@@ -1,5 +1,8 @@
+import functools
 import json
+import multiprocessing
 import os
+import threading
 import pandas as pd
 from pathlib import Path
 
@@ -16,6 +19,109 @@ def _get_data_dir():
     data_dir = app_dir / "data"
     return data_dir
 
+# Data files that derived tables (matrices, indexes, tier lists) are built from
+_DATA_FILES = ["civilizations.json", "build_orders.json", "maps.json", "civilization_matchups.csv"]
+
+def get_data_version():
+    """
+    Get a version key for the data files.
+
+    The key changes whenever a data file is added, removed or modified, so it
+    can be used to invalidate anything computed from the loaded data.
+
+    Returns:
+        tuple: Tuple of (file name, modification time, size) for each existing data file
+    """
+    data_dir = _get_data_dir()
+    version = []
+
+    for file_name in _DATA_FILES:
+        data_file = data_dir / file_name
+        if data_file.exists():
+            stat = data_file.stat()
+            version.append((file_name, stat.st_mtime_ns, stat.st_size))
+
+    return tuple(version)
+
+def cached_per_data_version(func):
+    """
+    Cache the result of a zero-argument loader until the data files change.
+
+    Args:
+        func (callable): Function computing a value from the loaded data
+
+    Returns:
+        callable: Wrapped function returning the cached value for the current data version
+    """
+    cache = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper():
+        version = get_data_version()
+        if cache.get("version") != version or "value" not in cache:
+            with lock:
+                # Another thread may have rebuilt the value while we waited
+                if cache.get("version") != version or "value" not in cache:
+                    cache["value"] = func()
+                    cache["version"] = version
+        return cache["value"]
+
+    def cache_clear():
+        with lock:
+            cache.clear()
+
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+def get_process_pool(processes, initializer=None):
+    """
+    Start a pool of worker processes that share the loaded data.
+
+    Workers are forked where the platform supports it, so they inherit
+    everything the parent loaded before the call; otherwise they are
+    spawned and each runs the initializer to load the data itself.
+
+    Args:
+        processes (int): Number of worker processes (None for the CPU count)
+        initializer (callable): Function loading the data in a spawned worker
+
+    Returns:
+        multiprocessing.pool.Pool: Process pool, to be used as a context manager
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork").Pool(processes)
+    return multiprocessing.get_context("spawn").Pool(processes, initializer=initializer)
+
+class ReadOnlyDict(dict):
+    """Dictionary that cannot be modified, for data shared between sessions."""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Shared data is read-only, use dict(...) to get a modifiable copy")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # Rebuild from a plain dict, since pickle would otherwise call __setitem__
+        return (ReadOnlyDict, (dict(self),))
+
+def freeze_data(value):
+    """
+    Get a read-only copy of loaded data.
+
+    Args:
+        value: Data made of dicts, lists and scalars
+
+    Returns:
+        Copy with dicts replaced by ReadOnlyDict and lists by tuples
+    """
+    if isinstance(value, dict):
+        return ReadOnlyDict((key, freeze_data(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_data(item) for item in value)
+    return value
+
 def load_civilizations():
     """Load civilization data."""
     # In a real app, this would query a database
@@ -522,6 +628,10 @@ def load_matchup_data(civ1_id, civ2_id):
         # Load from file
         df = pd.read_csv(matchup_file)
         
+        # Rows with a map_id are map-specific, see matchup_store.load_map_matchup_tensor
+        if "map_id" in df.columns:
+            df = df[df["map_id"].isna()]
+        
         # Find the specific matchup
         matchup = df[(df["civ1_id"] == civ1_id) & (df["civ2_id"] == civ2_id)]
         
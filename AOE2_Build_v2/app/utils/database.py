@@ -3,6 +3,14 @@ import json
 from datetime import datetime
 from pathlib import Path
 
+from .build_diff import apply_patch, diff_build_orders, is_empty_patch
+
+# Fields stored as JSON in the build_orders table
+JSON_FIELDS = ['resource_allocation', 'steps', 'ideal_civilizations', 'suitable_maps']
+
+# Fields that are not part of a build order's revisions
+REVISION_IGNORED_FIELDS = ('id', 'creator_id', 'created_at', 'updated_at')
+
 def get_db_path():
     """Get the path to the SQLite database file."""
     db_dir = Path(__file__).parent.parent.parent / 'data'
@@ -66,6 +74,19 @@ def init_db():
         )
     ''')
     
+    # Create build_order_revisions table. A revision is stored as the patch
+    # that turns the version after it back into it (see build_diff).
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS build_order_revisions (
+            build_order_id TEXT,
+            revision INTEGER,
+            patch TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (build_order_id, revision),
+            FOREIGN KEY (build_order_id) REFERENCES build_orders (id)
+        )
+    ''')
+    
     conn.commit()
     conn.close()
 
@@ -127,6 +148,30 @@ def save_build_order(build_order, user_id):
     conn.close()
     return build_order['id']
 
+def _row_to_build_order(row):
+    """Convert a build_orders row to a build order dictionary."""
+    return {
+        'id': row[0],
+        'name': row[1],
+        'description': row[2],
+        'type': row[3],
+        'difficulty': row[4],
+        'primary_goal': row[5],
+        'execution_time': row[6],
+        'resource_allocation': json.loads(row[7]),
+        'steps': json.loads(row[8]),
+        'ideal_civilizations': json.loads(row[9]),
+        'suitable_maps': json.loads(row[10]),
+        'tips': row[11],
+        'video_url': row[12],
+        'notes': row[13],
+        'creator_id': row[14],
+        'is_public': bool(row[15]),
+        'status': row[16],
+        'created_at': row[17],
+        'updated_at': row[18]
+    }
+
 def get_user_build_orders(user_id, include_shared=True):
     """Get all build orders for a user, including shared ones if requested."""
     conn = sqlite3.connect(get_db_path())
@@ -141,30 +186,7 @@ def get_user_build_orders(user_id, include_shared=True):
     else:
         c.execute('SELECT * FROM build_orders WHERE creator_id = ?', (user_id,))
     
-    build_orders = []
-    for row in c.fetchall():
-        bo = {
-            'id': row[0],
-            'name': row[1],
-            'description': row[2],
-            'type': row[3],
-            'difficulty': row[4],
-            'primary_goal': row[5],
-            'execution_time': row[6],
-            'resource_allocation': json.loads(row[7]),
-            'steps': json.loads(row[8]),
-            'ideal_civilizations': json.loads(row[9]),
-            'suitable_maps': json.loads(row[10]),
-            'tips': row[11],
-            'video_url': row[12],
-            'notes': row[13],
-            'creator_id': row[14],
-            'is_public': bool(row[15]),
-            'status': row[16],
-            'created_at': row[17],
-            'updated_at': row[18]
-        }
-        build_orders.append(bo)
+    build_orders = [_row_to_build_order(row) for row in c.fetchall()]
     
     conn.close()
     return build_orders
@@ -175,14 +197,29 @@ def update_build_order(build_order_id, updates, user_id):
     c = conn.cursor()
     
     # Verify ownership
-    c.execute('SELECT creator_id FROM build_orders WHERE id = ?', (build_order_id,))
+    c.execute('SELECT * FROM build_orders WHERE id = ?', (build_order_id,))
     result = c.fetchone()
-    if not result or result[0] != user_id:
+    if not result or result[14] != user_id:
         conn.close()
         return False
     
+    # Keep the version being replaced, as a patch against the new one
+    current = _row_to_build_order(result)
+    updated = {**current, **updates}
+    updated['is_public'] = bool(updated['is_public'])
+    patch = diff_build_orders(updated, current, ignore=REVISION_IGNORED_FIELDS)
+    if not is_empty_patch(patch):
+        c.execute('SELECT COALESCE(MAX(revision), 0) FROM build_order_revisions WHERE build_order_id = ?',
+                  (build_order_id,))
+        revision = c.fetchone()[0] + 1
+        c.execute('''
+            INSERT INTO build_order_revisions (build_order_id, revision, patch)
+            VALUES (?, ?, ?)
+        ''', (build_order_id, revision, json.dumps(patch)))
+    
     # Convert lists and dicts to JSON strings
-    for key in ['resource_allocation', 'steps', 'ideal_civilizations', 'suitable_maps']:
+    updates = dict(updates)
+    for key in JSON_FIELDS:
         if key in updates:
             updates[key] = json.dumps(updates[key])
     
@@ -208,6 +245,54 @@ def update_build_order(build_order_id, updates, user_id):
     conn.close()
     return True
 
+def get_build_order_revisions(build_order_id):
+    """Get the revisions of a build order (number, date and patch), newest first."""
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute('''
+        SELECT revision, created_at, patch FROM build_order_revisions
+        WHERE build_order_id = ? ORDER BY revision DESC
+    ''', (build_order_id,))
+    revisions = [
+        {'revision': row[0], 'created_at': row[1], 'patch': json.loads(row[2])}
+        for row in c.fetchall()
+    ]
+    conn.close()
+    return revisions
+
+def get_build_order_revision(build_order_id, revision):
+    """
+    Get a build order as it was at a revision.
+    
+    Revision 1 is the version first saved, and every update adds one. The
+    version is rebuilt from the current one by undoing the updates since.
+    
+    Args:
+        build_order_id (str): ID of the build order
+        revision (int): Revision number
+    
+    Returns:
+        dict or None: Build order at that revision, or None if there is no such build order or revision
+    """
+    conn = sqlite3.connect(get_db_path())
+    c = conn.cursor()
+    c.execute('SELECT * FROM build_orders WHERE id = ?', (build_order_id,))
+    row = c.fetchone()
+    conn.close()
+    if not row:
+        return None
+    
+    revisions = get_build_order_revisions(build_order_id)
+    if not 1 <= revision <= len(revisions) + 1:
+        return None
+    
+    build_order = _row_to_build_order(row)
+    for entry in revisions:
+        if entry['revision'] < revision:
+            break
+        build_order = apply_patch(build_order, entry['patch'])
+    return build_order
+
 def share_build_order(build_order_id, shared_with_email, user_id):
     """Share a build order with another user."""
     conn = sqlite3.connect(get_db_path())
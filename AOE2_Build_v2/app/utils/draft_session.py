@@ -0,0 +1,211 @@
+import numpy as np
+
+from .data_loader import load_civilizations
+from .matchup_calculator import BOOTSTRAP_SEED, calculate_synergy_from_counts, get_confident_advantage_level
+from .matchup_confidence import bootstrap_team_win_rate
+from .matchup_store import DEFAULT_WIN_RATE, get_matchup_submatrix
+
+TEAMS = ("your", "enemy")
+
+class DraftSession:
+    """
+    Incremental matchup evaluation for a captain's-mode draft.
+
+    Picks and bans arrive one at a time, so instead of recomputing the whole
+    team analysis on every click the session keeps running sums:
+
+    - for every civilization, its summed win rate against each current team
+    - the specialty counts of each team, from which synergy is derived
+
+    Each pick or ban only adds one matrix row/column to these sums. The team
+    win rate is taken from the picks' own submatrix with the same
+    sample-size-aware estimate as calculate_team_matchup, so both agree.
+    """
+
+    def __init__(self, civilizations=None, map_id=None):
+        """
+        Create an empty draft.
+
+        Args:
+            civilizations (list): Civilizations available in the draft (defaults to all)
+            map_id (int or str): ID or name of the map, to use map-specific win rates
+
+        Raises:
+            ValueError: If the map is unknown
+        """
+        self._civs = list(civilizations) if civilizations is not None else load_civilizations()
+        self._civ_ids = [civ["id"] for civ in self._civs]
+        self._index = {civ_id: i for i, civ_id in enumerate(self._civ_ids)}
+
+        # Win rate of the row civ against the column civ
+        self._win_rates, self._sample_sizes = get_matchup_submatrix(self._civ_ids, self._civ_ids, map_id=map_id)
+
+        n_civs = len(self._civ_ids)
+        self._available = np.ones(n_civs, dtype=bool)
+
+        # Summed win rate of each civ against the enemy picks (your-side candidates)
+        self._vs_enemy = np.zeros(n_civs)
+        # Summed win rate of each civ against your picks (enemy-side candidates)
+        self._vs_your = np.zeros(n_civs)
+
+        self.picks = {"your": [], "enemy": []}
+        self.bans = []
+        self._specialty_counts = {"your": {}, "enemy": {}}
+        self._history = []
+
+    def pick(self, civ_id, team="your"):
+        """
+        Add a civilization to a team.
+
+        Args:
+            civ_id (int): ID of the picked civilization
+            team (str): "your" or "enemy"
+        """
+        i = self._take(civ_id, team)
+
+        if team == "your":
+            self._vs_your += self._win_rates[:, i]
+        else:
+            self._vs_enemy += self._win_rates[:, i]
+
+        self.picks[team].append(civ_id)
+        self._update_specialties(team, civ_id, 1)
+        self._history.append(("pick", team, civ_id))
+
+    def ban(self, civ_id):
+        """
+        Remove a civilization from the pool without assigning it to a team.
+
+        Args:
+            civ_id (int): ID of the banned civilization
+        """
+        self._take(civ_id, None)
+        self.bans.append(civ_id)
+        self._history.append(("ban", None, civ_id))
+
+    def undo(self):
+        """
+        Revert the last pick or ban.
+
+        Returns:
+            tuple or None: The reverted (action, team, civ_id), or None if the draft is empty
+        """
+        if not self._history:
+            return None
+
+        action, team, civ_id = self._history.pop()
+        i = self._index[civ_id]
+        self._available[i] = True
+
+        if action == "ban":
+            self.bans.remove(civ_id)
+            return action, team, civ_id
+
+        self.picks[team].remove(civ_id)
+        self._update_specialties(team, civ_id, -1)
+
+        if team == "your":
+            self._vs_your -= self._win_rates[:, i]
+        else:
+            self._vs_enemy -= self._win_rates[:, i]
+
+        return action, team, civ_id
+
+    def get_analysis(self):
+        """
+        Get the current state of the draft.
+
+        Returns:
+            dict: Running matchup analysis with the same key names as calculate_team_matchup
+        """
+        your = [self._index[civ_id] for civ_id in self.picks["your"]]
+        enemy = [self._index[civ_id] for civ_id in self.picks["enemy"]]
+        cells = np.ix_(your, enemy)
+        team_win_rate = bootstrap_team_win_rate(self._win_rates[cells], self._sample_sizes[cells], seed=BOOTSTRAP_SEED)
+
+        return {
+            "your_team": list(self.picks["your"]),
+            "enemy_team": list(self.picks["enemy"]),
+            "bans": list(self.bans),
+            "your_team_synergy": self._team_synergy("your"),
+            "enemy_team_synergy": self._team_synergy("enemy"),
+            "average_win_rate": team_win_rate["mean"],
+            "win_rate_interval": (team_win_rate["lower"], team_win_rate["upper"]),
+            "win_probability": team_win_rate["win_probability"],
+            "advantage_level": get_confident_advantage_level(team_win_rate["lower"], team_win_rate["upper"])
+        }
+
+    def get_best_picks(self, team="your", limit=5):
+        """
+        Get the best remaining picks for a team.
+
+        Candidates are ranked by their average win rate against the opposing
+        picks so far, then by the synergy they would add to the team.
+
+        Args:
+            team (str): "your" or "enemy"
+            limit (int): Maximum number of picks to return
+
+        Returns:
+            list: List of pick dictionaries, best first
+        """
+        if team not in TEAMS:
+            raise ValueError(f"Unknown team: {team}")
+
+        opponent = "enemy" if team == "your" else "your"
+        n_opponents = len(self.picks[opponent])
+        summed = self._vs_enemy if team == "your" else self._vs_your
+
+        candidates = np.flatnonzero(self._available)
+        if n_opponents > 0:
+            expected = summed[candidates] / n_opponents
+        else:
+            expected = np.full(len(candidates), DEFAULT_WIN_RATE)
+
+        current_synergy = self._team_synergy(team)
+        team_size = len(self.picks[team]) + 1
+
+        best_picks = []
+        for i, expected_win_rate in zip(candidates, expected):
+            civ = self._civs[i]
+            counts = dict(self._specialty_counts[team])
+            for spec in civ.get("specialty", []):
+                counts[spec] = counts.get(spec, 0) + 1
+            synergy = calculate_synergy_from_counts(counts, team_size)
+
+            best_picks.append({
+                "id": civ["id"],
+                "name": civ["name"],
+                "expected_win_rate": round(float(expected_win_rate), 1),
+                "synergy": synergy,
+                "synergy_gain": round(synergy - current_synergy, 2)
+            })
+
+        best_picks.sort(key=lambda pick: (pick["expected_win_rate"], pick["synergy"]), reverse=True)
+        return best_picks[:limit]
+
+    def _take(self, civ_id, team):
+        """Mark a civilization as no longer available and return its matrix index."""
+        if team is not None and team not in TEAMS:
+            raise ValueError(f"Unknown team: {team}")
+        if civ_id not in self._index:
+            raise ValueError(f"Unknown civilization: {civ_id}")
+
+        i = self._index[civ_id]
+        if not self._available[i]:
+            raise ValueError(f"Civilization {civ_id} has already been picked or banned")
+
+        self._available[i] = False
+        return i
+
+    def _update_specialties(self, team, civ_id, delta):
+        """Add or remove a civilization's specialties from a team's counts."""
+        counts = self._specialty_counts[team]
+        for spec in self._civs[self._index[civ_id]].get("specialty", []):
+            counts[spec] = counts.get(spec, 0) + delta
+            if counts[spec] <= 0:
+                del counts[spec]
+
+    def _team_synergy(self, team):
+        """Get a team's synergy score from its running specialty counts."""
+        return calculate_synergy_from_counts(self._specialty_counts[team], len(self.picks[team]))
@@ -0,0 +1,320 @@
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .build_timeline import AGES, RESOURCES, get_villager_assignments
+from .data_loader import cached_per_data_version
+
+# Resources gathered per villager per second, including walking time
+GATHER_RATES = {"food": 0.33, "wood": 0.39, "gold": 0.38, "stone": 0.36}
+
+# Stockpile at the start of a standard game
+STARTING_RESOURCES = {"food": 200, "wood": 200, "gold": 100, "stone": 200}
+
+# Villagers at the start of a standard game (their cost is not charged)
+STARTING_VILLAGERS = 3
+
+VILLAGER_COST = {"food": 50}
+
+# Cost of researching each age (see AGES)
+AGE_UP_COSTS = {
+    "feudal": {"food": 500},
+    "castle": {"food": 800, "gold": 200},
+    "imperial": {"food": 1000, "gold": 800}
+}
+
+# Seconds it takes to research each age
+AGE_RESEARCH_TIMES = {"feudal": 130, "castle": 160, "imperial": 190}
+
+# Cost of the buildings whose timing matters for most build orders
+BUILDING_COSTS = {
+    "Barracks": {"wood": 175},
+    "Archery Range": {"wood": 175},
+    "Stable": {"wood": 175},
+    "Blacksmith": {"wood": 150},
+    "Market": {"wood": 175},
+    "Monastery": {"wood": 175},
+    "Siege Workshop": {"wood": 200},
+    "University": {"wood": 200},
+    "Town Center": {"wood": 275, "stone": 100},
+    "Castle": {"stone": 650}
+}
+
+# Length (s) and resolution (s) of the simulated time grid
+SIMULATION_DURATION = 30 * 60
+TIME_STEP = 1
+
+# Number of builds simulated at once when simulating the whole catalog
+SIMULATION_CHUNK_SIZE = 256
+
+# Modifiers that leave the standard economy unchanged (see civ_modifiers.CivModifiers)
+NO_MODIFIERS = {
+    "gather_multipliers": np.ones(len(RESOURCES)),
+    "villager_cost_multiplier": 1.0,
+    "starting_resources": np.zeros(len(RESOURCES)),
+    "age_up_cost_multipliers": np.ones((len(AGES), len(RESOURCES))),
+    "building_cost_multipliers": np.ones((len(BUILDING_COSTS), len(RESOURCES)))
+}
+
+def cost_matrix(costs):
+    """
+    Convert costs per item into an array.
+
+    Args:
+        costs (dict): Mapping of item name to {resource: amount}
+
+    Returns:
+        numpy.ndarray: Costs of shape (items, len(RESOURCES)), in item order
+    """
+    return np.array(
+        [[cost.get(resource, 0) for resource in RESOURCES] for cost in costs.values()], dtype=float
+    ).reshape(len(costs), len(RESOURCES))
+
+def _first_affordable(stockpiles, costs, time_grid):
+    """
+    Find when each cost is first covered by the stockpile.
+
+    Args:
+        stockpiles (numpy.ndarray): Stockpiles of shape (resources, builds, times)
+        costs (numpy.ndarray): Costs of shape (items, resources)
+        time_grid (numpy.ndarray): Times of the last axis
+
+    Returns:
+        numpy.ndarray: Time of shape (builds, items), NaN if never affordable
+    """
+    # Compare only the resources an item costs
+    times = np.full((stockpiles.shape[1], len(costs)), np.nan)
+    for item, cost in enumerate(costs):
+        affordable = np.ones(stockpiles.shape[1:], dtype=bool)
+        for resource in np.flatnonzero(cost):
+            affordable &= stockpiles[resource] >= cost[resource]
+        first = affordable.argmax(axis=1)
+        times[:, item] = np.where(affordable.any(axis=1), time_grid[first], np.nan)
+    return times
+
+def get_modifier(modifiers, name):
+    """
+    Get one modifier of a civilization.
+
+    Args:
+        modifiers (CivModifiers): Compiled civilization bonuses (see
+            civ_modifiers), or None for the standard economy
+        name (str): Modifier name, e.g. "gather_multipliers"
+
+    Returns:
+        numpy.ndarray or float: Modifier value (see NO_MODIFIERS)
+    """
+    return NO_MODIFIERS[name] if modifiers is None else getattr(modifiers, name)
+
+def _villager_timeline(build_orders, time_grid):
+    """
+    Turn the villager assignments of several builds into arrays on a time grid.
+
+    Returns:
+        tuple: (villagers, banked, trained, has_villager_data) where villagers
+            is the number of villagers per resource at each time (builds,
+            times, resources), banked the villager-seconds per resource
+            gathered before each time (resources, builds, times), and trained
+            the villagers trained beyond STARTING_VILLAGERS (builds, times)
+    """
+    n_builds, n_times = len(build_orders), len(time_grid)
+
+    # Villager changes at each assignment's grid index, for a cumulative sum
+    changes = np.zeros((n_builds, n_times, len(RESOURCES)))
+    has_villager_data = np.zeros(n_builds, dtype=bool)
+    for b, build_order in enumerate(build_orders):
+        previous = np.zeros(len(RESOURCES))
+        for time, counts in get_villager_assignments(build_order):
+            if time > time_grid[-1]:
+                break
+            counts = np.array([counts[resource] for resource in RESOURCES], dtype=float)
+            changes[b, int(max(time, 0) // TIME_STEP)] += counts - previous
+            previous = counts
+            has_villager_data[b] = True
+    villagers = np.cumsum(changes, axis=1)
+
+    # Gathering during a step is banked at its end. Stored one resource at a
+    # time, as each resource has its own rate and costs
+    banked = np.zeros((len(RESOURCES), n_builds, n_times))
+    banked[:, :, 1:] = np.moveaxis(np.cumsum(villagers[:, :-1], axis=1), 2, 0) * TIME_STEP
+
+    # Villagers are never lost, so the most ever assigned is the number trained
+    trained = np.maximum(np.maximum.accumulate(villagers.sum(axis=2), axis=1) - STARTING_VILLAGERS, 0)
+
+    return villagers, banked, trained, has_villager_data
+
+def _run_economy(banked, trained, time_grid, modifiers):
+    """Compute the gather rates, stockpiles and affordability of a villager timeline."""
+    rates = cost_matrix({"rates": GATHER_RATES})[0] * get_modifier(modifiers, "gather_multipliers")
+    villager_cost = cost_matrix({"villager": VILLAGER_COST})[0] * get_modifier(modifiers, "villager_cost_multiplier")
+    start = cost_matrix({"start": STARTING_RESOURCES})[0] + get_modifier(modifiers, "starting_resources")
+
+    stockpiles = np.empty_like(banked)
+    deficit = np.zeros(trained.shape, dtype=bool)
+    for resource in range(len(RESOURCES)):
+        np.multiply(banked[resource], rates[resource], out=stockpiles[resource])
+        stockpiles[resource] += start[resource]
+        if villager_cost[resource]:
+            stockpiles[resource] -= trained * villager_cost[resource]
+        # Gathering only adds, so only spending can make a stockpile negative
+        if villager_cost[resource] or start[resource] < 0:
+            deficit |= stockpiles[resource] < 0
+
+    age_up_costs = cost_matrix({age: AGE_UP_COSTS[age] for age in AGES}) * get_modifier(
+        modifiers, "age_up_cost_multipliers"
+    )
+    building_costs = cost_matrix(BUILDING_COSTS) * get_modifier(modifiers, "building_cost_multipliers")
+
+    return {
+        "rates": rates,
+        "stockpiles": stockpiles,
+        "age_up_affordable": _first_affordable(stockpiles, np.cumsum(age_up_costs, axis=0), time_grid),
+        "building_affordable": _first_affordable(stockpiles, building_costs, time_grid),
+        "first_deficit": np.where(deficit.any(axis=1), time_grid[deficit.argmax(axis=1)], np.nan)
+    }
+
+def simulate_economies(build_orders, duration=SIMULATION_DURATION, modifiers=None):
+    """
+    Simulate the economy of several build orders at once.
+
+    Each build's villager assignments become a per-second villager count
+    per resource on a shared time grid (a cumulative sum of the changes at
+    each assignment), income is that count times GATHER_RATES, and the
+    stockpile is the cumulative income on top of STARTING_RESOURCES, minus
+    the food spent on villagers beyond STARTING_VILLAGERS. Nothing else the
+    build spends on is known, so stockpiles are an upper bound.
+
+    Age-ups are affordable once the stockpile covers the cost of that age
+    and all earlier ones; buildings are checked on their own.
+
+    Args:
+        build_orders (list): Build order dictionaries
+        duration (int): Seconds to simulate
+        modifiers (CivModifiers): Civilization bonuses to apply (see
+            civ_modifiers), or None for the standard economy
+
+    Returns:
+        dict: Simulation results with the following keys:
+            time (numpy.ndarray): Time grid in seconds, shape (times,)
+            villagers, income, stockpiles (numpy.ndarray): Villagers, income
+                per second and stockpile per resource (see RESOURCES), shape
+                (builds, times, resources)
+            has_villager_data (numpy.ndarray): Whether each build has villager assignments
+            age_up_affordable (numpy.ndarray): Time each age (see AGES) becomes
+                affordable, shape (builds, ages), NaN if never
+            building_affordable (numpy.ndarray): Time each building (see
+                BUILDING_COSTS) becomes affordable, shape (builds, buildings), NaN if never
+            first_deficit (numpy.ndarray): First time a stockpile is negative, NaN if never
+    """
+    time_grid = np.arange(0, duration + TIME_STEP, TIME_STEP, dtype=float)
+    villagers, banked, trained, has_villager_data = _villager_timeline(build_orders, time_grid)
+    economy = _run_economy(banked, trained, time_grid, modifiers)
+
+    return {
+        "time": time_grid,
+        "villagers": villagers,
+        "income": villagers * economy["rates"],
+        "stockpiles": np.moveaxis(economy["stockpiles"], 0, 2),
+        "has_villager_data": has_villager_data,
+        "age_up_affordable": economy["age_up_affordable"],
+        "building_affordable": economy["building_affordable"],
+        "first_deficit": economy["first_deficit"]
+    }
+
+def simulate_civilizations(build_orders, civ_modifiers, duration=SIMULATION_DURATION):
+    """
+    Simulate several build orders for several civilizations.
+
+    The villager timeline of each build is computed once and only the
+    rates, costs and starting resources change per civilization.
+
+    Args:
+        build_orders (list): Build order dictionaries
+        civ_modifiers (list): CivModifiers of each civilization
+        duration (int): Seconds to simulate
+
+    Returns:
+        dict: "has_villager_data" of shape (builds,), and "age_up_affordable",
+            "building_affordable" and "first_deficit" (see simulate_economies)
+            with an extra leading civilization axis
+    """
+    time_grid = np.arange(0, duration + TIME_STEP, TIME_STEP, dtype=float)
+    _, banked, trained, has_villager_data = _villager_timeline(build_orders, time_grid)
+    keys = ("age_up_affordable", "building_affordable", "first_deficit")
+
+    results = {key: [] for key in keys}
+    for modifiers in civ_modifiers:
+        economy = _run_economy(banked, trained, time_grid, modifiers)
+        for key in keys:
+            results[key].append(economy[key])
+
+    item_shapes = {"age_up_affordable": (len(AGES),), "building_affordable": (len(BUILDING_COSTS),),
+                   "first_deficit": ()}
+    simulation = {
+        key: np.stack(results[key]) if results[key]
+        else np.full((0, len(build_orders)) + item_shapes[key], np.nan)
+        for key in keys
+    }
+    simulation["has_villager_data"] = has_villager_data
+    return simulation
+
+def simulate_economy(build_order, duration=SIMULATION_DURATION, modifiers=None):
+    """
+    Simulate the economy of a single build order.
+
+    Args:
+        build_order (dict): Build order dictionary
+        duration (int): Seconds to simulate
+        modifiers (CivModifiers): Civilization bonuses to apply, or None
+
+    Returns:
+        dict: Simulation results with the following keys:
+            time (numpy.ndarray): Time grid in seconds
+            villagers, income, stockpiles (numpy.ndarray):
+                Per resource (see RESOURCES), shape (times, resources)
+            has_villager_data (bool): Whether the build has villager assignments
+            age_up_affordable (dict): Age name to time it becomes affordable (None if never)
+            building_affordable (dict): Building name to time it becomes affordable (None if never)
+            first_deficit (float or None): First time a stockpile is negative
+    """
+    result = simulate_economies([build_order], duration, modifiers)
+    return {
+        "time": result["time"],
+        "villagers": result["villagers"][0],
+        "income": result["income"][0],
+        "stockpiles": result["stockpiles"][0],
+        "has_villager_data": bool(result["has_villager_data"][0]),
+        "age_up_affordable": _as_times(AGES, result["age_up_affordable"][0]),
+        "building_affordable": _as_times(BUILDING_COSTS, result["building_affordable"][0]),
+        "first_deficit": _as_times(["deficit"], result["first_deficit"][:1])["deficit"]
+    }
+
+def _as_times(names, times):
+    """Map names to times in seconds, with None for NaN."""
+    return {name: None if np.isnan(time) else float(time) for name, time in zip(names, times)}
+
+@cached_per_data_version
+def get_catalog_economy():
+    """
+    Simulate every build order of the catalog.
+
+    Builds are simulated in chunks of SIMULATION_CHUNK_SIZE and only the
+    summary arrays are kept, indexed by catalog position.
+
+    Returns:
+        dict: "has_villager_data", "age_up_affordable", "building_affordable"
+            and "first_deficit" arrays (see simulate_economies), read-only
+    """
+    catalog = get_build_order_catalog()
+    keys = ("has_villager_data", "age_up_affordable", "building_affordable", "first_deficit")
+    chunks = {key: [] for key in keys}
+
+    for start in range(0, len(catalog), SIMULATION_CHUNK_SIZE):
+        result = simulate_economies(catalog.build_orders[start:start + SIMULATION_CHUNK_SIZE])
+        for key in keys:
+            chunks[key].append(result[key])
+
+    empty = simulate_economies([], duration=0)
+    economy = {key: np.concatenate(chunks[key]) if chunks[key] else empty[key] for key in keys}
+    for array in economy.values():
+        array.setflags(write=False)
+    return economy
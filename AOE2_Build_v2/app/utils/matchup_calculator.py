@@ -1,51 +1,54 @@
 from .data_loader import load_civilizations, load_matchup_data
+from .matchup_confidence import bootstrap_team_win_rate, wilson_interval
+from .matchup_store import get_matchup_submatrix
 
-def calculate_team_matchup(your_team, enemy_team):
+# Fixed seed so the displayed intervals don't jitter between page reruns
+BOOTSTRAP_SEED = 0
+
+def calculate_team_matchup(your_team, enemy_team, map_id=None):
     """
     Calculate the matchup analysis between two teams.
     
+    Matchup win rates are weighted by their sample sizes: each cell is
+    shrunk towards 50% in proportion to how few games it is based on, and
+    the team win rate interval is bootstrapped from the same posteriors.
+    
     Args:
         your_team (list): List of civilization dictionaries for your team
         enemy_team (list): List of civilization dictionaries for enemy team
+        map_id (int or str): ID or name of the map to use map-specific win rates
         
     Returns:
         dict: Analysis of the team matchup
+        
+    Raises:
+        ValueError: If the map is unknown
     """
     # Calculate team synergy scores
     your_team_synergy = calculate_team_synergy(your_team)
     enemy_team_synergy = calculate_team_synergy(enemy_team)
     
     # Calculate team matchup matrix
-    matchup_matrix = []
-    overall_win_rate = 0
-    
-    for your_civ in your_team:
-        row = []
-        for enemy_civ in enemy_team:
-            matchup_data = load_matchup_data(your_civ["id"], enemy_civ["id"])
-            row.append(matchup_data.get("win_rate", 50))
-            overall_win_rate += matchup_data.get("win_rate", 50)
-        matchup_matrix.append(row)
-    
-    # Calculate average win rate across all matchups
-    total_matchups = len(your_team) * len(enemy_team)
-    average_win_rate = overall_win_rate / total_matchups if total_matchups > 0 else 50
-    
-    # Determine advantage level
-    if average_win_rate >= 55:
-        advantage_level = "Strong Advantage"
-    elif average_win_rate >= 52.5:
-        advantage_level = "Moderate Advantage"
-    elif average_win_rate >= 50.5:
-        advantage_level = "Slight Advantage"
-    elif average_win_rate >= 49.5:
-        advantage_level = "Even"
-    elif average_win_rate >= 47.5:
-        advantage_level = "Slight Disadvantage"
-    elif average_win_rate >= 45:
-        advantage_level = "Moderate Disadvantage"
-    else:
-        advantage_level = "Strong Disadvantage"
+    win_rates, sample_sizes = get_matchup_submatrix(
+        [civ["id"] for civ in your_team],
+        [civ["id"] for civ in enemy_team],
+        map_id=map_id
+    )
+    matchup_matrix = win_rates.tolist()
+    
+    # Confidence interval for every matchup
+    lower, upper = wilson_interval(win_rates, sample_sizes)
+    matchup_intervals = [
+        [(round(float(lo), 1), round(float(hi), 1)) for lo, hi in zip(row_lower, row_upper)]
+        for row_lower, row_upper in zip(lower, upper)
+    ]
+    
+    # Sample-size-aware average win rate and its uncertainty
+    team_win_rate = bootstrap_team_win_rate(win_rates, sample_sizes, seed=BOOTSTRAP_SEED)
+    average_win_rate = team_win_rate["mean"]
+    
+    # Determine advantage level, only claiming what the data supports
+    advantage_level = get_confident_advantage_level(team_win_rate["lower"], team_win_rate["upper"])
     
     # Get team strengths
     your_team_strengths = get_team_strengths(your_team)
@@ -73,7 +76,11 @@ def calculate_team_matchup(your_team, enemy_team):
         "your_team_synergy": your_team_synergy,
         "enemy_team_synergy": enemy_team_synergy,
         "matchup_matrix": matchup_matrix,
+        "matchup_sample_sizes": sample_sizes.tolist(),
+        "matchup_intervals": matchup_intervals,
         "average_win_rate": average_win_rate,
+        "win_rate_interval": (team_win_rate["lower"], team_win_rate["upper"]),
+        "win_probability": team_win_rate["win_probability"],
         "advantage_level": advantage_level,
         "your_team_strengths": your_team_strengths,
         "enemy_team_strengths": enemy_team_strengths,
@@ -94,18 +101,36 @@ def calculate_team_synergy(team):
     if not team:
         return 0
     
-    # Base synergy score
-    synergy = 5.0
-    
     # In a real app, this would be based on data and more sophisticated logic
     # Here we'll use a simplified approach
     
-    # Check for specialty diversity
-    specialties = []
+    # Count specialties across the team
+    specialty_counts = {}
     for civ in team:
-        specialties.extend(civ.get("specialty", []))
+        for spec in civ.get("specialty", []):
+            specialty_counts[spec] = specialty_counts.get(spec, 0) + 1
+    
+    return calculate_synergy_from_counts(specialty_counts, len(team))
+
+def calculate_synergy_from_counts(specialty_counts, team_size):
+    """
+    Calculate the synergy score from a team's specialty counts.
+    
+    Args:
+        specialty_counts (dict): Mapping of specialty to number of civs with it
+        team_size (int): Number of civilizations in the team
+        
+    Returns:
+        float: Synergy score (0-10)
+    """
+    if team_size <= 0:
+        return 0
+    
+    # Base synergy score
+    synergy = 5.0
     
-    unique_specialties = set(specialties)
+    # Check for specialty diversity
+    unique_specialties = {spec for spec, count in specialty_counts.items() if count > 0}
     
     # Bonus for having diverse specialties
     if len(unique_specialties) >= 4:
@@ -131,11 +156,6 @@ def calculate_team_synergy(team):
     if "Economy" in unique_specialties and "Monks" in unique_specialties:
         synergy += 0.3  # Good for booming and controlling relics
     
-    # Check for too much overlap (penalties)
-    specialty_counts = {}
-    for spec in specialties:
-        specialty_counts[spec] = specialty_counts.get(spec, 0) + 1
-    
     # Penalty for too much overlap in primary specialties
     for spec, count in specialty_counts.items():
         if count > 2 and spec in ["Cavalry", "Archers", "Infantry"]:
@@ -143,12 +163,59 @@ def calculate_team_synergy(team):
     
     # Check team bonuses (in a real app, this would analyze actual bonuses)
     # Here we'll simulate it based on team size
-    if len(team) >= 3:
+    if team_size >= 3:
         synergy += 0.5  # Bonus for having more team bonuses
     
     # Ensure synergy score is between 1 and 10
     return max(1, min(10, synergy))
 
+def get_advantage_level(win_rate):
+    """
+    Get the advantage level label for a win rate.
+    
+    Args:
+        win_rate (float): Win rate percentage
+        
+    Returns:
+        str: Advantage level label
+    """
+    if win_rate >= 55:
+        return "Strong Advantage"
+    elif win_rate >= 52.5:
+        return "Moderate Advantage"
+    elif win_rate >= 50.5:
+        return "Slight Advantage"
+    elif win_rate >= 49.5:
+        return "Even"
+    elif win_rate >= 47.5:
+        return "Slight Disadvantage"
+    elif win_rate >= 45:
+        return "Moderate Disadvantage"
+    else:
+        return "Strong Disadvantage"
+
+def get_confident_advantage_level(lower, upper):
+    """
+    Get an advantage level that only claims what the data supports.
+    
+    A matchup whose win rate interval contains 50% is labelled "Even".
+    Otherwise the label is taken from the interval bound closest to 50%.
+    
+    Args:
+        lower (float): Lower bound of the win rate interval
+        upper (float): Upper bound of the win rate interval
+        
+    Returns:
+        str: Advantage level label
+    """
+    if lower > 50:
+        level = get_advantage_level(lower)
+        return "Slight Advantage" if level == "Even" else level
+    if upper < 50:
+        level = get_advantage_level(upper)
+        return "Slight Disadvantage" if level == "Even" else level
+    return "Even"
+
 def get_team_strengths(team):
     """
     Get the strengths of a team composition.
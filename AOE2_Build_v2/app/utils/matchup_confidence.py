@@ -0,0 +1,109 @@
+import numpy as np
+
+# z-score for a 95% confidence interval
+Z_95 = 1.96
+
+# Strength of the 50% prior, in games. Matchups with few games are pulled
+# towards an even matchup, while large samples are barely affected.
+PRIOR_GAMES = 50
+
+# Number of bootstrap draws for team-level win probabilities
+BOOTSTRAP_SAMPLES = 2000
+
+def wilson_interval(win_rates, sample_sizes, z=Z_95):
+    """
+    Compute Wilson score intervals for win rates.
+
+    Args:
+        win_rates (array-like): Win rates in percent
+        sample_sizes (array-like): Number of games behind each win rate
+        z (float): z-score of the confidence level
+
+    Returns:
+        tuple: (lower, upper) arrays in percent, shaped like win_rates
+    """
+    p = np.asarray(win_rates, dtype=float) / 100
+    n = np.asarray(sample_sizes, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denominator = 1 + z ** 2 / n
+        center = (p + z ** 2 / (2 * n)) / denominator
+        margin = z * np.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / denominator
+
+    # No games means no information
+    lower = np.where(n > 0, center - margin, 0.0)
+    upper = np.where(n > 0, center + margin, 1.0)
+
+    return np.clip(lower, 0, 1) * 100, np.clip(upper, 0, 1) * 100
+
+def beta_posterior(win_rates, sample_sizes, prior_games=PRIOR_GAMES):
+    """
+    Get the Beta posterior of each matchup's true win rate.
+
+    Args:
+        win_rates (array-like): Win rates in percent
+        sample_sizes (array-like): Number of games behind each win rate
+        prior_games (float): Weight of the even-matchup prior, in games
+
+    Returns:
+        tuple: (alpha, beta) arrays of Beta distribution parameters
+    """
+    p = np.asarray(win_rates, dtype=float) / 100
+    n = np.asarray(sample_sizes, dtype=float)
+
+    wins = p * n
+    alpha = wins + prior_games / 2
+    beta = (n - wins) + prior_games / 2
+    return alpha, beta
+
+def posterior_win_rates(win_rates, sample_sizes, prior_games=PRIOR_GAMES):
+    """
+    Get sample-size-aware win rates (posterior means) in percent.
+
+    Args:
+        win_rates (array-like): Win rates in percent
+        sample_sizes (array-like): Number of games behind each win rate
+        prior_games (float): Weight of the even-matchup prior, in games
+
+    Returns:
+        numpy.ndarray: Posterior mean win rates in percent
+    """
+    alpha, beta = beta_posterior(win_rates, sample_sizes, prior_games)
+    return alpha / (alpha + beta) * 100
+
+def bootstrap_team_win_rate(win_rates, sample_sizes, n_samples=BOOTSTRAP_SAMPLES,
+                            confidence=0.95, seed=None):
+    """
+    Estimate the uncertainty of a team's average win rate.
+
+    All matchup cells are resampled from their Beta posteriors in a single
+    vectorized draw of shape (n_samples, your team size, enemy team size).
+
+    Args:
+        win_rates (array-like): Matchup win rate matrix in percent
+        sample_sizes (array-like): Matching matrix of sample sizes
+        n_samples (int): Number of bootstrap draws
+        confidence (float): Confidence level of the returned interval
+        seed (int): Seed for reproducible draws
+
+    Returns:
+        dict: Mean win rate, interval bounds and probability of being favoured
+    """
+    alpha, beta = beta_posterior(win_rates, sample_sizes)
+
+    if alpha.size == 0:
+        return {"mean": 50.0, "lower": 0.0, "upper": 100.0, "win_probability": 0.5}
+
+    rng = np.random.default_rng(seed)
+    draws = rng.beta(alpha, beta, size=(n_samples,) + alpha.shape)
+    team_win_rates = draws.reshape(n_samples, -1).mean(axis=1) * 100
+
+    tail = (1 - confidence) / 2 * 100
+    lower, upper = np.percentile(team_win_rates, [tail, 100 - tail])
+
+    return {
+        "mean": float((alpha / (alpha + beta)).mean() * 100),
+        "lower": float(lower),
+        "upper": float(upper),
+        "win_probability": float((team_win_rates > 50).mean())
+    }
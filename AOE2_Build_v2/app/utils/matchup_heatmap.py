@@ -0,0 +1,164 @@
+import json
+
+import numpy as np
+
+from .data_loader import _get_data_dir, cached_per_data_version, get_data_version, load_civilizations
+from .matchup_store import load_matchup_table
+
+HEATMAP_FILE = "matchup_heatmap.npz"
+
+def get_cluster_order(win_rates):
+    """
+    Order civilizations so that those with similar matchup profiles are adjacent.
+
+    Uses average-linkage agglomerative clustering on the distance between
+    profiles (each civ's row of win rates followed by its column), and returns
+    the leaf order of the resulting tree.
+
+    Args:
+        win_rates (numpy.ndarray): Square win rate matrix
+
+    Returns:
+        numpy.ndarray: Permutation of the matrix indices
+    """
+    n_civs = len(win_rates)
+    if n_civs <= 2:
+        return np.arange(n_civs)
+
+    profiles = np.hstack([win_rates, win_rates.T]).astype(float)
+    distances = np.sqrt(((profiles[:, None, :] - profiles[None, :, :]) ** 2).sum(axis=2))
+
+    # Each cluster keeps its leaves in display order
+    clusters = [[i] for i in range(n_civs)]
+    sizes = np.ones(n_civs)
+    np.fill_diagonal(distances, np.inf)
+
+    active = np.ones(n_civs, dtype=bool)
+    while active.sum() > 1:
+        a, b = np.unravel_index(np.argmin(distances), distances.shape)
+        a, b = min(a, b), max(a, b)
+
+        # Average linkage: size-weighted mean of the merged clusters' distances
+        merged = (distances[a] * sizes[a] + distances[b] * sizes[b]) / (sizes[a] + sizes[b])
+        distances[a, :] = merged
+        distances[:, a] = merged
+        distances[a, a] = np.inf
+        distances[b, :] = np.inf
+        distances[:, b] = np.inf
+
+        clusters[a] = clusters[a] + clusters[b]
+        sizes[a] += sizes[b]
+        active[b] = False
+
+    return np.array(clusters[int(np.flatnonzero(active)[0])])
+
+def build_matchup_heatmap():
+    """
+    Compute the all-pairs matchup heatmap in clustered order.
+
+    Returns:
+        dict: Heatmap data with the civ IDs, names, ordered win rates and a
+            prebuilt Plotly figure (as a dict)
+    """
+    table = load_matchup_table()
+    names = {civ["id"]: civ["name"] for civ in load_civilizations()}
+
+    order = get_cluster_order(table["win_rates"])
+    civ_ids = [table["civ_ids"][i] for i in order]
+    civ_names = [names.get(civ_id, str(civ_id)) for civ_id in civ_ids]
+    win_rates = table["win_rates"][np.ix_(order, order)].astype(np.float32)
+
+    return {
+        "version": get_data_version(),
+        "civ_ids": civ_ids,
+        "civ_names": civ_names,
+        "win_rates": win_rates,
+        "figure": _build_heatmap_figure(win_rates, civ_names)
+    }
+
+def _build_heatmap_figure(win_rates, civ_names):
+    """Build the Plotly heatmap figure as a JSON-compatible dict."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=go.Heatmap(
+        z=win_rates,
+        x=civ_names,
+        y=civ_names,
+        colorscale='RdBu_r',  # Red-Blue scale (red = bad, blue = good)
+        zmin=35,  # Min win rate
+        zmax=65,  # Max win rate
+        zmid=50,  # 50% is neutral
+        colorbar=dict(
+            title="Win Rate %",
+            titleside="right"
+        )
+    ))
+
+    fig.update_layout(
+        title="Civilization Matchup Win Rates",
+        xaxis_title="Enemy Civilization",
+        yaxis_title="Your Civilization",
+        height=max(600, 16 * len(civ_names)),
+    )
+
+    return json.loads(fig.to_json())
+
+def save_matchup_heatmap(heatmap=None, path=None):
+    """
+    Precompute the matchup heatmap and save it as an artifact.
+
+    Args:
+        heatmap (dict): Heatmap to save (computed if not provided)
+        path (Path): Output file (defaults to the data directory)
+
+    Returns:
+        Path: Path of the saved artifact
+    """
+    heatmap = heatmap or build_matchup_heatmap()
+    path = path or _get_data_dir() / HEATMAP_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    np.savez_compressed(
+        path,
+        version=np.array(json.dumps(heatmap["version"])),
+        civ_ids=np.array(heatmap["civ_ids"]),
+        civ_names=np.array(heatmap["civ_names"]),
+        win_rates=heatmap["win_rates"],
+        figure=np.array(json.dumps(heatmap["figure"]))
+    )
+    return path
+
+@cached_per_data_version
+def load_matchup_heatmap():
+    """
+    Load the precomputed matchup heatmap.
+
+    The saved artifact is used when it was built from the current data.
+    Otherwise the heatmap is computed once and kept in memory.
+
+    Returns:
+        dict: Heatmap data (see build_matchup_heatmap)
+    """
+    path = _get_data_dir() / HEATMAP_FILE
+
+    if path.exists():
+        with np.load(path, allow_pickle=False) as artifact:
+            version = json.loads(str(artifact["version"]))
+            if version == json.loads(json.dumps(get_data_version())):
+                return {
+                    "version": get_data_version(),
+                    "civ_ids": artifact["civ_ids"].tolist(),
+                    "civ_names": artifact["civ_names"].tolist(),
+                    "win_rates": artifact["win_rates"],
+                    "figure": json.loads(str(artifact["figure"]))
+                }
+
+    return build_matchup_heatmap()
+
+def main():
+    """Precompute the matchup heatmap artifact."""
+    path = save_matchup_heatmap()
+    print(f"Saved matchup heatmap to {path}")
+
+if __name__ == "__main__":
+    main()
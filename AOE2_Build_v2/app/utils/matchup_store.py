@@ -0,0 +1,252 @@
+import numpy as np
+import pandas as pd
+
+from .data_loader import (
+    _get_data_dir,
+    cached_per_data_version,
+    load_civilizations,
+    load_maps,
+    load_matchup_data
+)
+
+# Win rate used for mirror matchups and missing pairs
+DEFAULT_WIN_RATE = 50.0
+
+# Games a map needs before its own win rate outweighs the global one
+MAP_PRIOR_GAMES = 200
+
+# Win rate shift for civs listed as strong/weak on a map, used as the map
+# prior before any per-map games are available
+MAP_STRENGTH_SHIFT = 2.0
+
+# Largest sample size stored in the compact per-map counts
+MAX_MAP_SAMPLE_SIZE = np.iinfo(np.uint16).max
+
+def _read_matchup_file():
+    """Read the matchup file, or return None if there is none."""
+    matchup_file = _get_data_dir() / "civilization_matchups.csv"
+    return pd.read_csv(matchup_file) if matchup_file.exists() else None
+
+def _split_map_rows(df):
+    """Split matchup rows into global rows and per-map rows (those with a map_id)."""
+    if "map_id" not in df.columns:
+        return df, df.iloc[0:0]
+    has_map = df["map_id"].notna()
+    return df[~has_map], df[has_map]
+
+@cached_per_data_version
+def load_matchup_table():
+    """
+    Load the win rates of all civilization pairs as dense matrices.
+
+    The table is built once per data version so that matchup lookups become
+    array indexing instead of a file read per civilization pair.
+
+    Returns:
+        dict: Matchup table with the following keys:
+            civ_ids (list): Civilization IDs in matrix order
+            index (dict): Mapping of civilization ID to matrix row/column
+            win_rates (numpy.ndarray): Win rate (%) of the row civ against the column civ
+            sample_sizes (numpy.ndarray): Number of games behind each win rate
+    """
+    civ_ids = [civ["id"] for civ in load_civilizations()]
+    df = _read_matchup_file()
+
+    # Include civilizations that only appear in the matchup file
+    if df is not None:
+        known = set(civ_ids)
+        for civ_id in pd.unique(df[["civ1_id", "civ2_id"]].values.ravel()):
+            if int(civ_id) not in known:
+                civ_ids.append(int(civ_id))
+                known.add(int(civ_id))
+
+    index = {civ_id: i for i, civ_id in enumerate(civ_ids)}
+    n_civs = len(civ_ids)
+
+    win_rates = np.full((n_civs, n_civs), DEFAULT_WIN_RATE)
+    sample_sizes = np.zeros((n_civs, n_civs), dtype=np.int64)
+
+    if df is not None:
+        # Keep the first global row for each pair, like load_matchup_data does
+        df, _ = _split_map_rows(df)
+        df = df.drop_duplicates(subset=["civ1_id", "civ2_id"], keep="first")
+        rows = df["civ1_id"].map(index).to_numpy()
+        cols = df["civ2_id"].map(index).to_numpy()
+        win_rates[rows, cols] = df["win_rate"].to_numpy(dtype=float)
+        sample_sizes[rows, cols] = df["sample_size"].to_numpy(dtype=np.int64)
+    else:
+        # No matchup file, fall back to the sample data pair by pair
+        for civ1_id in civ_ids:
+            for civ2_id in civ_ids:
+                if civ1_id == civ2_id:
+                    continue
+                matchup_data = load_matchup_data(civ1_id, civ2_id)
+                win_rates[index[civ1_id], index[civ2_id]] = matchup_data.get("win_rate", DEFAULT_WIN_RATE)
+                sample_sizes[index[civ1_id], index[civ2_id]] = matchup_data.get("sample_size", 0)
+
+    # Mirror matchups are always even
+    np.fill_diagonal(win_rates, DEFAULT_WIN_RATE)
+
+    # Shared between callers, so protect the arrays from accidental writes
+    win_rates.setflags(write=False)
+    sample_sizes.setflags(write=False)
+
+    return {
+        "civ_ids": civ_ids,
+        "index": index,
+        "win_rates": win_rates,
+        "sample_sizes": sample_sizes
+    }
+
+@cached_per_data_version
+def load_map_matchup_tensor():
+    """
+    Load map-specific win rates as a compact civ x civ x map tensor.
+
+    Each map's win rate is a blend of its own games and a prior, weighted by
+    the number of games on that map. The prior is the global win rate,
+    shifted for civs the map lists as strong or weak. Sparse maps therefore
+    fall back to the global value.
+
+    The blend is precomputed, so serving a map is a single slice. The tensor
+    is stored map-major (map, civ, civ) so each slice is a contiguous view.
+
+    Returns:
+        dict: Map matchup tensor with the following keys:
+            map_ids (list): Map IDs in tensor order
+            map_index (dict): Mapping of map ID and lowercase map name to tensor slice
+            win_rates (numpy.ndarray): float16 array of shape (maps, civs, civs)
+            sample_sizes (numpy.ndarray): uint16 per-map game counts (saturating)
+    """
+    table = load_matchup_table()
+    index = table["index"]
+    n_civs = len(table["civ_ids"])
+    maps = load_maps()
+
+    map_ids = [m["id"] for m in maps]
+    map_index = {}
+    for i, m in enumerate(maps):
+        map_index[m["id"]] = i
+        map_index[m["name"].lower()] = i
+
+    map_win_rates = np.zeros((len(maps), n_civs, n_civs))
+    map_sample_sizes = np.zeros((len(maps), n_civs, n_civs))
+
+    df = _read_matchup_file()
+    if df is not None:
+        _, map_rows = _split_map_rows(df)
+        map_rows = map_rows[
+            map_rows["map_id"].isin(map_ids)
+            & map_rows["civ1_id"].isin(index.keys())
+            & map_rows["civ2_id"].isin(index.keys())
+        ].drop_duplicates(subset=["map_id", "civ1_id", "civ2_id"], keep="first")
+
+        slices = map_rows["map_id"].map(map_index).to_numpy(dtype=np.intp)
+        rows = map_rows["civ1_id"].map(index).to_numpy(dtype=np.intp)
+        cols = map_rows["civ2_id"].map(index).to_numpy(dtype=np.intp)
+        map_win_rates[slices, rows, cols] = map_rows["win_rate"].to_numpy(dtype=float)
+        map_sample_sizes[slices, rows, cols] = map_rows["sample_size"].to_numpy(dtype=float)
+
+    # Per-civ strength on each map from the map's strong/weak lists
+    strength = np.zeros((len(maps), n_civs))
+    for i, m in enumerate(maps):
+        for civ_id in m.get("strong_civilizations", []):
+            if civ_id in index:
+                strength[i, index[civ_id]] += MAP_STRENGTH_SHIFT
+        for civ_id in m.get("weak_civilizations", []):
+            if civ_id in index:
+                strength[i, index[civ_id]] -= MAP_STRENGTH_SHIFT
+
+    prior = table["win_rates"][None, :, :] + (strength[:, :, None] - strength[:, None, :]) / 2
+    blended = (map_sample_sizes * map_win_rates + MAP_PRIOR_GAMES * prior) / (map_sample_sizes + MAP_PRIOR_GAMES)
+
+    win_rates = np.clip(blended, 0, 100).astype(np.float16)
+    for i in range(len(maps)):
+        np.fill_diagonal(win_rates[i], DEFAULT_WIN_RATE)
+    sample_sizes = np.minimum(map_sample_sizes, MAX_MAP_SAMPLE_SIZE).astype(np.uint16)
+
+    win_rates.setflags(write=False)
+    sample_sizes.setflags(write=False)
+
+    return {
+        "map_ids": map_ids,
+        "map_index": map_index,
+        "win_rates": win_rates,
+        "sample_sizes": sample_sizes
+    }
+
+def get_map_slice_index(map_id):
+    """
+    Get the tensor slice of a map.
+
+    Args:
+        map_id (int or str): ID or name of the map
+
+    Returns:
+        int or None: Slice index, or None if the map is unknown
+    """
+    if map_id is None:
+        return None
+    map_index = load_map_matchup_tensor()["map_index"]
+    if isinstance(map_id, str):
+        return map_index.get(map_id.lower())
+    return map_index.get(map_id)
+
+def get_matchup_submatrix(your_civ_ids, enemy_civ_ids, map_id=None):
+    """
+    Get the win rates and sample sizes for every pair of two civilization lists.
+
+    A map's win rates blend its own games with the global win rate, weighted
+    as MAP_PRIOR_GAMES games (see load_map_matchup_tensor). Their sample size
+    is counted the same way: the map's games plus up to MAP_PRIOR_GAMES of
+    the games on other maps. The map's games are part of the global count,
+    so it is never exceeded.
+
+    Args:
+        your_civ_ids (list): Civilization IDs for the rows
+        enemy_civ_ids (list): Civilization IDs for the columns
+        map_id (int or str): ID or name of the map, or None for all maps
+
+    Returns:
+        tuple: (win_rates, sample_sizes) arrays of shape (len(your_civ_ids), len(enemy_civ_ids))
+
+    Raises:
+        ValueError: If the map is unknown
+    """
+    table = load_matchup_table()
+    index = table["index"]
+
+    map_slice = get_map_slice_index(map_id)
+    if map_id is not None and map_slice is None:
+        raise ValueError(f"Unknown map: {map_id}")
+
+    if all(civ_id in index for civ_id in your_civ_ids) and all(civ_id in index for civ_id in enemy_civ_ids):
+        rows = np.array([index[civ_id] for civ_id in your_civ_ids], dtype=np.intp)
+        cols = np.array([index[civ_id] for civ_id in enemy_civ_ids], dtype=np.intp)
+        win_rates = table["win_rates"]
+        sample_sizes = table["sample_sizes"]
+
+        if map_slice is not None:
+            tensor = load_map_matchup_tensor()
+            win_rates = tensor["win_rates"][map_slice]
+            map_games = tensor["sample_sizes"][map_slice][np.ix_(rows, cols)].astype(np.int64)
+            other_games = np.maximum(sample_sizes[np.ix_(rows, cols)] - map_games, 0)
+            sample_sizes = map_games + np.minimum(other_games, MAP_PRIOR_GAMES)
+            return win_rates[np.ix_(rows, cols)].astype(float), sample_sizes
+
+        return win_rates[np.ix_(rows, cols)], sample_sizes[np.ix_(rows, cols)]
+
+    # Unknown civilizations are looked up individually, without map adjustments
+    win_rates = np.empty((len(your_civ_ids), len(enemy_civ_ids)))
+    sample_sizes = np.zeros((len(your_civ_ids), len(enemy_civ_ids)), dtype=np.int64)
+    for i, your_id in enumerate(your_civ_ids):
+        for j, enemy_id in enumerate(enemy_civ_ids):
+            if your_id in index and enemy_id in index:
+                win_rates[i, j] = table["win_rates"][index[your_id], index[enemy_id]]
+                sample_sizes[i, j] = table["sample_sizes"][index[your_id], index[enemy_id]]
+            else:
+                matchup_data = load_matchup_data(your_id, enemy_id)
+                win_rates[i, j] = matchup_data.get("win_rate", DEFAULT_WIN_RATE)
+                sample_sizes[i, j] = matchup_data.get("sample_size", 0)
+
+    return win_rates, sample_sizes
@@ -0,0 +1,215 @@
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .data_loader import cached_per_data_version
+
+# Preference added for each feature of a viewed build order
+VIEW_WEIGHT = 1.0
+
+# Preference added for each feature of a favorited build order
+FAVORITE_WEIGHT = 3.0
+
+# Preference added for each preferred build type/difficulty in the user settings
+SETTINGS_WEIGHT = 2.0
+
+# Factor applied to existing preferences on each update, so recent activity counts more
+PREFERENCE_DECAY = 0.95
+
+# Preferences below this magnitude are dropped to keep the vector small
+MIN_PREFERENCE = 0.01
+
+# How far personalization can move a build within a page (fraction of the page)
+PERSONALIZATION_WEIGHT = 0.5
+
+def get_build_features(build_order):
+    """
+    Get the named features of a build order used for personalization.
+
+    Args:
+        build_order (dict): Build order dictionary
+
+    Returns:
+        list: Feature names such as "type:fast castle", "map:arabia" or "civ:1"
+    """
+    features = []
+    if build_order.get("type"):
+        features.append(f"type:{build_order['type'].casefold()}")
+    if build_order.get("difficulty"):
+        features.append(f"difficulty:{build_order['difficulty'].casefold()}")
+    features.extend(f"map:{map_name.casefold()}" for map_name in build_order.get("suitable_maps", []))
+    features.extend(f"civ:{civ_id}" for civ_id in build_order.get("ideal_civilizations", []))
+    return features
+
+def get_feature_weights(build_order):
+    """
+    Get the weight of each feature of a build order.
+
+    Each feature group (type, difficulty, map, civ) has the same total
+    weight, split between its features, so builds listing many maps or civs
+    are not dominated by them. The weights form a unit-length vector.
+
+    Args:
+        build_order (dict): Build order dictionary
+
+    Returns:
+        dict: Mapping of feature name to weight
+    """
+    groups = {}
+    for feature in set(get_build_features(build_order)):
+        groups.setdefault(feature.split(":", 1)[0], []).append(feature)
+
+    weights = {}
+    for features in groups.values():
+        for feature in features:
+            weights[feature] = 1.0 / len(features)
+
+    norm = np.sqrt(sum(weight ** 2 for weight in weights.values()))
+    return {feature: float(weight / norm) for feature, weight in weights.items()}
+
+class BuildFeatureSpace:
+    """
+    Feature vectors of all build orders of a catalog.
+
+    Each build is a unit-length row over the feature vocabulary, so the dot
+    product with a (normalized) preference vector is their cosine similarity.
+    """
+
+    def __init__(self, catalog):
+        """
+        Build the feature matrix.
+
+        Args:
+            catalog (BuildOrderCatalog): Catalog to encode
+        """
+        self.catalog = catalog
+        build_weights = [get_feature_weights(bo) for bo in catalog]
+
+        self.index = {}
+        for weights in build_weights:
+            for feature in weights:
+                self.index.setdefault(feature, len(self.index))
+
+        self.features = np.zeros((len(catalog), len(self.index)), dtype=np.float32)
+        for position, weights in enumerate(build_weights):
+            for feature, weight in weights.items():
+                self.features[position, self.index[feature]] = weight
+        self.features.setflags(write=False)
+
+    def preference_vector(self, preferences):
+        """
+        Convert a preference dictionary into a unit vector over this vocabulary.
+
+        Args:
+            preferences (dict): Mapping of feature name to preference weight
+
+        Returns:
+            numpy.ndarray: float32 preference vector (all zeros if there are no known preferences)
+        """
+        vector = np.zeros(len(self.index), dtype=np.float32)
+        for feature, weight in preferences.items():
+            column = self.index.get(feature)
+            if column is not None:
+                vector[column] = weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+@cached_per_data_version
+def get_build_feature_space():
+    """
+    Get the build feature vectors for the current data version.
+
+    Returns:
+        BuildFeatureSpace: Shared feature space
+    """
+    return BuildFeatureSpace(get_build_order_catalog())
+
+def create_preferences(settings=None, favorite_build_orders=()):
+    """
+    Create a preference vector from user settings and existing favorites.
+
+    Args:
+        settings (dict): User settings with optional "preferred_build_types"
+            and "preferred_difficulty"
+        favorite_build_orders (iterable): Build orders the user has favorited
+
+    Returns:
+        dict: Mapping of feature name to preference weight
+    """
+    preferences = {}
+    settings = settings or {}
+
+    for build_type in settings.get("preferred_build_types", []):
+        preferences[f"type:{build_type.casefold()}"] = SETTINGS_WEIGHT
+    if settings.get("preferred_difficulty"):
+        preferences[f"difficulty:{settings['preferred_difficulty'].casefold()}"] = SETTINGS_WEIGHT
+
+    for build_order in favorite_build_orders:
+        update_preferences(preferences, build_order, FAVORITE_WEIGHT)
+
+    return preferences
+
+def update_preferences(preferences, build_order, weight):
+    """
+    Update a preference vector in place after an interaction with a build order.
+
+    Existing preferences decay a little, then the build's features gain
+    `weight` times their feature weight. A negative weight (e.g. removing a
+    favorite) takes preference away.
+
+    Args:
+        preferences (dict): Mapping of feature name to preference weight
+        build_order (dict): Build order that was viewed or (un)favorited
+        weight (float): Interaction weight, such as VIEW_WEIGHT or FAVORITE_WEIGHT
+
+    Returns:
+        dict: The updated preferences
+    """
+    feature_weights = get_feature_weights(build_order)
+    if not feature_weights:
+        return preferences
+
+    for feature in list(preferences):
+        preferences[feature] *= PREFERENCE_DECAY
+
+    for feature, feature_weight in feature_weights.items():
+        preferences[feature] = preferences.get(feature, 0.0) + weight * feature_weight
+
+    for feature in [f for f, value in preferences.items() if abs(value) < MIN_PREFERENCE]:
+        del preferences[feature]
+
+    return preferences
+
+def personalize_ranking(build_orders, preferences):
+    """
+    Re-rank recommended build orders for a user.
+
+    Each build keeps a base score from its position in the list (1 for the
+    first, close to 0 for the last) plus PERSONALIZATION_WEIGHT times its
+    cosine similarity with the user's preferences, so personalization
+    reorders builds with similar relevance but cannot bury the best ones.
+
+    Args:
+        build_orders (list): Ranked build orders, best first
+        preferences (dict): Mapping of feature name to preference weight
+
+    Returns:
+        list: The same build orders, re-ranked
+    """
+    if not preferences or len(build_orders) < 2:
+        return list(build_orders)
+
+    space = get_build_feature_space()
+    vector = space.preference_vector(preferences)
+    if not vector.any():
+        return list(build_orders)
+
+    positions = [space.catalog.positions.get(bo.get("id")) for bo in build_orders]
+    known = np.array([p is not None for p in positions])
+    affinity = np.zeros(len(build_orders), dtype=np.float32)
+    if known.any():
+        rows = np.array([p for p in positions if p is not None], dtype=np.intp)
+        affinity[known] = space.features[rows] @ vector
+
+    scores = 1.0 - np.arange(len(build_orders)) / len(build_orders) + PERSONALIZATION_WEIGHT * affinity
+    order = np.argsort(-scores, kind="stable")
+    return [build_orders[i] for i in order]
@@ -0,0 +1,221 @@
+from bisect import bisect_right
+from collections import namedtuple
+
+import numpy as np
+
+from .build_steps import get_compiled_steps
+from .build_timeline import RESOURCES, format_game_time, get_villager_assignments
+
+# Where a practice run is at a game time. current and next are the step rows
+# (see PracticeSchedule) due at the current and next step time, empty before
+# the first / after the last one; step_index is the index of the step time.
+PracticeState = namedtuple("PracticeState", [
+    "game_time",
+    "step_index",
+    "current",
+    "next",
+    "seconds_to_next",
+    "villagers",
+    "villager_changes",
+    "progress"
+])
+
+def _step_row(steps, i, time):
+    """Get the display fields of a compiled step (free-text steps only have an action)."""
+    population = steps.population[i]
+    return {
+        "number": steps.numbers[i],
+        "time": time,
+        "time_label": format_game_time(time),
+        "population": "" if np.isnan(population) else f"{population:g}",
+        "age": steps.age_names[i].capitalize(),
+        "action": steps.actions[i],
+        "details": steps.descriptions[i],
+        "key_point": bool(steps.key_points[i])
+    }
+
+class PracticeSchedule:
+    """
+    Build order steps and villager assignments compiled for timed lookups.
+
+    Everything a practice timer shows is worked out once: the step rows are
+    sorted and grouped by time, and the villager counts and their change
+    from the previous assignment are stored next to sorted assignment
+    times. Each lookup is then two binary searches.
+    """
+
+    def __init__(self, build_order):
+        """
+        Compile the schedule of a build order.
+
+        Steps without a time are due with the step before them.
+
+        Args:
+            build_order (dict): Build order dictionary
+        """
+        self.build_order_id = build_order.get("id")
+
+        steps = get_compiled_steps(build_order)
+        known = ~np.isnan(steps.time)
+        self.has_times = bool(known.any())
+
+        # Each step is due at the last known time up to it (0 before the first)
+        last_known = np.maximum.accumulate(np.where(known, np.arange(len(steps)), -1))
+        due = np.where(last_known >= 0, np.maximum(steps.time[np.maximum(last_known, 0)], 0.0), 0.0)
+        order = np.lexsort((np.arange(len(steps)), due))
+
+        # Steps due at the same time are shown together
+        self.step_times = []
+        self.steps = []
+        for i in order:
+            time = float(due[i])
+            if not self.step_times or time != self.step_times[-1]:
+                self.step_times.append(time)
+                self.steps.append(())
+            self.steps[-1] += (_step_row(steps, i, time),)
+
+        self.villager_times = []
+        self.villagers = []
+        self.villager_changes = []
+        previous = dict.fromkeys(RESOURCES, 0.0)
+        for time, counts in get_villager_assignments(build_order):
+            self.villager_times.append(time)
+            self.villagers.append(counts)
+            self.villager_changes.append({
+                resource: counts[resource] - previous[resource]
+                for resource in RESOURCES if counts[resource] != previous[resource]
+            })
+            previous = counts
+
+        self.duration = self.step_times[-1] if self.step_times else 0.0
+
+    def __len__(self):
+        return sum(len(steps) for steps in self.steps)
+
+    def at(self, game_time):
+        """
+        Get the current and next steps and the villagers at a game time.
+
+        Args:
+            game_time (float): Game time in seconds
+
+        Returns:
+            PracticeState: State of the build at that time
+        """
+        index = bisect_right(self.step_times, game_time) - 1
+        upcoming = index + 1 if index + 1 < len(self.steps) else None
+
+        assignment = bisect_right(self.villager_times, game_time) - 1
+        if assignment >= 0:
+            villagers, changes = self.villagers[assignment], self.villager_changes[assignment]
+        else:
+            villagers, changes = dict.fromkeys(RESOURCES, 0.0), {}
+
+        return PracticeState(
+            game_time=game_time,
+            step_index=index,
+            current=self.steps[index] if index >= 0 else (),
+            next=self.steps[upcoming] if upcoming is not None else (),
+            seconds_to_next=self.step_times[upcoming] - game_time if upcoming is not None else None,
+            villagers=villagers,
+            villager_changes=changes,
+            progress=min(max(game_time / self.duration, 0.0), 1.0) if self.duration > 0 else 1.0
+        )
+
+def get_practice_build(state, selected_build, practice_mode):
+    """
+    Get the build order to practice on this run of the page.
+
+    A build picked with "View Details" is only returned on the run right
+    after the click, while every timer button reruns the page. The build
+    being practiced is therefore kept in the session state until practice
+    mode is turned off.
+
+    Args:
+        state (MutableMapping): Session state
+        selected_build (dict): Build order picked on this run, or None
+        practice_mode (bool): Whether practice mode is on
+
+    Returns:
+        dict or None: Build order to practice, or None if there is none
+    """
+    if not practice_mode:
+        state.pop("practice_build_order", None)
+        return None
+    if selected_build:
+        state["practice_build_order"] = selected_build
+    return state.get("practice_build_order")
+
+def get_session_schedule(state, build_order):
+    """
+    Get the compiled schedule of a build order, compiled once per session and build.
+
+    Switching to another build rewinds the timer.
+
+    Args:
+        state (MutableMapping): Session state
+        build_order (dict): Build order dictionary
+
+    Returns:
+        PracticeSchedule: Schedule of the build order
+    """
+    key = (build_order.get("id"), build_order.get("name"))
+    cached = state.get("practice_schedule")
+    if cached is None or cached[0] != key:
+        cached = (key, PracticeSchedule(build_order))
+        state["practice_schedule"] = cached
+        reset_timer(state)
+    return cached[1]
+
+def reset_timer(state):
+    """
+    Stop the practice timer and rewind it to the start of the game.
+
+    Args:
+        state (MutableMapping): Session state
+    """
+    state["practice_running"] = False
+    state["practice_offset"] = 0.0
+
+def start_timer(state, speed, now):
+    """
+    Start the practice timer from where it stopped.
+
+    Args:
+        state (MutableMapping): Session state
+        speed (float): Game seconds per real second
+        now (float): Current time.monotonic()
+    """
+    state["practice_speed"] = speed
+    state["practice_started_at"] = now
+    state["practice_running"] = True
+
+def pause_timer(state, now):
+    """
+    Stop the practice timer, keeping its game time.
+
+    Args:
+        state (MutableMapping): Session state
+        now (float): Current time.monotonic()
+    """
+    state["practice_offset"] = get_timer_game_time(state, now)
+    state["practice_running"] = False
+
+def get_timer_game_time(state, now):
+    """
+    Get the game time of the practice timer.
+
+    Game time comes from the clock rather than from counting ticks, so it
+    keeps running across reruns of the page and slow ticks do not drift.
+
+    Args:
+        state (MutableMapping): Session state
+        now (float): Current time.monotonic()
+
+    Returns:
+        float: Game time in seconds
+    """
+    offset = state.get("practice_offset", 0.0)
+    if state.get("practice_running"):
+        return offset + (now - state["practice_started_at"]) * state["practice_speed"]
+    return offset
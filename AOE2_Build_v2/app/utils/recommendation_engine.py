@@ -1,86 +1,441 @@
-from .data_loader import load_build_orders, load_civilizations, load_maps
+import threading
+import time
+from collections import OrderedDict, namedtuple
 
-def get_recommended_build_orders(civilization_id=None, build_types=None, map_type=None, 
-                                difficulty=None, ally_civs=None, enemy_civs=None):
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .data_loader import cached_per_data_version, freeze_data, load_civilizations, load_maps
+from .personalization import personalize_ranking
+
+# Number of build orders per page of recommendations
+DEFAULT_PAGE_SIZE = 10
+
+# Steps on each side of neutral the ally complement score is rounded to
+ALLY_SCORE_LEVELS = 4
+
+# Ranked recommendation for one build order of the catalog. Scores are kept
+# here rather than written into the (shared) build order dictionaries.
+# rank_key is unique within a ranking and decreases from best to worst.
+RankedBuildOrder = namedtuple(
+    "RankedBuildOrder",
+    ["build_order_id", "position", "civ_score", "counter_score", "ally_score", "meta_relevance", "rank_key"]
+)
+
+# Position in a ranking: the next page starts after the build with this
+# rank_key. Only valid for the catalog version it was created from.
+RecommendationCursor = namedtuple("RecommendationCursor", ["version", "rank_key"])
+
+# Canonical form of the recommendation filters, used as the cache key
+RecommendationFilters = namedtuple(
+    "RecommendationFilters",
+    ["civilization_id", "build_types", "map_type", "difficulty", "ally_civs", "enemy_civs"]
+)
+
+class RecommendationCache:
     """
-    Get recommended build orders based on various filters.
+    LRU cache with a time-to-live for ranked recommendations.
     
-    Args:
-        civilization_id (int): ID of the selected civilization
-        build_types (list): List of build order types to filter
-        map_type (str): Map type to filter
-        difficulty (str): Difficulty level to filter
-        ally_civs (list): List of allied civilization names
-        enemy_civs (list): List of enemy civilization names
+    Entries belong to a catalog version: when the catalog changes, the whole
+    cache is dropped.
+    """
+    
+    def __init__(self, maxsize=256, ttl=600):
+        """
+        Create an empty cache.
+        
+        Args:
+            maxsize (int): Maximum number of cached filter combinations
+            ttl (float): Seconds before an entry expires
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, version):
+        """
+        Get a cached value.
+        
+        Args:
+            key: Cache key
+            version: Catalog version the value must belong to
+            
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, version, value):
+        """
+        Store a value, evicting the least recently used entry if full.
         
+        Args:
+            key: Cache key
+            version: Catalog version the value was computed from
+            value: Value to cache (must not be modified afterwards)
+        """
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        """
+        Get the cache statistics.
+        
+        Returns:
+            dict: Hits, misses, hit rate and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl
+            }
+    
+    def _check_version(self, version):
+        """Drop all entries if the catalog version changed."""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+_recommendation_cache = RecommendationCache()
+
+def _normalize_names(names):
+    """Get a sorted tuple of unique, case-folded names."""
+    return tuple(sorted({name.strip().casefold() for name in names or [] if name}))
+
+def normalize_filters(civilization_id=None, build_types=None, map_type=None,
+                      difficulty=None, ally_civs=None, enemy_civs=None):
+    """
+    Get the canonical form of a set of recommendation filters.
+    
+    Filters that select the same build orders map to the same value: lists
+    become sorted tuples and names are compared case-insensitively.
+    
     Returns:
-        list: List of recommended build orders
+        RecommendationFilters: Hashable, normalized filters
     """
-    # Load all build orders
-    all_build_orders = load_build_orders()
+    return RecommendationFilters(
+        civilization_id=civilization_id or None,
+        build_types=_normalize_names(build_types),
+        map_type=map_type.strip().casefold() if map_type else None,
+        difficulty=difficulty.strip().casefold() if difficulty else None,
+        ally_civs=_normalize_names(ally_civs),
+        enemy_civs=_normalize_names(enemy_civs)
+    )
+
+def _get_enemy_specialties(enemy_civs):
+    """Get the lowercase specialties of the named (case-folded) enemy civilizations."""
+    specialties = []
+    for civ in load_civilizations():
+        if civ["name"].casefold() in enemy_civs:
+            specialties.extend(spec.lower() for spec in civ.get("specialty", []))
+    return specialties
+
+def _get_ally_coverage(catalog, ally_civs):
+    """
+    Get the share of allies with each specialty of the catalog.
     
-    # No filters, return all build orders
-    if not civilization_id and not build_types and not map_type and not difficulty and not ally_civs and not enemy_civs:
-        return all_build_orders
+    Args:
+        catalog (BuildOrderCatalog): Catalog whose specialty columns to use
+        ally_civs (tuple): Case-folded names of the allied civilizations
+        
+    Returns:
+        numpy.ndarray: Fraction (0-1) of the allies having each specialty
+    """
+    coverage = np.zeros(len(catalog.specialties))
+    allies = [civ for civ in load_civilizations() if civ["name"].casefold() in ally_civs]
+    for civ in allies:
+        for spec in {spec.casefold() for spec in civ.get("specialty", [])}:
+            column = catalog.specialties.get(spec)
+            if column is not None:
+                coverage[column] += 1
+    return coverage / len(allies) if allies else coverage
+
+def get_ally_complement_scores(catalog, ally_civs):
+    """
+    Score how well every build of the catalog complements a team of allies.
     
-    # Apply filters
-    recommended = all_build_orders.copy()
+    A build scores +1 if it plays only to specialties none of the allies
+    have (e.g. a cavalry build next to an archer ally), -1 if all its
+    specialties are shared by every ally, and 0 if it has no known
+    specialties. This is a single product of the precomputed specialty
+    vectors with the allies' coverage, independent of the number of allies.
     
-    # Filter by civilization compatibility
-    if civilization_id:
-        # Keep build orders where the civilization is ideal or compatible
-        recommended = [bo for bo in recommended if 
-                     civilization_id in bo.get("ideal_civilizations", []) or 
-                     civilization_id in bo.get("compatible_civilizations", [])]
+    Args:
+        catalog (BuildOrderCatalog): Catalog to score
+        ally_civs (list): Allied civilization names
         
-        # Sort by civilization compatibility (ideal > compatible)
-        recommended.sort(key=lambda bo: 
-                      (civilization_id in bo.get("ideal_civilizations", []), 
-                       bo.get("meta_relevance", 0)), 
-                      reverse=True)
+    Returns:
+        numpy.ndarray: Complement score (-1 to 1) per catalog position
+    """
+    coverage = _get_ally_coverage(catalog, _normalize_names(ally_civs))
+    return catalog.specialty_vectors @ (1 - 2 * coverage)
+
+def _filter_mask(catalog, filters):
+    """Get a boolean mask of the catalog build orders that pass the filters."""
+    mask = np.ones(len(catalog), dtype=bool)
+    
+    # Filter by civilization compatibility (ideal or compatible)
+    if filters.civilization_id:
+        allowed = np.zeros(len(catalog), dtype=bool)
+        allowed[catalog.ideal_positions.get(filters.civilization_id, [])] = True
+        allowed[catalog.compatible_positions.get(filters.civilization_id, [])] = True
+        mask &= allowed
     
     # Filter by build order type
-    if build_types and len(build_types) > 0:
-        recommended = [bo for bo in recommended if bo.get("type", "") in build_types]
+    if filters.build_types:
+        codes = [catalog.types[t] for t in filters.build_types if t in catalog.types]
+        mask &= np.isin(catalog.type_codes, codes)
     
     # Filter by map type
-    if map_type:
-        recommended = [bo for bo in recommended if map_type in bo.get("suitable_maps", [])]
+    if filters.map_type:
+        allowed = np.zeros(len(catalog), dtype=bool)
+        allowed[catalog.map_positions.get(filters.map_type, [])] = True
+        mask &= allowed
     
     # Filter by difficulty
-    if difficulty:
-        recommended = [bo for bo in recommended if bo.get("difficulty", "") == difficulty]
-    
-    # Consider enemy civilizations
-    if enemy_civs and len(enemy_civs) > 0:
-        # Load civilization data to get specialties
-        all_civs = load_civilizations()
-        enemy_civ_specialties = []
+    if filters.difficulty:
+        mask &= catalog.difficulty_codes == catalog.difficulties.get(filters.difficulty, -1)
+    
+    return mask
+
+def rank_build_orders(civilization_id=None, build_types=None, map_type=None,
+                      difficulty=None, ally_civs=None, enemy_civs=None, catalog=None,
+                      limit=None, after=None):
+    """
+    Rank the build orders of the catalog for the given filters.
+    
+    Filtering and scoring run on the catalog's precomputed arrays. Each build
+    gets a single integer score that orders it by counter score against the
+    enemy, then meta relevance, then ideal civilization (or ideal civilization
+    before meta relevance when there is no enemy), with catalog order breaking
+    ties. With allies, the ally complement score (rounded to ALLY_SCORE_LEVELS
+    steps) ranks just above meta relevance. Only the top `limit` builds (after
+    the `after` rank key, if given) are selected and sorted, so fetching a page
+    does not sort the whole catalog.
+    
+    The catalog is never modified, so this can run concurrently from many
+    sessions against the same cached catalog. Names are matched case-insensitively.
+    
+    Args:
+        civilization_id (int): ID of the selected civilization
+        build_types (list): List of build order types to filter
+        map_type (str): Map type to filter
+        difficulty (str): Difficulty level to filter
+        ally_civs (list): List of allied civilization names
+        enemy_civs (list): List of enemy civilization names
+        catalog (BuildOrderCatalog): Catalog to rank (defaults to the shared one)
+        limit (int): Maximum number of build orders to return (None for all)
+        after (int): Only return build orders ranked below this rank_key
         
-        # Get the specialties of enemy civilizations
-        for enemy_civ_name in enemy_civs:
-            for civ in all_civs:
-                if civ["name"] == enemy_civ_name:
-                    enemy_civ_specialties.extend(civ.get("specialty", []))
+    Returns:
+        list: List of RankedBuildOrder records, best first
+    """
+    if catalog is None:
+        catalog = get_build_order_catalog()
+    filters = normalize_filters(civilization_id, build_types, map_type, difficulty, ally_civs, enemy_civs)
+    n_builds = len(catalog)
+    
+    candidates = np.flatnonzero(_filter_mask(catalog, filters))
+    
+    ideal = np.zeros(n_builds, dtype=np.int64)
+    if filters.civilization_id:
+        ideal[catalog.ideal_positions.get(filters.civilization_id, [])] = 1
+    
+    # Count the archetypes of every build that match an enemy specialty: a
+    # sparse matrix-vector product over the catalog's archetype columns
+    # This is a simplified approach - in a real app, this would be more sophisticated
+    enemy_specialties = _get_enemy_specialties(filters.enemy_civs) if filters.enemy_civs else []
+    counter = np.zeros(n_builds, dtype=np.int64)
+    if enemy_specialties:
+        matching = [
+            positions for archetype, positions in catalog.archetype_positions.items()
+            if any(spec in archetype for spec in enemy_specialties)
+        ]
+        if matching:
+            counter = np.bincount(np.concatenate(matching), minlength=n_builds)
+    
+    # How well each build complements the allies' specialties
+    ally = np.zeros(n_builds)
+    if filters.ally_civs:
+        ally = get_ally_complement_scores(catalog, filters.ally_civs)
+    
+    # Criteria as (values, number of levels), most important first
+    meta_levels = int(catalog.meta_ranks.max()) + 1 if n_builds else 1
+    criteria = []
+    if enemy_specialties:
+        criteria.append((counter[candidates], None))
+    elif filters.civilization_id:
+        criteria.append((ideal[candidates], 2))
+    if filters.ally_civs:
+        ally_levels = np.rint(ally[candidates] * ALLY_SCORE_LEVELS).astype(np.int64) + ALLY_SCORE_LEVELS
+        criteria.append((ally_levels, 2 * ALLY_SCORE_LEVELS + 1))
+    if enemy_specialties or filters.civilization_id:
+        criteria.append((catalog.meta_ranks[candidates], meta_levels))
+    if enemy_specialties:
+        criteria.append((ideal[candidates], 2))
+    
+    # Mixed-radix integer weights make the composite score order exactly like
+    # sorting by the individual criteria in turn
+    score = np.zeros(len(candidates), dtype=np.int64)
+    for values, levels in criteria:
+        score = score * (levels or 1) + values
+    
+    # Unique keys (earlier catalog position wins ties) make top-k selection
+    # stable and let a page continue exactly where the previous one ended
+    keys = score * n_builds + (n_builds - 1 - candidates)
+    if after is not None:
+        remaining = keys < after
+        candidates = candidates[remaining]
+        keys = keys[remaining]
+    
+    if limit is not None and limit <= 0:
+        top = np.array([], dtype=np.intp)
+    elif limit is not None and limit < len(candidates):
+        top = np.argpartition(-keys, limit - 1)[:limit]
+    else:
+        top = np.arange(len(candidates))
+    top = top[np.argsort(-keys[top])]
+    
+    return [
+        RankedBuildOrder(
+            build_order_id=catalog.build_orders[position]["id"],
+            position=int(position),
+            civ_score=int(ideal[position]),
+            counter_score=int(counter[position]),
+            ally_score=float(ally[position]),
+            meta_relevance=catalog.build_orders[position].get("meta_relevance", 0),
+            rank_key=int(key)
+        )
+        for position, key in zip(candidates[top], keys[top])
+    ]
+
+def get_recommended_build_orders(civilization_id=None, build_types=None, map_type=None, 
+                                difficulty=None, ally_civs=None, enemy_civs=None,
+                                limit=None, cursor=None, preferences=None):
+    """
+    Get recommended build orders based on various filters.
+    
+    Args:
+        civilization_id (int): ID of the selected civilization
+        build_types (list): List of build order types to filter
+        map_type (str): Map type to filter
+        difficulty (str): Difficulty level to filter
+        ally_civs (list): List of allied civilization names
+        enemy_civs (list): List of enemy civilization names
+        limit (int): Maximum number of build orders to return (None for all)
+        cursor (RecommendationCursor): Continue after a previous page
+        preferences (dict): User preference vector to personalize the order (see personalization)
         
-        # Prioritize build orders that are strong against these specialties
-        if enemy_civ_specialties:
-            # This is a simplified approach - in a real app, this would be more sophisticated
-            for bo in recommended:
-                bo["counter_score"] = 0
-                for archetype in bo.get("strong_against", []):
-                    # Check if the build order is strong against any of the enemy specialties
-                    if any(specialty in archetype.lower() for specialty in [s.lower() for s in enemy_civ_specialties]):
-                        bo["counter_score"] += 1
-            
-            # Sort by counter score and meta relevance
-            recommended.sort(key=lambda bo: (bo.get("counter_score", 0), bo.get("meta_relevance", 0)), reverse=True)
+    Returns:
+        list: List of recommended build orders (read-only, shared with other sessions)
+    """
+    page = get_recommended_build_order_page(
+        civilization_id, build_types, map_type, difficulty, ally_civs, enemy_civs,
+        limit=limit, cursor=cursor, preferences=preferences
+    )
+    return page["build_orders"]
+
+def get_recommended_build_order_page(civilization_id=None, build_types=None, map_type=None,
+                                     difficulty=None, ally_civs=None, enemy_civs=None,
+                                     limit=DEFAULT_PAGE_SIZE, cursor=None, preferences=None):
+    """
+    Get one page of recommended build orders.
     
-    # No build orders found with the given filters
-    if not recommended:
-        return []
+    Pages are cached per normalized filter combination and cursor until they
+    expire or the catalog changes. Personalization re-ranks builds within the
+    page after the cache, so cached pages are shared by all users and paging
+    is unaffected.
     
-    return recommended
+    Args:
+        civilization_id (int): ID of the selected civilization
+        build_types (list): List of build order types to filter
+        map_type (str): Map type to filter
+        difficulty (str): Difficulty level to filter
+        ally_civs (list): List of allied civilization names
+        enemy_civs (list): List of enemy civilization names
+        limit (int): Number of build orders per page (None for all remaining)
+        cursor (RecommendationCursor): next_cursor of the previous page, or None for the first page
+        preferences (dict): User preference vector to personalize the order (see personalization)
+        
+    Returns:
+        dict: Page with "build_orders" (read-only, shared with other sessions)
+            and "next_cursor" (None on the last page)
+    
+    Raises:
+        ValueError: If the cursor belongs to an older version of the catalog
+    """
+    catalog = get_build_order_catalog()
+    filters = normalize_filters(civilization_id, build_types, map_type, difficulty, ally_civs, enemy_civs)
+    
+    if cursor is not None and cursor.version != catalog.version:
+        raise ValueError("The build order catalog has changed, restart from the first page")
+    after = cursor.rank_key if cursor is not None else None
+    
+    cache_key = (filters, limit, after)
+    ranked = _recommendation_cache.get(cache_key, catalog.version)
+    if ranked is None:
+        # Fetch one extra build to know whether there is a next page
+        ranked = tuple(rank_build_orders(
+            *filters, catalog=catalog, limit=limit + 1 if limit is not None else None, after=after
+        ))
+        _recommendation_cache.put(cache_key, catalog.version, ranked)
+    
+    next_cursor = None
+    if limit is not None and len(ranked) > limit:
+        ranked = ranked[:limit]
+        next_cursor = RecommendationCursor(catalog.version, ranked[-1].rank_key) if ranked else None
+    
+    build_orders = [catalog.build_orders[r.position] for r in ranked]
+    if preferences:
+        build_orders = personalize_ranking(build_orders, preferences)
+    
+    return {
+        "build_orders": build_orders,
+        "next_cursor": next_cursor
+    }
+
+def get_recommendation_cache_stats():
+    """
+    Get hit/miss statistics of the recommendation cache.
+    
+    Returns:
+        dict: Hits, misses, hit rate and size of the cache
+    """
+    return _recommendation_cache.stats()
+
+# Sort order of the tiers, best first
+TIER_ORDER = {"S": 0, "A": 1, "B": 2, "C": 3, "D": 4}
 
 def get_map_civilization_tier_list(map_id):
     """
@@ -91,50 +446,73 @@ def get_map_civilization_tier_list(map_id):
         
     Returns:
         list: List of civilizations with their tier ranking for this map
+            (read-only entries, shared with other sessions)
     """
-    # Load map data
-    maps = load_maps()
-    selected_map = None
-    
-    for m in maps:
-        if m["id"] == map_id:
-            selected_map = m
-            break
-    
-    if not selected_map:
-        return []
+    return list(_load_map_tier_lists().get(map_id, ()))
+
+@cached_per_data_version
+def _load_map_tier_lists():
+    """
+    Build the tier lists of all maps.
     
-    # Load civilization data
+    Returns:
+        dict: Mapping of map ID to a tuple of read-only tier list entries
+    """
     all_civs = load_civilizations()
+    return {m["id"]: freeze_data(_build_map_tier_list(m, all_civs)) for m in load_maps()}
+
+def _build_map_tier_list(selected_map, all_civs):
+    """
+    Build the tier list of one map.
     
-    # Create a tier list
-    tier_list = []
-    
+    Args:
+        selected_map (dict): Map data
+        all_civs (list): List of civilization dictionaries
+        
+    Returns:
+        list: List of civilizations with their tier ranking for this map
+    """
     # Get the IDs of strong and weak civilizations for this map
     strong_civ_ids = selected_map.get("strong_civilizations", [])
     weak_civ_ids = selected_map.get("weak_civilizations", [])
     
+    # Position of each civ in the lists (first occurrence from the front,
+    # last occurrence counted from the back of the weak list)
+    strong_positions = {}
+    for i, civ_id in enumerate(strong_civ_ids):
+        strong_positions.setdefault(civ_id, i)
+    weak_positions = {}
+    weak_positions_from_end = {}
+    for i, civ_id in enumerate(weak_civ_ids):
+        weak_positions.setdefault(civ_id, i)
+        weak_positions_from_end[civ_id] = len(weak_civ_ids) - 1 - i
+    top_strong = set(strong_civ_ids[:2])
+    bottom_weak = set(weak_civ_ids[-2:])
+    
+    # Create a tier list
+    tier_list = []
+    
     # In a real app, this would be based on win rate data for the map
     # Here we'll simulate tiers based on the strong/weak lists
     for civ in all_civs:
         civ_id = civ["id"]
         
         # Determine tier based on whether the civ is in strong/weak lists
-        if civ_id in strong_civ_ids[:2]:  # Top 2 in strong list
+        if civ_id in top_strong:  # Top 2 in strong list
             tier = "S"
-            win_rate = 56.0 + (strong_civ_ids.index(civ_id) * -0.5)  # Simulated win rate
-        elif civ_id in strong_civ_ids:  # Rest of strong list
+            win_rate = 56.0 + (strong_positions[civ_id] * -0.5)  # Simulated win rate
+        elif civ_id in strong_positions:  # Rest of strong list
             tier = "A"
-            win_rate = 53.0 + (strong_civ_ids.index(civ_id) * -0.3)  # Simulated win rate
-        elif civ_id not in weak_civ_ids:  # Not in weak list
+            win_rate = 53.0 + (strong_positions[civ_id] * -0.3)  # Simulated win rate
+        elif civ_id not in weak_positions:  # Not in weak list
             tier = "B"
             win_rate = 50.0 + ((civ_id % 3) - 1)  # Simulated win rate with some variation
-        elif civ_id in weak_civ_ids[-2:]:  # Bottom 2 in weak list
+        elif civ_id in bottom_weak:  # Bottom 2 in weak list
             tier = "D"
-            win_rate = 46.0 - (weak_civ_ids[::-1].index(civ_id) * 0.5)  # Simulated win rate
+            win_rate = 46.0 - (weak_positions_from_end[civ_id] * 0.5)  # Simulated win rate
         else:  # Rest of weak list
             tier = "C"
-            win_rate = 48.0 - (weak_civ_ids.index(civ_id) * 0.3)  # Simulated win rate
+            win_rate = 48.0 - (weak_positions[civ_id] * 0.3)  # Simulated win rate
         
         # Add to tier list
         tier_list.append({
@@ -146,8 +524,7 @@ def get_map_civilization_tier_list(map_id):
         })
     
     # Sort by tier (S, A, B, C, D) and then by win rate
-    tier_order = {"S": 0, "A": 1, "B": 2, "C": 3, "D": 4}
-    tier_list.sort(key=lambda x: (tier_order[x["tier"]], -x["win_rate"]))
+    tier_list.sort(key=lambda x: (TIER_ORDER[x["tier"]], -x["win_rate"]))
     
     return tier_list
 
@@ -0,0 +1,261 @@
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .build_order_catalog import get_build_order_catalog
+from .data_loader import (
+    _get_data_dir,
+    cached_per_data_version,
+    get_data_version,
+    get_process_pool,
+    load_civilizations,
+    load_maps
+)
+from .recommendation_engine import rank_build_orders
+
+RECOMMENDATION_TABLE_FILE = "recommendation_tables.npz"
+
+# Number of build orders stored per (civilization, map, difficulty)
+TABLE_TOP_N = 10
+
+# Seconds between checks of the background refresh for changed data
+REFRESH_INTERVAL = 60
+
+_refresh_thread = None
+_refresh_lock = threading.Lock()
+
+def _get_table_axes():
+    """Get the civilization IDs, map names and difficulties the tables are indexed by."""
+    catalog = get_build_order_catalog()
+    civ_ids = [civ["id"] for civ in load_civilizations()]
+    map_names = [m["name"].casefold() for m in load_maps()]
+    # "" stands for any difficulty
+    difficulties = [""] + sorted(catalog.difficulties)
+    return civ_ids, map_names, difficulties
+
+def _rank_civilization(task):
+    """Rank the top build orders of one civilization for every map and difficulty."""
+    civ_id, map_names, difficulties, top_n = task
+    catalog = get_build_order_catalog()
+    table = np.full((len(map_names), len(difficulties), top_n), -1, dtype=np.int32)
+
+    for i, map_name in enumerate(map_names):
+        for j, difficulty in enumerate(difficulties):
+            ranked = rank_build_orders(
+                civilization_id=civ_id,
+                map_type=map_name,
+                difficulty=difficulty or None,
+                catalog=catalog,
+                limit=top_n
+            )
+            table[i, j, :len(ranked)] = [r.position for r in ranked]
+
+    return table
+
+def build_recommendation_tables(top_n=TABLE_TOP_N, processes=None):
+    """
+    Precompute the top build orders for every civilization, map and difficulty.
+
+    Args:
+        top_n (int): Number of build orders kept per combination
+        processes (int): Number of worker processes (defaults to the CPU count,
+            1 runs everything in the current process)
+
+    Returns:
+        dict: Recommendation tables with the following keys:
+            version (tuple): Data version the tables were built from
+            civ_ids (list): Civilization IDs along the first axis
+            map_names (list): Lowercase map names along the second axis
+            difficulties (list): Lowercase difficulties along the third axis ("" for any)
+            positions (numpy.ndarray): int32 catalog positions of shape
+                (civs, maps, difficulties, top_n), best first, padded with -1
+    """
+    version = get_data_version()
+    civ_ids, map_names, difficulties = _get_table_axes()
+    tasks = [(civ_id, map_names, difficulties, top_n) for civ_id in civ_ids]
+
+    if processes == 1:
+        tables = [_rank_civilization(task) for task in tasks]
+    else:
+        with get_process_pool(processes) as pool:
+            tables = pool.map(_rank_civilization, tasks)
+
+    if tables:
+        positions = np.stack(tables)
+    else:
+        positions = np.full((0, len(map_names), len(difficulties), top_n), -1, dtype=np.int32)
+    return {
+        "version": version,
+        "civ_ids": civ_ids,
+        "map_names": map_names,
+        "difficulties": difficulties,
+        "positions": positions
+    }
+
+def save_recommendation_tables(tables=None, path=None):
+    """
+    Precompute the recommendation tables and save them as an artifact.
+
+    Args:
+        tables (dict): Tables to save (computed if not provided)
+        path (Path): Output file (defaults to the data directory)
+
+    Returns:
+        Path: Path of the saved artifact
+    """
+    tables = tables or build_recommendation_tables()
+    path = Path(path or _get_data_dir() / RECOMMENDATION_TABLE_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write next to the target and rename, so readers never see a partial file
+    temp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez_compressed(
+        temp_path,
+        version=np.array(json.dumps(tables["version"])),
+        civ_ids=np.array(json.dumps(tables["civ_ids"])),
+        map_names=np.array(json.dumps(tables["map_names"])),
+        difficulties=np.array(json.dumps(tables["difficulties"])),
+        positions=tables["positions"]
+    )
+    temp_path.replace(path)
+    return path
+
+def _read_table_version(path):
+    """Read the data version an artifact was built from, or None if there is none."""
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as artifact:
+        return json.loads(str(artifact["version"]))
+
+def _is_current(version):
+    """Check whether an artifact version matches the current data version."""
+    return version is not None and version == json.loads(json.dumps(get_data_version()))
+
+@cached_per_data_version
+def load_recommendation_tables():
+    """
+    Load the precomputed recommendation tables.
+
+    Returns:
+        dict or None: Tables (see build_recommendation_tables) with an added
+            "index" of civ ID, map name and difficulty to axis positions, or
+            None if there is no artifact for the current data
+    """
+    path = _get_data_dir() / RECOMMENDATION_TABLE_FILE
+    if not _is_current(_read_table_version(path)):
+        return None
+
+    with np.load(path, allow_pickle=False) as artifact:
+        tables = {
+            "version": get_data_version(),
+            "civ_ids": json.loads(str(artifact["civ_ids"])),
+            "map_names": json.loads(str(artifact["map_names"])),
+            "difficulties": json.loads(str(artifact["difficulties"])),
+            "positions": artifact["positions"]
+        }
+
+    tables["index"] = {
+        "civ_ids": {civ_id: i for i, civ_id in enumerate(tables["civ_ids"])},
+        "map_names": {name: i for i, name in enumerate(tables["map_names"])},
+        "difficulties": {difficulty: i for i, difficulty in enumerate(tables["difficulties"])}
+    }
+    return tables
+
+def get_precomputed_recommendations(civilization_id, map_type, difficulty=None):
+    """
+    Get the precomputed top build orders for a civilization on a map.
+
+    Args:
+        civilization_id (int): ID of the civilization
+        map_type (str): Map name
+        difficulty (str): Difficulty level (None for any)
+
+    Returns:
+        list or None: Recommended build orders (read-only), or None if the
+            combination has not been precomputed for the current data
+    """
+    tables = load_recommendation_tables()
+    if tables is None:
+        return None
+
+    index = tables["index"]
+    civ_index = index["civ_ids"].get(civilization_id)
+    map_index = index["map_names"].get((map_type or "").casefold())
+    difficulty_index = index["difficulties"].get((difficulty or "").casefold())
+    if civ_index is None or map_index is None or difficulty_index is None:
+        return None
+
+    catalog = get_build_order_catalog()
+    positions = tables["positions"][civ_index, map_index, difficulty_index]
+    return [catalog.build_orders[p] for p in positions if p >= 0]
+
+def refresh_recommendation_tables():
+    """
+    Rebuild the recommendation tables if the data changed since they were saved.
+
+    The job runs as a separate process (the CLI below) so its worker pool
+    stays out of the app's process.
+
+    Returns:
+        bool: Whether the tables were rebuilt
+    """
+    path = _get_data_dir() / RECOMMENDATION_TABLE_FILE
+    rebuilt = False
+    if not _is_current(_read_table_version(path)):
+        project_root = Path(__file__).resolve().parents[2]
+        subprocess.run([sys.executable, "-m", "app.utils.recommendation_tables"], cwd=project_root, check=True)
+        rebuilt = True
+
+    # Also pick up tables saved by a manual run of the job
+    if rebuilt or load_recommendation_tables() is None:
+        load_recommendation_tables.cache_clear()
+    return rebuilt
+
+def _refresh_loop(interval):
+    """Periodically refresh the recommendation tables."""
+    while True:
+        try:
+            refresh_recommendation_tables()
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error refreshing recommendation tables: {e}")
+        time.sleep(interval)
+
+def start_background_refresh(interval=REFRESH_INTERVAL):
+    """
+    Start a daemon thread that rebuilds the recommendation tables whenever the data changes.
+
+    Safe to call on every page load: only one thread is started per process.
+
+    Args:
+        interval (float): Seconds between checks for changed data
+    """
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is None or not _refresh_thread.is_alive():
+            _refresh_thread = threading.Thread(target=_refresh_loop, args=(interval,), daemon=True)
+            _refresh_thread.start()
+
+def main(argv=None):
+    """Precompute the recommendation tables from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Precompute the top build orders for every civilization, map and difficulty."
+    )
+    parser.add_argument("-o", "--output", help="Output file (defaults to the data directory)")
+    parser.add_argument("-n", "--top", type=int, default=TABLE_TOP_N,
+                        help="Number of build orders per combination")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="Number of worker processes (defaults to the CPU count)")
+    args = parser.parse_args(argv)
+
+    tables = build_recommendation_tables(top_n=args.top, processes=args.processes)
+    path = save_recommendation_tables(tables, args.output)
+    print(f"Saved recommendation tables to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import streamlit as st
 
+from .build_order_catalog import get_build_order_catalog
+from .personalization import FAVORITE_WEIGHT, VIEW_WEIGHT, create_preferences, update_preferences
+from .utils import load_json_asset
+
 def initialize_session_state():
     """Initialize session state variables if they don't exist."""
     if "selected_civilization" not in st.session_state:
@@ -62,6 +66,7 @@ def save_to_favorites(build_order_id, user_id=None, notes=None):
             "notes": notes,
             "date_added": "Today"  # In a real app, this would be a proper timestamp
         })
+        _update_user_preferences(build_order_id, FAVORITE_WEIGHT)
         return True
     return False
 
@@ -70,11 +75,14 @@ def remove_from_favorites(build_order_id, user_id=None):
     # In a real app, this would interact with a database
     # Here we just update session state
     if "favorites" in st.session_state:
+        favorite_count = len(st.session_state.favorites)
         st.session_state.favorites = [
             fav for fav in st.session_state.favorites 
             if fav.get("build_order_id") != build_order_id or 
                (user_id and fav.get("user_id") != user_id)
         ]
+        if len(st.session_state.favorites) < favorite_count:
+            _update_user_preferences(build_order_id, -FAVORITE_WEIGHT)
         return True
     return False
 
@@ -86,4 +94,35 @@ def get_favorites(user_id=None):
         if user_id:
             return [fav for fav in st.session_state.favorites if fav.get("user_id") == user_id]
         return st.session_state.favorites
-    return [] 
\ No newline at end of file
+    return [] 
+
+def get_user_preferences():
+    """Get the user's preference vector used to personalize recommendations."""
+    # Seeded from the saved settings and favorites, then updated as builds are viewed and favorited
+    if "user_preferences" not in st.session_state:
+        user_data = load_json_asset("user_data.json") or {}
+        catalog = get_build_order_catalog()
+        
+        # Saved favorites may be stored as IDs or as favorite entries
+        favorite_ids = [
+            fav.get("build_order_id") if isinstance(fav, dict) else fav
+            for fav in user_data.get("favorites", []) + st.session_state.get("favorites", [])
+        ]
+        favorite_builds = [catalog.get(build_id) for build_id in dict.fromkeys(favorite_ids)]
+        
+        st.session_state.user_preferences = create_preferences(
+            user_data.get("settings", {}),
+            [build for build in favorite_builds if build]
+        )
+    return st.session_state.user_preferences
+
+def record_build_view(build_order):
+    """Record that the user viewed a build order, to personalize recommendations."""
+    if build_order:
+        update_preferences(get_user_preferences(), build_order, VIEW_WEIGHT)
+
+def _update_user_preferences(build_order_id, weight):
+    """Update the user's preferences with the build order of the given ID, if it is known."""
+    build_order = get_build_order_catalog().get(build_order_id)
+    if build_order:
+        update_preferences(get_user_preferences(), build_order, weight)
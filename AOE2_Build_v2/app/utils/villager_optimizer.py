@@ -0,0 +1,696 @@
+import argparse
+import json
+import multiprocessing
+import re
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from .build_steps import AGE_ORDER
+from .build_timeline import AGES, RESOURCES, format_game_time, parse_game_time
+from .civ_modifiers import get_all_civ_modifiers
+from .data_loader import get_process_pool, load_civilizations
+from .economy_simulator import (
+    AGE_RESEARCH_TIMES,
+    AGE_UP_COSTS,
+    BUILDING_COSTS,
+    GATHER_RATES,
+    SIMULATION_DURATION,
+    STARTING_RESOURCES,
+    STARTING_VILLAGERS,
+    VILLAGER_COST,
+    cost_matrix,
+    get_modifier
+)
+
+# Seconds it takes the Town Center to train a villager; the optimizer makes
+# one decision per villager slot
+VILLAGER_TRAIN_TIME = 25
+DECISION_INTERVAL = VILLAGER_TRAIN_TIME
+
+# Number of schedules kept after each decision
+BEAM_WIDTH = 128
+
+# Gathering time a villager loses walking to another resource
+VILLAGER_MOVE_TIME = 15
+
+# Wood for houses, spread over the villagers (a 25 wood house per 5 population)
+HOUSE_COST_PER_VILLAGER = {"wood": 5}
+
+# Buildings needed before clicking up to each age
+AGE_REQUIRED_BUILDINGS = {
+    "feudal": ("Barracks",),
+    "castle": ("Market", "Blacksmith"),
+    "imperial": ("Monastery", "University")
+}
+
+# Cost of the units a target can ask for, and the building that trains them
+UNIT_COSTS = {
+    "Scout Cavalry": {"food": 80},
+    "Knight": {"food": 60, "gold": 75},
+    "Camel Rider": {"food": 55, "gold": 60},
+    "Archer": {"wood": 25, "gold": 45},
+    "Crossbowman": {"wood": 25, "gold": 45},
+    "Skirmisher": {"food": 25, "wood": 35},
+    "Militia": {"food": 60, "gold": 20},
+    "Man-at-Arms": {"food": 60, "gold": 20},
+    "Spearman": {"food": 35, "wood": 25},
+    "Monk": {"gold": 100},
+    "Mangonel": {"wood": 160, "gold": 135}
+}
+UNIT_BUILDINGS = {
+    "Scout Cavalry": "Stable",
+    "Knight": "Stable",
+    "Camel Rider": "Stable",
+    "Archer": "Archery Range",
+    "Crossbowman": "Archery Range",
+    "Skirmisher": "Archery Range",
+    "Militia": "Barracks",
+    "Man-at-Arms": "Barracks",
+    "Spearman": "Barracks",
+    "Monk": "Monastery",
+    "Mangonel": "Siege Workshop"
+}
+
+# Age in which each unit can first be trained
+UNIT_AGES = {
+    "Scout Cavalry": "feudal",
+    "Knight": "castle",
+    "Camel Rider": "castle",
+    "Archer": "feudal",
+    "Crossbowman": "castle",
+    "Skirmisher": "feudal",
+    "Militia": "dark",
+    "Man-at-Arms": "feudal",
+    "Spearman": "feudal",
+    "Monk": "castle",
+    "Mangonel": "castle"
+}
+
+# Plural of the unit names that do not just add an "s"
+UNIT_PLURALS = {
+    "Scout Cavalry": "Scout Cavalry",
+    "Crossbowman": "Crossbowmen",
+    "Militia": "Militia",
+    "Man-at-Arms": "Man-at-Arms"
+}
+
+# Build type of an optimized build, by unit for Feudal Age targets and by age otherwise
+UNIT_BUILD_TYPES = {"Scout Cavalry": "Scout Rush", "Archer": "Archer Rush", "Man-at-Arms": "Man-at-Arms Rush"}
+AGE_BUILD_TYPES = {"castle": "Fast Castle"}
+
+_TARGET_PATTERN = re.compile(
+    r"^(?P<age>feudal|castle|imperial)(?: age)?(?: by (?P<time>[\d:]+))?"
+    r"(?: with (?P<count>\d+|max|most) (?P<unit>.+?))?$"
+)
+
+# What to optimize for: reach age with count units as soon as possible
+# (objective "time"), or reach age by deadline with as many units as possible
+# (objective "army"). unit is None when only the age matters.
+OptimizationTarget = namedtuple("OptimizationTarget", ["age", "deadline", "unit", "count", "objective"])
+
+# Best schedule found for a target. target_time is when the target is met
+# (the deadline for the army objective), army the number of units affordable
+# then, and timeline the decisions as (time, clicked age, trained resource,
+# moved from, moved to) tuples with None for no decision.
+OptimizedSchedule = namedtuple("OptimizedSchedule", ["target", "civ_id", "target_time", "army", "timeline"])
+
+# Costs and rates of one civilization's economy, as arrays per resource
+_EconomyModel = namedtuple("_EconomyModel", [
+    "rates", "start", "villager_cost", "age_costs", "research_times", "reserve", "unit_cost", "resources"
+])
+
+class TargetError(ValueError):
+    """Raised when an optimization target cannot be parsed."""
+
+def _singular(name):
+    """Crude singular form of a lowercase name ("scouts" -> "scout")."""
+    return name[:-1] if name.endswith("s") else name
+
+def _unit_name(unit, count=2):
+    """Name of a unit for a count of them ("Knight", "Knights")."""
+    return unit if count == 1 else UNIT_PLURALS.get(unit, f"{unit}s")
+
+def _find_unit(name):
+    """Find the unit a (possibly shortened or plural) name refers to."""
+    name = name.strip()
+    names = {unit: (unit.casefold(), _unit_name(unit).casefold()) for unit in UNIT_COSTS}
+    matches = [unit for unit in UNIT_COSTS if name in names[unit]]
+    if not matches and _singular(name):
+        matches = [unit for unit in UNIT_COSTS if names[unit][0].startswith(_singular(name))]
+    if not matches:
+        raise TargetError(f"Unknown unit: {name}")
+    if len(matches) > 1:
+        raise TargetError(f"Ambiguous unit: {name} (could be {', '.join(matches)})")
+    return matches[0]
+
+def _check_unit_age(target):
+    """Raise TargetError if the target's unit cannot be trained in the target age."""
+    if target.unit and AGE_ORDER.index(UNIT_AGES[target.unit]) > AGE_ORDER.index(target.age):
+        raise TargetError(
+            f"{_unit_name(target.unit)} need the {UNIT_AGES[target.unit].capitalize()} Age, "
+            f"not the {target.age.capitalize()} Age"
+        )
+
+def parse_target(text):
+    """
+    Parse an optimization target.
+
+    Args:
+        text (str): Target such as "Castle Age by 16:30 with 3 scouts", or
+            "Feudal Age by 10:00 with max archers" to maximize the army
+
+    Returns:
+        OptimizationTarget: Parsed target
+
+    Raises:
+        TargetError: If the target cannot be parsed, names an unknown or
+            ambiguous unit, or a unit that the target age cannot train
+    """
+    match = _TARGET_PATTERN.match(" ".join(str(text).casefold().split()))
+    if not match:
+        raise TargetError(f"Cannot parse target: {text} (e.g. 'Castle Age by 16:30 with 3 scouts')")
+
+    deadline = None
+    if match["time"]:
+        deadline = parse_game_time(match["time"])
+        if deadline is None:
+            raise TargetError(f"Invalid time: {match['time']} (use m:ss)")
+
+    unit = _find_unit(match["unit"]) if match["unit"] else None
+    if match["count"] in ("max", "most"):
+        if deadline is None:
+            raise TargetError("Maximizing the army needs a time, e.g. 'Feudal Age by 10:00 with max archers'")
+        target = OptimizationTarget(match["age"], deadline, unit, 0, "army")
+    else:
+        target = OptimizationTarget(match["age"], deadline, unit, int(match["count"] or 0), "time")
+    _check_unit_age(target)
+    return target
+
+def _economy_model(target, modifiers):
+    """Compute the costs and rates the search needs for a target and civilization."""
+    n_ages = AGES.index(target.age) + 1
+    building_costs = dict(zip(BUILDING_COSTS, cost_matrix(BUILDING_COSTS) * get_modifier(
+        modifiers, "building_cost_multipliers"
+    )))
+
+    # Clicking up also pays for the buildings the age requires
+    age_costs = cost_matrix({age: AGE_UP_COSTS[age] for age in AGES}) * get_modifier(modifiers, "age_up_cost_multipliers")
+    for a, age in enumerate(AGES):
+        age_costs[a] += sum(building_costs[building] for building in AGE_REQUIRED_BUILDINGS[age])
+
+    unit_cost = np.zeros(len(RESOURCES))
+    reserve = np.zeros(len(RESOURCES))
+    if target.unit:
+        unit_cost = cost_matrix({target.unit: UNIT_COSTS[target.unit]})[0]
+        reserve = building_costs[UNIT_BUILDINGS[target.unit]] + target.count * unit_cost
+
+    villager_cost = (cost_matrix({"villager": VILLAGER_COST})[0] * get_modifier(modifiers, "villager_cost_multiplier")
+                     + cost_matrix({"house": HOUSE_COST_PER_VILLAGER})[0])
+
+    # Only resources the target needs are worth gathering
+    needed = age_costs[:n_ages].sum(axis=0) + reserve + unit_cost + villager_cost
+    return _EconomyModel(
+        rates=cost_matrix({"rates": GATHER_RATES})[0] * get_modifier(modifiers, "gather_multipliers"),
+        start=cost_matrix({"start": STARTING_RESOURCES})[0] + get_modifier(modifiers, "starting_resources"),
+        villager_cost=villager_cost,
+        age_costs=age_costs[:n_ages],
+        research_times=np.array([AGE_RESEARCH_TIMES[age] for age in AGES[:n_ages]], dtype=float),
+        reserve=reserve,
+        unit_cost=unit_cost,
+        resources=[r for r in range(len(RESOURCES)) if needed[r] > 0]
+    )
+
+def _initial_beam(model):
+    """Get the beam holding only the start of the game (all villagers on food)."""
+    villagers = np.zeros((1, len(RESOURCES)))
+    villagers[0, RESOURCES.index("food")] = STARTING_VILLAGERS
+    return {
+        "time": 0.0,
+        "stock": model.start[None].copy(),
+        "villagers": villagers,
+        "ages": np.zeros(1, dtype=int),
+        "research_end": np.zeros(1),
+        "history": [()]
+    }
+
+def _remaining_costs(model, ages):
+    """Get the cost of the ages each schedule still has to click, shape (schedules, resources)."""
+    clicked = np.arange(len(model.age_costs)) < ages[:, None]
+    return np.where(clicked[:, :, None], 0.0, model.age_costs[None]).sum(axis=1)
+
+def _remaining_research(model, ages, research_end, time):
+    """Get the earliest time each schedule could finish researching the target age."""
+    clicked = np.arange(len(model.research_times)) < ages[:, None]
+    return np.maximum(research_end, time) + np.where(clicked, 0.0, model.research_times).sum(axis=1)
+
+def _work(model, beam, costs):
+    """Get the seconds the villagers of each schedule need to gather what is missing of costs."""
+    workers = np.maximum(beam["villagers"].sum(axis=1), 1)
+    return (np.maximum(costs - beam["stock"], 0) / model.rates).sum(axis=1) / workers
+
+def _estimate_age_times(model, beam):
+    """
+    Estimate when each schedule of a beam reaches the target age.
+
+    The resources still missing are converted into villager-seconds of
+    gathering, shared by the current villagers as if they could be moved
+    freely, and the target age cannot be reached before its research ends.
+    """
+    pending = beam["ages"] < len(model.age_costs)
+    return np.maximum(
+        beam["time"] + _work(model, beam, _remaining_costs(model, beam["ages"]))
+        + np.where(pending, model.research_times[-1], 0.0),
+        _remaining_research(model, beam["ages"], beam["research_end"], beam["time"])
+    )
+
+def _estimate_target_times(model, beam):
+    """Estimate when each schedule of a beam meets a time target (lower is better)."""
+    costs = _remaining_costs(model, beam["ages"]) + model.reserve
+    return np.maximum(beam["time"] + _work(model, beam, costs), _estimate_age_times(model, beam))
+
+def _estimate_army(model, beam, deadline):
+    """
+    Estimate the army each schedule of a beam can afford at the deadline.
+
+    The current income of each resource is projected to the deadline, and
+    to the last moment the remaining ages can be clicked to be reached by
+    the deadline. What the current villagers would still be missing then is
+    the shortfall, in villager-seconds (0 for schedules on track).
+
+    Returns:
+        tuple: (army, shortfall) arrays of shape (schedules,)
+    """
+    income = beam["villagers"] * model.rates
+    remaining = _remaining_costs(model, beam["ages"])
+    projected = beam["stock"] + income * (deadline - beam["time"])
+    priced = model.unit_cost > 0
+    army = ((projected - remaining - model.reserve)[:, priced] / model.unit_cost[priced]).min(axis=1)
+
+    click_by = deadline - (_remaining_research(model, beam["ages"], beam["research_end"], beam["time"]) - beam["time"])
+    at_click = beam["stock"] + income * np.maximum(click_by - beam["time"], 0)[:, None]
+    shortfall = (np.maximum(remaining - at_click, 0) / model.rates).sum(axis=1)
+    shortfall = np.where(click_by < beam["time"], np.inf, shortfall)
+    return army, shortfall
+
+def _advance(beam, model, target, beam_width):
+    """
+    Advance a beam by one decision interval.
+
+    The next age is clicked as soon as it is affordable and the Town Center
+    is free. Otherwise each schedule branches on whether to train a villager
+    and which resource it gathers, combined with moving one villager between
+    resources (or not). Children that end up with the same villagers, age and
+    research are merged, keeping the best (the dynamic programming step),
+    and the best beam_width children are kept.
+    """
+    time = beam["time"]
+    n_schedules = len(beam["ages"])
+    stock = beam["stock"].copy()
+    ages, research_end = beam["ages"].copy(), beam["research_end"].copy()
+
+    free = research_end <= time
+    next_cost = model.age_costs[np.minimum(ages, len(model.age_costs) - 1)]
+    click = free & (ages < len(model.age_costs)) & (stock >= next_cost).all(axis=1)
+    stock[click] -= next_cost[click]
+    research_end[click] = time + model.research_times[ages[click]]
+    clicked = np.where(click, ages, -1)
+    ages += click
+    can_train = free & ~click & (stock >= model.villager_cost).all(axis=1)
+
+    # Every combination of a parent, a training decision and a move
+    trains = np.array([-1] + model.resources)
+    moves = np.array([(-1, -1)] + [(a, b) for a in model.resources for b in model.resources if a != b])
+    parent, train, move = (grid.ravel() for grid in np.meshgrid(
+        np.arange(n_schedules), np.arange(len(trains)), np.arange(len(moves)), indexing="ij"
+    ))
+    train = trains[train]
+    source, destination = moves[move, 0], moves[move, 1]
+    valid = ((train < 0) | can_train[parent]) & ((source < 0) | (beam["villagers"][parent, source] >= 1))
+    parent, train, source, destination = parent[valid], train[valid], source[valid], destination[valid]
+
+    villagers = beam["villagers"][parent].copy()
+    moved = np.flatnonzero(source >= 0)
+    villagers[moved, source[moved]] -= 1
+    villagers[moved, destination[moved]] += 1
+
+    # Gather for the interval; a villager in training starts gathering after it
+    child_stock = stock[parent] - (train >= 0)[:, None] * model.villager_cost
+    child_stock += villagers * model.rates * DECISION_INTERVAL
+    child_stock[moved, destination[moved]] -= model.rates[destination[moved]] * VILLAGER_MOVE_TIME
+    trained = np.flatnonzero(train >= 0)
+    villagers[trained, train[trained]] += 1
+
+    children = {
+        "time": time + DECISION_INTERVAL,
+        "stock": child_stock,
+        "villagers": villagers,
+        "ages": ages[parent],
+        "research_end": research_end[parent]
+    }
+    # Best first (more villagers breaks ties), then merge equal states. For
+    # the army, schedules on track for the age come first
+    if target.objective == "army":
+        army, shortfall = _estimate_army(model, children, target.deadline)
+        order = np.lexsort((-villagers.sum(axis=1), -army, shortfall))
+    else:
+        order = np.lexsort((-villagers.sum(axis=1), _estimate_target_times(model, children)))
+    keys = np.column_stack((children["ages"], children["research_end"], villagers))[order]
+    _, first = np.unique(keys, axis=0, return_index=True)
+    keep = order[np.sort(first)][:beam_width]
+
+    for name in ("stock", "villagers", "ages", "research_end"):
+        children[name] = children[name][keep]
+    children["history"] = [
+        (beam["history"][parent[k]], (time, int(clicked[parent[k]]), int(train[k]), int(source[k]), int(destination[k])))
+        for k in keep
+    ]
+    return children
+
+def _take_finished(beam, model):
+    """
+    Remove the schedules that meet a time target from a beam.
+
+    Returns:
+        tuple: (beam, finished) where finished lists (target time, history)
+    """
+    done = (beam["ages"] >= len(model.age_costs)) & (beam["stock"] >= model.reserve).all(axis=1)
+    finished = [(max(beam["time"], float(beam["research_end"][i])), beam["history"][i]) for i in np.flatnonzero(done)]
+    if not finished:
+        return beam, finished
+
+    remaining = {name: beam[name][~done] for name in ("stock", "villagers", "ages", "research_end")}
+    remaining["time"] = beam["time"]
+    remaining["history"] = [h for h, d in zip(beam["history"], done) if not d]
+    return remaining, finished
+
+def _search(beam, model, target, beam_width):
+    """
+    Run a beam search to the end.
+
+    Returns:
+        tuple: (score, target time, army, history) of the best schedule, with
+            a lower score being better, or None if no schedule meets the target
+    """
+    best = None
+    while len(beam["ages"]):
+        if target.objective == "army":
+            if beam["time"] + DECISION_INTERVAL > target.deadline:
+                reached = (beam["ages"] >= len(model.age_costs)) & (beam["research_end"] <= target.deadline)
+                armies = np.where(reached, _estimate_army(model, beam, target.deadline)[0], -np.inf)
+                i = int(np.argmax(armies))
+                if armies[i] >= 0:
+                    best = (-armies[i], target.deadline, int(armies[i]), beam["history"][i])
+                break
+        else:
+            beam, finished = _take_finished(beam, model)
+            for target_time, history in finished:
+                if best is None or target_time < best[0]:
+                    best = (target_time, target_time, target.count, history)
+            if not len(beam["ages"]) or beam["time"] >= SIMULATION_DURATION:
+                break
+            # No remaining schedule can finish before the best one
+            if best is not None and _estimate_target_times(model, beam).min() >= best[0]:
+                break
+        beam = _advance(beam, model, target, beam_width)
+    return best
+
+def _split_beam(beam, n_parts):
+    """Split a beam into parts, dealing the schedules out in order so each part gets good ones."""
+    parts = []
+    for part in range(n_parts):
+        indices = np.arange(part, len(beam["ages"]), n_parts)
+        piece = {name: beam[name][indices] for name in ("stock", "villagers", "ages", "research_end")}
+        piece["time"] = beam["time"]
+        piece["history"] = [beam["history"][i] for i in indices]
+        parts.append(piece)
+    return parts
+
+def _search_part(args):
+    """Search from part of a beam (in a worker process)."""
+    beam, target, civ_id, beam_width = args
+    return _search(beam, _economy_model(target, get_all_civ_modifiers().get(civ_id)), target, beam_width)
+
+def _flatten_history(history):
+    """Turn a nested (parent, record) history into a list of records in time order."""
+    records = []
+    while history:
+        history, record = history
+        records.append(record)
+    return records[::-1]
+
+def optimize_villagers(target, civ_id=None, beam_width=BEAM_WIDTH, processes=1):
+    """
+    Search for the villager schedule that best meets a target.
+
+    Time is split into DECISION_INTERVAL steps, one per villager the Town
+    Center can train. At each step a schedule may train a villager for one
+    of the resources the target needs (or not), move a villager between
+    resources, and clicks up as soon as the next age is affordable. The
+    economy follows economy_simulator (including the civilization's
+    bonuses, see civ_modifiers), plus wood for houses and for the buildings
+    each age requires. A beam search keeps the beam_width most promising
+    schedules after each step.
+
+    With several processes, the search runs in-process until the beam is
+    full, then each worker continues from its share of the beam with a full
+    beam of its own, so more processes also search more schedules.
+
+    Args:
+        target (OptimizationTarget or str): Target (see parse_target)
+        civ_id: ID of the civilization (None for the standard economy)
+        beam_width (int): Number of schedules kept after each step
+        processes (int): Number of worker processes (None for the CPU count,
+            1 runs everything in the current process)
+
+    Returns:
+        OptimizedSchedule or None: Best schedule, or None if no schedule meets
+            the target within SIMULATION_DURATION (or by the deadline, for the
+            army objective)
+
+    Raises:
+        TargetError: If the target cannot be parsed, or its unit cannot be
+            trained in its age
+    """
+    if isinstance(target, str):
+        target = parse_target(target)
+    _check_unit_age(target)
+    model = _economy_model(target, get_all_civ_modifiers().get(civ_id))
+    beam = _initial_beam(model)
+    processes = processes or multiprocessing.cpu_count()
+
+    if processes == 1:
+        best = _search(beam, model, target, beam_width)
+    else:
+        # Grow the beam until every worker gets a share of it
+        while len(beam["ages"]) < min(processes, beam_width) and beam["time"] < SIMULATION_DURATION:
+            beam = _advance(beam, model, target, beam_width)
+        parts = [(part, target, civ_id, beam_width) for part in _split_beam(beam, processes) if len(part["ages"])]
+
+        with get_process_pool(min(processes, len(parts))) as pool:
+            results = [result for result in pool.map(_search_part, parts) if result is not None]
+        best = min(results, key=lambda result: result[0]) if results else None
+
+    if best is None:
+        return None
+    _, target_time, army, history = best
+    timeline = [
+        (time,
+         AGES[clicked] if clicked >= 0 else None,
+         RESOURCES[trained] if trained >= 0 else None,
+         RESOURCES[source] if source >= 0 else None,
+         RESOURCES[destination] if destination >= 0 else None)
+        for time, clicked, trained, source, destination in _flatten_history(history)
+    ]
+    return OptimizedSchedule(target, civ_id, float(target_time), army, timeline)
+
+def describe_target(target):
+    """
+    Describe an optimization target in words.
+
+    Args:
+        target (OptimizationTarget): Target
+
+    Returns:
+        str: Description, e.g. "Castle Age by 16:30 with 3 Scout Cavalry"
+    """
+    description = f"{target.age.capitalize()} Age"
+    if target.deadline is not None:
+        description += f" by {format_game_time(target.deadline)}"
+    if target.unit and target.objective == "army":
+        description += f" with as many {_unit_name(target.unit)} as possible"
+    elif target.unit:
+        description += f" with {target.count} {_unit_name(target.unit, target.count)}"
+    return description
+
+def get_villager_schedule(schedule):
+    """
+    Get the villager assignments of an optimized schedule.
+
+    Args:
+        schedule (OptimizedSchedule): Optimized schedule
+
+    Returns:
+        list: Villager assignment dictionaries ({"time", "food", "wood",
+            "gold", "stone"}), in the format of a build's "villager_assignments"
+    """
+    counts = dict.fromkeys(RESOURCES, 0)
+    counts["food"] = STARTING_VILLAGERS
+    changes = {0.0: dict(counts)}
+    training = []
+
+    for time, _, trained, source, destination in schedule.timeline:
+        # Villagers trained in the previous interval start gathering now
+        for resource in training:
+            counts[resource] += 1
+        training = [trained] if trained else []
+        if source:
+            counts[source] -= 1
+            counts[destination] += 1
+        changes[time] = dict(counts)
+    for resource in training:
+        counts[resource] += 1
+    changes[schedule.timeline[-1][0] + DECISION_INTERVAL if schedule.timeline else 0.0] = dict(counts)
+
+    assignments = []
+    for time in sorted(changes):
+        if assignments and all(assignments[-1][r] == changes[time][r] for r in RESOURCES):
+            continue
+        assignments.append({"time": int(time), **changes[time]})
+    return assignments
+
+def _schedule_steps(schedule):
+    """
+    Turn the decisions of an optimized schedule into build order steps.
+
+    There is one step per decision interval in which something happens, at
+    the population the new villager (if any) brings.
+    """
+    counts = dict.fromkeys(RESOURCES, 0)
+    counts["food"] = STARTING_VILLAGERS
+    age = "dark"
+    steps = []
+
+    def add(time, instructions):
+        steps.append({
+            "population": sum(counts.values()) + 1,  # villagers plus the scout
+            "age": age,
+            "time": int(time),
+            "instruction": "; ".join(instructions),
+            "villager_assignment": dict(counts)
+        })
+
+    reached = []
+    for time, clicked, trained, source, destination in schedule.timeline:
+        while reached and reached[0][0] <= time:
+            reached_time, age = reached.pop(0)
+            add(reached_time, [f"Reach {age.capitalize()} Age"])
+
+        instructions = []
+        if clicked:
+            buildings = " and ".join(AGE_REQUIRED_BUILDINGS[clicked])
+            instructions.append(f"Click up to {clicked.capitalize()} Age (after building the {buildings})")
+            reached.append((time + AGE_RESEARCH_TIMES[clicked], clicked))
+        if source:
+            counts[source] -= 1
+            counts[destination] += 1
+            instructions.append(f"Move a villager from {source} to {destination}")
+        if trained:
+            counts[trained] += 1
+            instructions.append(f"New villager to {trained}")
+        if instructions:
+            add(time, instructions)
+
+    for reached_time, age in reached:
+        add(reached_time, [f"Reach {age.capitalize()} Age"])
+
+    target = schedule.target
+    count = target.count if target.objective == "time" else schedule.army
+    if target.unit and count:
+        building = UNIT_BUILDINGS[target.unit]
+        article = "an" if building[0] in "AEIOU" else "a"
+        add(schedule.target_time, [f"Build {article} {building} and train {count} {_unit_name(target.unit, count)}"])
+    return steps
+
+def to_build_order(schedule, name=None):
+    """
+    Turn an optimized schedule into a build order shaped like the sample data.
+
+    Args:
+        schedule (OptimizedSchedule): Optimized schedule
+        name (str): Name of the build order (defaults to one from the target)
+
+    Returns:
+        dict: Build order dictionary with structured steps, each carrying its
+            villager_assignment, and the schedule as "villager_assignments"
+    """
+    target = schedule.target
+    description = describe_target(target)
+    assignments = get_villager_schedule(schedule)
+    final = assignments[-1]
+
+    if target.objective == "army":
+        summary = f"Reaches the {target.age.capitalize()} Age with {schedule.army} {_unit_name(target.unit, schedule.army)} affordable at {format_game_time(schedule.target_time)}."
+    else:
+        summary = f"Meets the target at {format_game_time(schedule.target_time)}."
+        if target.deadline is not None and schedule.target_time > target.deadline:
+            summary += f" The deadline of {format_game_time(target.deadline)} cannot be met."
+
+    return {
+        "name": name or f"Optimized {description}",
+        "description": f"Villager schedule optimized for {description}. {summary}",
+        "type": (UNIT_BUILD_TYPES.get(target.unit) if target.age == "feudal" else AGE_BUILD_TYPES.get(target.age)) or "Other",
+        "difficulty": "Intermediate",
+        "primary_goal": description,
+        "execution_time": int(round(schedule.target_time)),
+        "resource_allocation": {resource: final[resource] for resource in RESOURCES},
+        "steps": _schedule_steps(schedule),
+        "villager_assignments": assignments,
+        "ideal_civilizations": [schedule.civ_id] if schedule.civ_id is not None else [],
+        "suitable_maps": [],
+        "tips": [
+            "Keep the Town Center producing villagers except while researching an age.",
+            "The wood includes houses and the buildings each age requires."
+        ],
+        "notes": "Generated by the villager optimizer.",
+        "is_public": False,
+        "status": "pending"
+    }
+
+def _resolve_civ(value):
+    """Convert a civilization name or ID into an ID."""
+    for civ in load_civilizations():
+        if str(civ["id"]) == value or civ["name"].casefold() == value.casefold():
+            return civ["id"]
+    raise TargetError(f"Unknown civilization: {value}")
+
+def main(argv=None):
+    """Optimize a villager schedule from the command line and print it as a build order."""
+    parser = argparse.ArgumentParser(description="Optimize villager assignments for a target timing.")
+    parser.add_argument("target", help="Target, e.g. 'Castle Age by 16:30 with 3 scouts'")
+    parser.add_argument("-c", "--civ", help="Civilization name or ID (defaults to the standard economy)")
+    parser.add_argument("-w", "--beam-width", type=int, default=BEAM_WIDTH, help="Schedules kept after each step")
+    parser.add_argument("-o", "--output", help="Output file (defaults to stdout)")
+    parser.add_argument("-p", "--processes", type=int, default=None,
+                        help="Number of worker processes (defaults to the CPU count)")
+    args = parser.parse_args(argv)
+
+    try:
+        civ_id = _resolve_civ(args.civ) if args.civ else None
+        schedule = optimize_villagers(args.target, civ_id, args.beam_width, args.processes)
+    except TargetError as e:
+        parser.error(str(e))
+    if schedule is None:
+        parser.exit(1, f"No schedule meets the target: {args.target}\n")
+
+    output_file = sys.stdout if not args.output else open(args.output, "w", encoding="utf-8")
+    try:
+        json.dump(to_build_order(schedule), output_file, indent=2)
+        output_file.write("\n")
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+if __name__ == "__main__":
+    main()
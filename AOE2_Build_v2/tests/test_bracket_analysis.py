@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from app.utils.bracket_analysis import analyze_bracket, analyze_matchup, read_matchups
+
+VALID = {"your_team": ["Franks"], "enemy_team": ["Britons"]}
+
+@pytest.mark.parametrize("fields, message", [
+    ({"your_team": None}, "your_team"),
+    ({"your_team": [["x"]]}, "your_team"),
+    ({"enemy_team": "Franks"}, "enemy_team"),
+    ({"enemy_team": [{"id": 1}]}, "enemy_team"),
+    ({"your_team": [True]}, "your_team"),
+    ({"map": [1]}, "map"),
+    ({"map": {"name": "Arabia"}}, "map"),
+])
+def test_malformed_matchup_is_reported(fields, message):
+    result = analyze_matchup(dict(VALID, id="m", **fields))
+    assert result["id"] == "m"
+    assert message in result["error"]
+
+def test_non_object_matchup_is_reported():
+    assert "error" in analyze_matchup([1])
+
+def test_malformed_lines_do_not_stop_the_bracket():
+    lines = [
+        json.dumps(VALID),
+        "{bad",
+        "[1]",
+        json.dumps(dict(VALID, your_team=None)),
+        json.dumps(dict(VALID, your_team=[["x"]])),
+        json.dumps(dict(VALID, map=[1])),
+        json.dumps(dict(VALID, map="Arabia"))
+    ]
+    results = list(analyze_bracket(read_matchups(lines), processes=1))
+    assert [result["id"] for result in results] == [1, 2, 3, 4, 5, 6, 7]
+    assert ["error" in result for result in results] == [False, True, True, True, True, True, False]
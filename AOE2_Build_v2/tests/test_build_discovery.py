@@ -0,0 +1,26 @@
+import json
+
+from app.utils.build_discovery import discover_build_patterns, read_timelines
+
+RECORD = {"villager_assignments": [
+    {"time": 0, "food": 6},
+    {"time": 120, "food": 8, "wood": 4},
+    {"time": 300, "food": 10, "wood": 8, "gold": 2},
+]}
+
+def test_unreadable_lines_are_none():
+    lines = ["", json.dumps(RECORD), "{bad", "[1, 2]"]
+    assert list(read_timelines(lines)) == [RECORD, None, [1, 2]]
+
+def test_malformed_records_are_skipped():
+    lines = [json.dumps(RECORD), "{bad", "[1, 2]", "3", json.dumps({"steps": []}), json.dumps(RECORD)]
+    result = discover_build_patterns(read_timelines(lines), n_clusters=1, include_catalog=False)
+    assert result["timelines"] == 2
+    assert result["skipped"] == 4
+    assert result["invalid"] == 3
+    assert len(result["patterns"]) == 1
+
+def test_malformed_records_are_skipped_by_workers():
+    records = [RECORD, None, [1, 2], RECORD]
+    result = discover_build_patterns(records, n_clusters=1, batch_size=1, include_catalog=False, processes=2)
+    assert (result["timelines"], result["skipped"], result["invalid"]) == (2, 2, 2)
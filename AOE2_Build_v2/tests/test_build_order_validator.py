@@ -0,0 +1,90 @@
+import pytest
+
+from app.utils.build_order_validator import has_errors, validate_build_order
+
+def _build_order(**fields):
+    """Get a valid build order with some fields replaced."""
+    build_order = {
+        "name": "Scouts",
+        "resource_allocation": {"food": 6, "wood": 3, "gold": 0, "stone": 0},
+        "steps": [
+            {"time": 0, "population": 3, "age": "Dark Age", "instruction": "Build houses"},
+            {"time": 60, "population": 6, "age": "Dark Age", "instruction": "Sheep"}
+        ]
+    }
+    build_order.update(fields)
+    return build_order
+
+def _codes(issues):
+    return [issue.code for issue in issues]
+
+def test_valid_build_has_no_errors():
+    assert not has_errors(validate_build_order(_build_order()))
+
+@pytest.mark.parametrize("assignments", [
+    {"time": 60, "food": 3},
+    5,
+    "0:30",
+])
+def test_villager_assignments_not_a_list(assignments):
+    issues = validate_build_order(_build_order(villager_assignments=assignments))
+    assert "invalid_villager_assignments" in _codes(issues)
+    assert has_errors(issues)
+
+@pytest.mark.parametrize("entry, message", [
+    ("0:30 food", "is not a record"),
+    (None, "is not a record"),
+    ({"time": 30, "distribution": None}, "has no villager counts"),
+    ({"time": 30, "distribution": [3, 1]}, "has no villager counts"),
+    ({"distribution": {"food": 3}}, "has no time"),
+])
+def test_malformed_villager_assignment_entry(entry, message):
+    assignments = [{"time": 0, "distribution": {"food": 3}}, entry]
+    issues = validate_build_order(_build_order(villager_assignments=assignments))
+    invalid = [issue for issue in issues if issue.code == "invalid_villager_assignment"]
+    assert len(invalid) == 1
+    assert invalid[0].severity == "error"
+    assert message in invalid[0].message
+    assert "Villager assignment 2" in invalid[0].message
+
+def test_valid_villager_assignments_are_still_checked():
+    assignments = [
+        {"time": 0, "distribution": {"food": 3}},
+        "broken",
+        {"time": 60, "distribution": {"food": 6, "wood": 4}}
+    ]
+    codes = _codes(validate_build_order(_build_order(villager_assignments=assignments)))
+    assert "invalid_villager_assignment" in codes
+    assert "villagers_exceed_population" in codes
+
+def test_resource_allocation_not_a_mapping():
+    issues = validate_build_order(_build_order(resource_allocation=[6, 3, 0, 0]))
+    assert "invalid_resource_allocation" in _codes(issues)
+
+@pytest.mark.parametrize("time", ["nan", "inf", "-inf", float("nan"), float("inf"), "soon"])
+def test_step_with_invalid_time(time):
+    steps = [{"time": time, "population": 5, "age": "feudal", "instruction": "Click up"}]
+    issues = validate_build_order(_build_order(steps=steps))
+    invalid = [issue for issue in issues if issue.code == "invalid_time"]
+    assert [issue.step for issue in invalid] == [1]
+    assert invalid[0].severity == "error"
+
+@pytest.mark.parametrize("time", ["nan", "inf", float("nan"), float("-inf")])
+def test_villager_assignment_with_invalid_time(time):
+    assignments = [{"time": time, "food": 3}]
+    issues = validate_build_order(_build_order(villager_assignments=assignments))
+    assert "invalid_time" in _codes(issues)
+    assert has_errors(issues)
+
+def test_non_numeric_villager_counts_are_reported():
+    steps = [{"time": 0, "population": 5, "age": "dark", "villager_assignment": {"food": "x", "wood": 1}}]
+    assignments = [
+        {"time": 0, "distribution": {"food": "three", "wood": None}},
+        {"time": 30, "food": "inf", "wood": 2}
+    ]
+    issues = validate_build_order(_build_order(steps=steps, villager_assignments=assignments))
+    invalid = [issue for issue in issues if issue.code == "invalid_villager_count"]
+    assert [issue.step for issue in invalid] == [1, None, None]
+    assert "Villager assignment 1" in invalid[1].message and "food" in invalid[1].message
+    assert "wood" not in invalid[1].message
+    assert "Villager assignment 2" in invalid[2].message
@@ -0,0 +1,39 @@
+import pytest
+
+from app.utils.build_order_catalog import BuildOrderCatalog
+from app.utils.build_steps import CompiledSteps, as_number, parse_game_time
+
+@pytest.mark.parametrize("value, seconds", [
+    (90, 90.0),
+    ("1:30", 90.0),
+    ("1:00:05", 3605.0),
+    (" 45 ", 45.0),
+])
+def test_parse_game_time(value, seconds):
+    assert parse_game_time(value) == seconds
+
+@pytest.mark.parametrize("value", [
+    "nan", "inf", "-inf", "1:nan", "inf:00", "1e400", float("nan"), float("inf"), 10 ** 400,
+    None, True, "", "1:2:3:4", "soon",
+])
+def test_parse_game_time_rejects_unusable_times(value):
+    assert parse_game_time(value) is None
+
+@pytest.mark.parametrize("value", ["nan", "inf", float("-inf"), "x", None, 10 ** 400])
+def test_as_number_rejects_non_finite_values(value):
+    assert as_number(value, 0.0) == 0.0
+
+def test_non_finite_step_times_compile():
+    steps = CompiledSteps([
+        {"time": "inf", "population": 5, "age": "dark", "action": "a"},
+        {"time": float("nan"), "population": 6, "age": "dark", "action": "b"},
+        {"time": "1:00", "population": 7, "age": "dark", "action": "c"}
+    ])
+    assert steps.time_labels == ("", "", "1:00")
+    assert steps.time[2] == 60.0
+
+def test_catalog_loads_build_with_non_finite_time():
+    catalog = BuildOrderCatalog([{"id": 1, "name": "x", "steps": [
+        {"time": "inf", "population": 5, "age": "dark", "action": "a"}
+    ]}])
+    assert len(catalog) == 1
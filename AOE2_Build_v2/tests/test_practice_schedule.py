@@ -0,0 +1,80 @@
+from app.utils.practice_schedule import (
+    get_practice_build,
+    get_session_schedule,
+    get_timer_game_time,
+    pause_timer,
+    reset_timer,
+    start_timer
+)
+
+BUILD_ORDER = {
+    "id": "scouts",
+    "name": "Scouts",
+    "steps": [
+        {"time": 0, "population": 3, "age": "Dark Age", "instruction": "Build houses"},
+        {"time": 60, "population": 6, "age": "Dark Age", "instruction": "Sheep"},
+        {"time": 120, "population": 9, "age": "Dark Age", "instruction": "Lumber camp"}
+    ]
+}
+
+def _run_page(state, selected_build=None, practice_mode=True):
+    """Do what a run of the build orders page does before drawing the practice view."""
+    build_order = get_practice_build(state, selected_build, practice_mode)
+    if build_order is None:
+        return None
+    return get_session_schedule(state, build_order)
+
+def test_start_survives_rerun():
+    state = {}
+
+    # "View Details" returns the build only on the run after the click
+    schedule = _run_page(state, selected_build=BUILD_ORDER)
+    assert schedule is not None and not state["practice_running"]
+
+    # Start reruns the page, on which no build is picked
+    start_timer(state, 2.0, now=100.0)
+    schedule = _run_page(state)
+    assert schedule is not None
+    assert state["practice_running"]
+
+    # The timer keeps running on later runs
+    schedule = _run_page(state)
+    assert get_timer_game_time(state, now=135.0) == 70.0
+    assert schedule.at(get_timer_game_time(state, now=135.0)).current[0]["action"] == "Sheep"
+
+def test_pause_and_reset_survive_rerun():
+    state = {}
+    _run_page(state, selected_build=BUILD_ORDER)
+    start_timer(state, 1.0, now=0.0)
+
+    pause_timer(state, now=30.0)
+    assert _run_page(state) is not None
+    assert get_timer_game_time(state, now=500.0) == 30.0
+
+    # Resuming continues from the paused time
+    start_timer(state, 1.0, now=600.0)
+    assert get_timer_game_time(state, now=610.0) == 40.0
+
+    reset_timer(state)
+    assert _run_page(state) is not None
+    assert get_timer_game_time(state, now=700.0) == 0.0
+
+def test_rerun_keeps_timer_of_same_build():
+    state = {}
+    _run_page(state, selected_build=BUILD_ORDER)
+    start_timer(state, 1.0, now=0.0)
+
+    # Viewing the same build again does not rewind the timer
+    _run_page(state, selected_build=dict(BUILD_ORDER))
+    assert state["practice_running"]
+
+    # Another build starts over
+    _run_page(state, selected_build=dict(BUILD_ORDER, id="archers", name="Archers"))
+    assert not state["practice_running"]
+    assert get_timer_game_time(state, now=50.0) == 0.0
+
+def test_turning_practice_mode_off_forgets_the_build():
+    state = {}
+    _run_page(state, selected_build=BUILD_ORDER)
+    assert _run_page(state, practice_mode=False) is None
+    assert _run_page(state) is None
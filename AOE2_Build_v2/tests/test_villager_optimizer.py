@@ -0,0 +1,45 @@
+import pytest
+
+from app.utils.villager_optimizer import (
+    OptimizationTarget,
+    TargetError,
+    describe_target,
+    optimize_villagers,
+    parse_target,
+    to_build_order
+)
+
+@pytest.mark.parametrize("text, unit", [
+    ("Feudal Age with 3 scouts", "Scout Cavalry"),
+    ("Castle Age with 3 kn", "Knight"),
+    ("Castle Age with 3 man-at-arms", "Man-at-Arms"),
+    ("Castle Age with 3 crossbowmen", "Crossbowman"),
+    ("Imperial Age with 1 monk", "Monk"),
+])
+def test_unit_names(text, unit):
+    assert parse_target(text).unit == unit
+
+@pytest.mark.parametrize("text, message", [
+    ("Castle Age with 3 s", "Unknown unit"),
+    ("Castle Age with 3 m", "Ambiguous unit"),
+    ("Castle Age with 3 trebuchets", "Unknown unit"),
+    ("Feudal Age with 3 knights", "Castle Age"),
+    ("Feudal Age by 10:00 with max monks", "Castle Age"),
+])
+def test_invalid_units_are_rejected(text, message):
+    with pytest.raises(TargetError, match=message):
+        parse_target(text)
+
+def test_unit_age_is_checked_for_built_targets():
+    with pytest.raises(TargetError):
+        optimize_villagers(OptimizationTarget("feudal", None, "Knight", 3, "time"))
+
+def test_units_are_pluralized():
+    assert describe_target(parse_target("Castle Age with 3 knights")) == "Castle Age with 3 Knights"
+    assert describe_target(parse_target("Castle Age with 1 knight")) == "Castle Age with 1 Knight"
+    assert describe_target(parse_target("Castle Age with 2 crossbows")) == "Castle Age with 2 Crossbowmen"
+
+def test_final_step_names_the_units():
+    schedule = optimize_villagers("Castle Age with 3 knights", beam_width=8)
+    assert schedule is not None
+    assert to_build_order(schedule)["steps"][-1]["instruction"] == "Build a Stable and train 3 Knights"